@@ -0,0 +1,77 @@
+"""Benchmark: pandas transform path vs compiled FeaturePlan.
+
+Run from the app directory:
+    python benchmarks/bench_feature_plan.py --sizes 1000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.model import load_preprocessor, load_feature_plan
+from utils.preprocessing import preprocess_features, get_training_medians
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'Kepler.csv')
+
+
+def pandas_transform(df, prep):
+    """The pandas path transform_data used before FeaturePlan"""
+    processed_df = preprocess_features(df.drop(columns=['koi_disposition']), get_training_medians(prep))
+    scaled_df = pd.DataFrame(prep['scaler'].transform(processed_df), columns=processed_df.columns)
+    for col in prep['features']:
+        if col not in scaled_df.columns:
+            scaled_df[col] = 0
+    return scaled_df[prep['features']]
+
+
+def pre_encoded(df):
+    """The frame as the single-prediction form sends it: dummy columns instead of koi_tce_delivname"""
+    df = df.copy()
+    delivname = df.pop('koi_tce_delivname')
+    for value in ('q1_q16_tce', 'q1_q17_dr24_tce'):
+        df[f"koi_tce_delivname_{value}"] = (delivname == value).astype(int)
+    return df
+
+
+def best_time(fn, repeat):
+    """Fastest of `repeat` calls, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    prep = load_preprocessor()
+    plan = load_feature_plan()
+    catalog = pd.read_csv(DATA_PATH)
+    rng = np.random.default_rng(42)
+
+    print(f"{'rows':>8} {'pandas s':>10} {'plan s':>10} {'speedup':>8} {'max |diff|':>11}")
+    for size in args.sizes:
+        df = catalog.iloc[rng.integers(0, len(catalog), size)].reset_index(drop=True)
+        expected = pandas_transform(df, prep).to_numpy()
+        max_diff = float(np.nanmax(np.abs(expected - plan.transform(df))))
+        # Input that already carries the dummies must give the same matrix
+        encoded = pre_encoded(df)
+        max_diff = max(max_diff, float(np.nanmax(np.abs(pandas_transform(encoded, prep).to_numpy()
+                                                        - plan.transform(encoded)))),
+                       float(np.nanmax(np.abs(expected - plan.transform(encoded)))))
+        pandas_time = best_time(lambda: pandas_transform(df, prep), args.repeat)
+        plan_time = best_time(lambda: plan.transform(df), args.repeat)
+        print(f"{size:>8} {pandas_time:>10.4f} {plan_time:>10.4f} {pandas_time / plan_time:>7.2f}x {max_diff:>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
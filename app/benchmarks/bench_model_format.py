@@ -0,0 +1,87 @@
+"""Load time and per-process memory: unpickling the ensemble vs mapping the exported model file.
+
+Starts N fresh processes per format, each loading the model and scoring a
+few rows, and reports load time plus resident (RSS) and proportional (PSS)
+memory. PSS splits shared pages between the processes that map them, so
+it shows what one more worker really costs.
+
+Run from the app directory (after `python main.py export-model`):
+    python benchmarks/bench_model_format.py --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.model import MAPPED_FILENAME, MODEL_FILENAME, get_model_path
+
+
+def _memory_kb():
+    """(rss, pss) of this process in kB, from /proc/self/smaps_rollup"""
+    values = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0][:-1]] = int(parts[1])
+    return values.get('Rss', 0), values.get('Pss', 0)
+
+
+def _worker(fmt, n_features, ready, release, results):
+    import joblib
+    from utils.model_format import read_model_file
+
+    rss_before, _ = _memory_kb()
+    # Unpickling also imports sklearn, LightGBM and XGBoost; that is part of what a worker pays
+    start = time.perf_counter()
+    if fmt == 'pickle':
+        model = joblib.load(get_model_path(MODEL_FILENAME))
+    else:
+        model = read_model_file(get_model_path(MAPPED_FILENAME))
+    load_seconds = time.perf_counter() - start
+    # Scoring touches every tree, so all of the model's pages are resident afterwards
+    model.predict_proba(np.random.default_rng(0).normal(size=(200, n_features)))
+    ready.put(None)
+    # Measure once every worker holds its model, so shared pages are split between them
+    release.wait()
+    rss, pss = _memory_kb()
+    results.put((load_seconds, rss - rss_before, pss))
+
+
+def run(fmt, processes, n_features):
+    context = multiprocessing.get_context('spawn')
+    ready, results, release = context.Queue(), context.Queue(), context.Event()
+    workers = [context.Process(target=_worker, args=(fmt, n_features, ready, release, results))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        ready.get()
+    release.set()
+    rows = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    from utils.model_format import read_model_file
+
+    n_features = read_model_file(get_model_path(MAPPED_FILENAME)).n_features
+    print(f"{'format':>8} {'load ms':>9} {'model RSS MB':>13} {'process PSS MB':>15}   ({args.processes} processes)")
+    for fmt in ('pickle', 'mapped'):
+        rows = np.array(run(fmt, args.processes, n_features))
+        print(f"{fmt:>8} {np.median(rows[:, 0]) * 1000:>9.1f} {np.median(rows[:, 1]) / 1024:>13.1f} "
+              f"{np.median(rows[:, 2]) / 1024:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
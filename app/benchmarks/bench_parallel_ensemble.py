@@ -0,0 +1,54 @@
+"""Exactness check and latency benchmark: VotingClassifier vs members scored in parallel.
+
+Run from the app directory:
+    python benchmarks/bench_parallel_ensemble.py --jobs rf=8 lgbm=4 xgb=4
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.model import load_model
+from utils.parallel_ensemble import ParallelEnsemble, parse_member_jobs
+from utils.preprocessing import transform_array
+from utils.synthetic import KOISampler
+
+
+def best_time(fn, repeat):
+    """Fastest of `repeat` calls, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 1000, 10000, 100000])
+    parser.add_argument('--jobs', nargs='*', default=None,
+                        help="Per-member threads, e.g. rf=8 lgbm=4 xgb=4 (default: split the cores)")
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    model = load_model()
+    parallel = ParallelEnsemble(model, None if args.jobs is None else parse_member_jobs(','.join(args.jobs)))
+    print(f"{os.cpu_count()} CPUs, member threads: {parallel.member_jobs}")
+
+    X, _ = transform_array(KOISampler().sample(max(args.sizes), seed=7))
+    print(f"{'rows':>8} {'sklearn ms':>12} {'parallel ms':>12} {'speedup':>8} {'identical':>10}")
+    for size in args.sizes:
+        batch = X[:size]
+        identical = np.array_equal(model.predict_proba(batch), parallel.predict_proba(batch))
+        sklearn_time = best_time(lambda: model.predict_proba(batch), args.repeat)
+        parallel_time = best_time(lambda: parallel.predict_proba(batch), args.repeat)
+        print(f"{size:>8} {sklearn_time * 1000:>12.2f} {parallel_time * 1000:>12.2f} "
+              f"{sklearn_time / parallel_time:>7.2f}x {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
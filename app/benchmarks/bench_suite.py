@@ -0,0 +1,190 @@
+"""Benchmark suite for the inference path on synthetic KOI workloads.
+
+Times model load, transform_data, preprocess_features,
+predict_with_preprocessing and the batch page's result building at each
+workload size, with latency, throughput and peak traced memory per case.
+
+Run from the app directory:
+    python benchmarks/bench_suite.py                   # run and print
+    python benchmarks/bench_suite.py --save-baseline   # record benchmarks/baselines.json
+    python benchmarks/bench_suite.py --check           # exit 1 on a regression against it
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.model import load_model, load_preprocessor, registry
+from utils.preprocessing import get_training_medians, predict_with_preprocessing, preprocess_features, transform_data
+from utils.streaming import build_results
+from utils.synthetic import KOISampler
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+DEFAULT_SIZES = [1, 1000, 100_000, 1_000_000]
+
+# Allowed slowdown / extra memory before --check fails, relative to the baseline
+LATENCY_TOLERANCE = 0.25
+MEMORY_TOLERANCE = 0.15
+# Differences below these are timer or allocator noise
+LATENCY_SLACK_SECONDS = 0.002
+MEMORY_SLACK_MB = 1.0
+
+
+def case_model_load(df):
+    registry.clear()
+    load_model()
+
+
+def case_transform_data(df):
+    transform_data(df)
+
+
+def case_preprocess_features(df):
+    preprocess_features(df.drop(columns=['koi_disposition']), get_training_medians(load_preprocessor()))
+
+
+def case_predict(df):
+    predict_with_preprocessing(df, use_cache=False)
+
+
+CASES = {
+    'model_load': case_model_load,
+    'transform_data': case_transform_data,
+    'preprocess_features': case_preprocess_features,
+    'predict_with_preprocessing': case_predict,
+    'build_results': None,  # needs scored arrays, set up in run_case
+}
+
+# Cases whose cost does not depend on the workload size; run once
+SIZE_INDEPENDENT = {'model_load'}
+
+
+def measure(fn, repeat, budget_seconds):
+    """(best seconds, peak traced MB): timed runs stop early once the time budget is spent"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+        if sum(timings) > budget_seconds:
+            break
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(timings), peak / (1024 * 1024)
+
+
+def run_case(name, df, repeat, budget_seconds):
+    fn = CASES[name]
+    if name == 'build_results':
+        # The table only depends on the arrays' shape, not on the model
+        confirmed = np.random.default_rng(len(df)).random(len(df))
+        probabilities = np.column_stack([1 - confirmed, confirmed])
+        predictions = (confirmed >= 0.5).astype(np.int64)
+        fn = lambda _df: build_results(predictions, probabilities)
+    seconds, peak_mb = measure(lambda: fn(df), repeat, budget_seconds)
+    rows = None if name in SIZE_INDEPENDENT else len(df)
+    return {
+        'rows': rows,
+        'seconds': round(seconds, 6),
+        'rows_per_second': round(rows / seconds, 1) if rows and seconds else None,
+        'peak_mb': round(peak_mb, 2),
+    }
+
+
+def machine_info():
+    return {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cpus': os.cpu_count(),
+    }
+
+
+def run_suite(sizes, cases, repeat, budget_seconds, report=print):
+    """Results keyed '<case>@<rows>'"""
+    sampler = KOISampler()
+    load_model()
+    results = {}
+    for size in sizes:
+        df = sampler.sample(size, seed=size)
+        for name in cases:
+            if name in SIZE_INDEPENDENT and size != sizes[0]:
+                continue
+            key = name if name in SIZE_INDEPENDENT else f"{name}@{size}"
+            results[key] = result = run_case(name, df, repeat, budget_seconds)
+            report(f"{key:<36} {result['seconds'] * 1000:>12.3f} ms {result['rows_per_second'] or 0:>14,.0f} rows/s "
+                   f"{result['peak_mb']:>10.1f} MB")
+    return results
+
+
+def compare(results, baseline, latency_tolerance=LATENCY_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """Regression messages for results slower or larger than the baseline allows"""
+    regressions = []
+    for key, base in baseline['results'].items():
+        current = results.get(key)
+        if current is None:
+            continue
+        allowed_seconds = base['seconds'] * (1 + latency_tolerance) + LATENCY_SLACK_SECONDS
+        if current['seconds'] > allowed_seconds:
+            regressions.append(f"{key}: latency {current['seconds'] * 1000:.3f} ms > "
+                               f"{allowed_seconds * 1000:.3f} ms allowed (baseline {base['seconds'] * 1000:.3f} ms)")
+        allowed_mb = base['peak_mb'] * (1 + memory_tolerance) + MEMORY_SLACK_MB
+        if current['peak_mb'] > allowed_mb:
+            regressions.append(f"{key}: peak memory {current['peak_mb']:.1f} MB > "
+                               f"{allowed_mb:.1f} MB allowed (baseline {base['peak_mb']:.1f} MB)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--budget-seconds', type=float, default=10.0,
+                        help="Stop repeating a case once its runs took this long")
+    parser.add_argument('--output', help="Also write the results as JSON to this path")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help="Record these results as the baseline")
+    parser.add_argument('--check', action='store_true', help="Exit with status 1 on a regression")
+    parser.add_argument('--latency-tolerance', type=float, default=LATENCY_TOLERANCE)
+    parser.add_argument('--memory-tolerance', type=float, default=MEMORY_TOLERANCE)
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.cases, args.repeat, args.budget_seconds)
+    document = {'machine': machine_info(), 'created_at': time.time(), 'results': results}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    if args.check:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.latency_tolerance, args.memory_tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Parity check and throughput benchmark: pickled VotingClassifier vs compiled tree engine.
+
+Run from the app directory:
+    python benchmarks/bench_tree_engine.py
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.model import load_model
+from utils.preprocessing import transform_data
+from utils.tree_engine import compile_ensemble, check_parity
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'Kepler.csv')
+
+
+def best_time(fn, repeat):
+    """Fastest of `repeat` calls, in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--atol', type=float, default=1e-6)
+    args = parser.parse_args()
+
+    model = load_model()
+    start = time.perf_counter()
+    compiled = compile_ensemble(model)
+    print(f"Compiled {compiled.n_trees} trees / {compiled.n_nodes} nodes in {time.perf_counter() - start:.2f}s")
+
+    X, _ = transform_data(pd.read_csv(DATA_PATH))
+    X = X.to_numpy(dtype=np.float64)
+    max_diff = check_parity(model, compiled, X, atol=args.atol)
+    print(f"Parity on {len(X)} catalog rows: max |dp| = {max_diff:.2e} (tolerance {args.atol:.0e})")
+
+    rng = np.random.default_rng(42)
+    print(f"{'rows':>8} {'sklearn rows/s':>16} {'compiled rows/s':>16} {'speedup':>8}")
+    for size in args.sizes:
+        batch = X[rng.integers(0, len(X), size)]
+        sklearn_time = best_time(lambda: model.predict_proba(batch), args.repeat)
+        compiled_time = best_time(lambda: compiled.predict_proba(batch), args.repeat)
+        print(f"{size:>8} {size / sklearn_time:>16,.0f} {size / compiled_time:>16,.0f} "
+              f"{sklearn_time / compiled_time:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Check: a KOI loaded into the single-prediction form scores like its catalog row.
+
+Fills the form the way 'Load into form' does, builds the model input
+with the page's form_input and scores it through predict_with_preprocessing
+next to the catalog row itself. Every pipeline run (koi_tce_delivname)
+is sampled, since the form sends it as one-hot columns, and KOIs with
+missing values are counted apart since those take the imputation path.
+
+Run from the app directory:
+    python benchmarks/check_koi_prefill.py --per-run 50    # exit 1 on a mismatch
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pages.single_predict import FLAG_FIELDS, NUMBER_FIELDS, form_input
+from utils.data_store import CATALOG, column_medians, load_frame
+from utils.koi_index import koi_record
+from utils.model import load_preprocessor
+from utils.preprocessing import get_training_medians, predict_with_preprocessing
+
+
+def prefilled_form(record, training_medians):
+    """Widget values after load_koi(row)"""
+    form = {field: float(record[field] if record[field] is not None else training_medians[field])
+            for field in NUMBER_FIELDS}
+    form.update({field: bool(record[field]) for field in FLAG_FIELDS})
+    return form
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--per-run', type=int, default=50, help="KOIs sampled per koi_tce_delivname value")
+    parser.add_argument('--atol', type=float, default=1e-9)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    catalog = load_frame(CATALOG)
+    medians = column_medians(CATALOG)
+    training_medians = get_training_medians(load_preprocessor())
+    rng = np.random.default_rng(args.seed)
+    runs = catalog['koi_tce_delivname'].fillna('(missing)')
+
+    failures = 0
+    print(f"{'pipeline run':>18} {'KOIs':>5} {'max |diff|':>11} {'with gaps':>10}")
+    for run, rows in catalog.groupby(runs).groups.items():
+        rows = rng.choice(rows, size=min(args.per_run, len(rows)), replace=False)
+        records = [koi_record(int(row)) for row in rows]
+        form_rows = [form_input(prefilled_form(record, training_medians), record, medians) for record in records]
+        _, expected, _ = predict_with_preprocessing(catalog.loc[rows], use_cache=False)
+        _, prefilled, _ = predict_with_preprocessing(pd.concat(form_rows, ignore_index=True), use_cache=False)
+        diff = np.abs(expected[:, 1] - prefilled[:, 1])
+        gaps = sum(any(record.get(field, 0) is None for field in training_medians.index) for record in records)
+        print(f"{run:>18} {len(rows):>5} {diff.max():>11.2e} {gaps:>10}")
+        if diff.max() > args.atol:
+            failures += 1
+            worst = int(np.argmax(diff))
+            print(f"FAIL: {records[worst]['kepoi_name']} scores {prefilled[worst, 1]:.4f} prefilled "
+                  f"vs {expected[worst, 1]:.4f} from the catalog")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Import-time budget for the Streamlit app's cold start.
+
+Imports pages/app.py in fresh interpreters with `python -X importtime`
+and fails if the cumulative import time goes over the budget, or if a
+library that only some pages need is imported before any page is opened.
+Also reports what opening each page adds, and the slowest imports.
+
+Run from the app directory:
+    python benchmarks/import_budget.py                 # exit 1 over budget
+    python benchmarks/import_budget.py --budget-ms 400 --top 15
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES_DIR = os.path.join(APP_DIR, 'pages')
+
+# Cold start of the router, best of --repeat runs (streamlit itself is most of it)
+COLD_START_BUDGET_MS = 500
+
+# Only imported once a page that uses them is opened
+DEFERRED_MODULES = ('sklearn', 'scipy', 'matplotlib', 'seaborn', 'PIL', 'joblib', 'lightgbm', 'xgboost')
+
+PAGE_MODULES = ('single_predict', 'batch_prediction', 'stats')
+
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def profile_imports(statement):
+    """(self us, cumulative us, indent) per module imported by statement in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        cwd=PAGES_DIR, capture_output=True, text=True,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join([PAGES_DIR, APP_DIR])),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"'{statement}' failed:\n{result.stderr[-2000:]}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)), len(match.group(3)))
+    return modules
+
+
+def cold_start(repeat):
+    """Fastest cumulative import time of the router (ms) and that run's module table"""
+    runs = []
+    for _ in range(repeat):
+        modules = profile_imports('import app')
+        runs.append((modules['app'][1] / 1000, modules))
+    return min(runs, key=lambda run: run[0])
+
+
+def page_cost(page, repeat):
+    """Extra import time (ms) of opening a page after the router is loaded"""
+    timings = []
+    for _ in range(repeat):
+        modules = profile_imports(f'import app; import {page}')
+        timings.append(modules[page][1] / 1000)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=COLD_START_BUDGET_MS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--top', type=int, default=10, help="Slowest imports to list")
+    args = parser.parse_args()
+
+    total_ms, modules = cold_start(args.repeat)
+    print(f"Cold start (import app): {total_ms:,.0f} ms (budget {args.budget_ms:,.0f} ms)")
+    print("Slowest imports made by the router:")
+    # importtime indents each module two spaces deeper than the module importing it
+    direct = [(name, cumulative) for name, (_, cumulative, depth) in modules.items() if depth == modules['app'][2] + 2]
+    for name, cumulative in sorted(direct, key=lambda item: -item[1])[:args.top]:
+        print(f"  {cumulative / 1000:>8,.1f} ms  {name}")
+
+    print("Opening a page adds:")
+    for page in PAGE_MODULES:
+        print(f"  {page_cost(page, args.repeat):>8,.0f} ms  {page}")
+
+    failures = []
+    if total_ms > args.budget_ms:
+        failures.append(f"cold start {total_ms:,.0f} ms is over the {args.budget_ms:,.0f} ms budget")
+    eager = sorted(name for name in DEFERRED_MODULES if name in modules)
+    if eager:
+        failures.append(f"imported before any page is opened: {', '.join(eager)}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""Load test: N concurrent Streamlit sessions mixing single predictions, batch uploads and stats views.
+
+Every session is a headless AppTest driver of pages/app.py. AppTest keeps a
+process-global runtime, so each session runs in its own worker process:
+sessions contend for the cores as real users do, but each holds its own
+copy of the model, so the summed memory is an upper bound for one server.
+
+Run from the app directory:
+    python benchmarks/load_test.py --sessions 8 --duration 60
+    python benchmarks/load_test.py --sessions 16 --mix single=6 batch=1 stats=3 --output load.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import multiprocessing
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.server import LatencyTracker
+from utils.synthetic import KOISampler
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'pages', 'app.py')
+
+NAVIGATION = {
+    'single': "🔭 Individual Prediction",
+    'batch': "📊 Batch Prediction",
+    'stats': "📈 Model Statistics",
+}
+DEFAULT_MIX = {'single': 6, 'batch': 1, 'stats': 3}
+
+# Required single-prediction inputs and the ranges the form accepts
+FORM_INPUTS = {
+    'koi_duration': ("Transit Duration (hours)", 0.0, 24.0),
+    'koi_depth': ("Transit Depth (ppm)", 0.0, None),
+    'koi_steff': ("Effective Temperature of the Star (K)", 2000.0, 12000.0),
+    'koi_slogg': ("Stellar Surface Gravity (log10[cm/s^2])", 0.0, 5.0),
+}
+
+SCRIPT_TIMEOUT = 300
+MEMORY_SAMPLE_SECONDS = 0.5
+
+
+def rss_mb(pid):
+    """Resident set size of a process in MB (0 once it has exited)"""
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class Session:
+    """One simulated user: a headless run of the app with its own session state"""
+
+    def __init__(self, sampler, batch_rows, seed):
+        from streamlit.testing.v1 import AppTest
+
+        self.sampler = sampler
+        self.batch_rows = batch_rows
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.app = AppTest.from_file(APP_PATH, default_timeout=SCRIPT_TIMEOUT)
+        self.page = None
+
+    def _check(self):
+        if self.app.exception:
+            raise RuntimeError(self.app.exception[0].message)
+
+    def _button(self, label):
+        for button in list(self.app.sidebar.button) + list(self.app.button):
+            if button.label == label:
+                return button
+        raise LookupError(f"No button {label!r}")
+
+    def open(self):
+        self.app.run()
+        self._check()
+
+    def navigate(self, page):
+        if self.page != page:
+            self._button(NAVIGATION[page]).click().run()
+            self._check()
+            self.page = page
+
+    def single(self):
+        """Fill the required inputs from a synthetic KOI and submit the form"""
+        self.navigate('single')
+        row = self.sampler.sample(1, seed=self.rng.getrandbits(32)).iloc[0]
+        inputs = {number_input.label: number_input for number_input in self.app.number_input}
+        for column, (label, low, high) in FORM_INPUTS.items():
+            value = float(np.clip(np.nan_to_num(row[column], nan=low), low, high if high is not None else np.inf))
+            inputs[label].set_value(value)
+        self._button("Predict").click().run()
+        self._check()
+
+    def batch(self):
+        """Upload a synthetic CSV and let the page score and plot it"""
+        self.navigate('batch')
+        df = self.sampler.sample(self.batch_rows, seed=self.rng.getrandbits(32))
+        self.app.file_uploader[0].set_value(("kois.csv", df.to_csv(index=False).encode(), "text/csv")).run()
+        self._check()
+
+    def stats(self):
+        """Open the statistics page on a random visualization section"""
+        self.navigate('stats')
+        radio = self.app.radio[0]
+        radio.set_value(self.rng.choice(radio.options)).run()
+        self._check()
+
+
+class MemorySampler(threading.Thread):
+    """Summed resident set size of the session processes over time"""
+
+    def __init__(self, pids, interval=MEMORY_SAMPLE_SECONDS):
+        super().__init__(name='memory-sampler', daemon=True)
+        self.pids = pids
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+        self._start = time.perf_counter()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            total = sum(rss_mb(pid) for pid in self.pids)
+            self.samples.append((round(time.perf_counter() - self._start, 3), total))
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def run_session(index, mix, duration, iterations, batch_rows, barrier, results):
+    """Worker process: open a session, wait for the others, then act until the deadline.
+
+    Sends back (action, seconds) timings and (action, error) pairs. A session
+    that hits an error is reopened, as a user would reload the tab.
+    """
+    timings, errors = [], []
+    sampler = KOISampler()
+
+    def open_session(seed):
+        session = Session(sampler, batch_rows, seed=seed)
+        start = time.perf_counter()
+        session.open()
+        timings.append(('open', time.perf_counter() - start))
+        return session
+
+    try:
+        session = open_session(index)
+    except Exception as e:
+        barrier.abort()
+        results.put((timings, [('open', repr(e))]))
+        return
+    try:
+        barrier.wait()
+    except threading.BrokenBarrierError:
+        # Another session could not open the app; report nothing but our own open
+        results.put((timings, errors))
+        return
+
+    actions, weights = zip(*mix.items())
+    deadline = time.perf_counter() + duration
+    done = 0
+    while time.perf_counter() < deadline and (iterations is None or done < iterations):
+        action = session.rng.choices(actions, weights)[0]
+        done += 1
+        start = time.perf_counter()
+        try:
+            getattr(session, action)()
+        except Exception as e:
+            errors.append((action, repr(e)))
+            try:
+                session = open_session(index + done * 1000)
+            except Exception as e:
+                errors.append(('open', repr(e)))
+                break
+            continue
+        timings.append((action, time.perf_counter() - start))
+    results.put((timings, errors))
+
+
+def run_load_test(sessions, duration, mix, iterations=None, batch_rows=500, report=print):
+    """Drive `sessions` concurrent sessions and summarize latency, throughput and memory"""
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(sessions + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(target=run_session, name=f'session-{i}',
+                        args=(i, mix, duration, iterations, batch_rows, barrier, results))
+        for i in range(sessions)
+    ]
+    for process in processes:
+        process.start()
+    memory = MemorySampler([process.pid for process in processes])
+    memory.start()
+
+    # The clock starts once every session has loaded the app
+    try:
+        barrier.wait()
+    except threading.BrokenBarrierError:
+        pass
+    start = time.perf_counter()
+    latency = LatencyTracker()
+    errors = []
+    for _ in processes:
+        timings, session_errors = results.get()
+        for action, seconds in timings:
+            latency.record(action, seconds)
+        errors.extend(session_errors)
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    memory.stop()
+
+    pages = latency.summary()
+    for name, stats in pages.items():
+        stats['throughput_per_second'] = round(stats['count'] / elapsed, 3)
+    rss = np.array([mb for _, mb in memory.samples])
+    summary = {
+        'sessions': sessions,
+        'cpus': os.cpu_count(),
+        'mix': mix,
+        'batch_rows': batch_rows,
+        'elapsed_seconds': round(elapsed, 3),
+        'actions': sum(stats['count'] for name, stats in pages.items() if name != 'open'),
+        'errors': len(errors),
+        'error_samples': errors[:10],
+        'pages': pages,
+        'memory_mb': {
+            'peak': round(float(rss.max()), 1),
+            'end': round(float(rss[-1]), 1),
+            'per_session_peak': round(float(rss.max()) / sessions, 1),
+            'timeline': [(t, round(mb, 1)) for t, mb in memory.samples],
+        },
+    }
+    summary['throughput_per_second'] = round(summary['actions'] / elapsed, 3)
+
+    report(f"{sessions} sessions on {summary['cpus']} CPUs for {elapsed:.1f}s: "
+           f"{summary['actions']} actions ({summary['throughput_per_second']:.2f}/s), {len(errors)} errors")
+    report(f"{'page':<8} {'count':>6} {'per s':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stats in sorted(pages.items()):
+        report(f"{name:<8} {stats['count']:>6} {stats['throughput_per_second']:>7.2f} {stats['p50_ms']:>9.1f} "
+               f"{stats['p90_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+    memory_mb = summary['memory_mb']
+    report(f"RSS of all sessions: {memory_mb['peak']:.0f} MB peak ({memory_mb['per_session_peak']:.0f} MB per session)")
+    for action, message in errors[:5]:
+        report(f"error in {action}: {message}")
+    return summary
+
+
+def parse_mix(values):
+    mix = {}
+    for value in values:
+        name, _, weight = value.partition('=')
+        if name not in NAVIGATION:
+            raise argparse.ArgumentTypeError(f"Unknown action '{name}', expected one of {sorted(NAVIGATION)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=60.0, help="Seconds to keep the sessions busy")
+    parser.add_argument('--iterations', type=int, help="Stop each session after this many actions")
+    parser.add_argument('--mix', nargs='+', default=[f"{k}={v}" for k, v in DEFAULT_MIX.items()],
+                        help="Relative action weights, e.g. single=6 batch=1 stats=3")
+    parser.add_argument('--batch-rows', type=int, default=500, help="Rows per uploaded batch CSV")
+    parser.add_argument('--output', help="Write the summary (with the memory timeline) as JSON")
+    args = parser.parse_args()
+
+    summary = run_load_test(args.sessions, args.duration, parse_mix(args.mix), args.iterations, args.batch_rows)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
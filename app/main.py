@@ -1,5 +1,209 @@
-def main():
-    print("Hello from hunting-exoplanets-ai!")
+import argparse
+import logging
+
+
+def score_command(args):
+    from utils.batch_scoring import score_files
+
+    # Unset --chunk-rows keeps score_files' default without importing the scoring stack here
+    kwargs = {} if args.chunk_rows is None else {'chunk_rows': args.chunk_rows}
+    score_files(args.inputs, args.output, workers=args.workers, backend=args.backend, **kwargs)
+
+
+def serve_command(args):
+    from utils.server import serve
+
+    serve(host=args.host, port=args.port, workers=args.workers, backend=args.backend,
+          batch_max_size=args.batch_max_size, batch_max_wait_ms=args.batch_max_wait_ms)
+
+
+def convert_data_command(args):
+    from utils.data_store import CATALOG, PROCESSED, convert, ensure_columnar
+
+    for name in (CATALOG, PROCESSED):
+        manifest = convert(name) if args.force else ensure_columnar(name)
+        print(f"{name}: {manifest['rows']:,} rows, {len(manifest['columns'])} columns (sha256 {manifest['sha256'][:12]})")
+
+    from utils.koi_index import load_index
+
+    index = load_index(CATALOG)
+    print(f"KOI index: {len(index):,} objects, {len(index.keys):,} identifiers")
+
+
+def train_command(args):
+    from utils.parallel_ensemble import parse_member_jobs
+    from utils.training import load_config, train
+
+    report = train(data_path=args.data, config=load_config(args.config), output_dir=args.output_dir,
+                   use_cache=not args.no_cache,
+                   member_jobs=parse_member_jobs(args.member_jobs) if args.member_jobs else None)
+    metrics = report['metrics']
+    print(f"Trained on {report['fit_rows']:,} rows ({report['features']} features) in {report['seconds']:.1f}s")
+    print(f"Held-out accuracy {metrics['accuracy']:.4f}, ROC AUC {metrics['roc_auc']:.4f} "
+          f"on {report['test_rows']:,} rows")
+    print(f"Stages reused: {', '.join(report['cached_stages']) or 'none'}; "
+          f"computed: {', '.join(report['computed_stages']) or 'none'}")
+    print(f"Wrote model and preprocessor to {report['output_dir']}")
+
+
+def search_command(args):
+    from utils.search import search, write_config
+    from utils.training import load_config
+
+    config, summary = search(config=load_config(args.config), members=args.members,
+                             n_candidates=args.candidates, eta=args.eta, folds=args.folds,
+                             workers=args.workers, max_rounds=args.max_rounds,
+                             checkpoint_dir=args.checkpoint_dir)
+    write_config(config, args.output)
+    print(f"{summary['trials']} trials ({summary['resumed_trials']} from the checkpoint) "
+          f"in {summary['seconds']:.1f}s")
+    for member, best in summary['best'].items():
+        print(f"{member}: CV ROC AUC {best['score']:.4f} with {best['params']}")
+    print(f"Wrote training config to {args.output} (use: python main.py train --config {args.output})")
+
+
+def update_command(args):
+    from utils.incremental import update
+
+    report = update(args.data, previous_path=args.previous, boost_rounds=args.boost_rounds,
+                    rf_trees=args.rf_trees, rf_mode=args.rf_mode, compare=not args.no_compare,
+                    install=args.install)
+    rows = report['rows']
+    print(f"Updated with {rows['delta']:,} rows ({rows['new']:,} new, {rows['changed']:,} changed) "
+          f"in {report['update_seconds']:.1f}s")
+    if 'metrics' in report:
+        metrics = report['metrics']
+        print(f"Full retrain took {report['retrain_seconds']:.1f}s; "
+              f"compared on {report['comparison_rows']:,} held-out rows none of the models trained on")
+        for name in ('accuracy', 'roc_auc', 'f1'):
+            print(f"{name:>9}: base {metrics['base'][name]:.4f}  incremental {metrics['incremental'][name]:.4f}  "
+                  f"retrain {metrics['retrain'][name]:.4f}  (delta {report['delta_vs_retrain'][name]:+.4f})")
+    print(f"Wrote bundle {report['version']} to {report['bundle']}" + (" and installed it" if args.install else ""))
+
+
+def distill_command(args):
+    from utils.distill import distill
+
+    report = distill(synthetic_rows=args.synthetic_rows, output_dir=args.output_dir)
+    print(f"Distilled on {report['distillation_rows']:,} rows in {report['fit_seconds']:.1f}s")
+    for name, result in report['fidelity'].items():
+        print(f"{name:>9}: agreement {result['agreement']:.2%}, probability MAE {result['probability_mae']:.4f}, "
+              f"near-threshold agreement {result['near_threshold_agreement']:.2%} "
+              f"({result['near_threshold_rows']:,} rows)")
+    accuracy = report['accuracy']
+    print(f" accuracy: teacher {accuracy['teacher']['accuracy']:.4f}, student {accuracy['student']['accuracy']:.4f}")
+    for name, timings in report['latency'].items():
+        print(f"{name:>14}: {timings['1_row_ms']:.3f} ms/row, {timings['1000_rows_ms']:.2f} ms per 1,000 rows")
+
+
+def export_model_command(args):
+    from utils.model_format import export_model
+
+    report = export_model(model_path=args.model, output_path=args.output, atol=args.atol)
+    print(f"Exported {report['trees']} trees / {report['nodes']:,} nodes to {report['path']} "
+          f"({report['file_bytes'] / 1e6:.1f} MB, pickle {report['pickle_bytes'] / 1e6:.1f} MB); "
+          f"{report['float32_threshold_nodes']:,} nodes with float32 thresholds")
+    print(f"Load: {report['load_seconds'] * 1000:.1f} ms mapped vs {report['pickle_load_seconds'] * 1000:.0f} ms unpickling")
+    accuracy = report['holdout_accuracy']
+    print(f"Parity on {report['parity_rows']:,} rows: max |dp| = {report['max_abs_diff']:.2e}, same labels; "
+          f"held-out accuracy {accuracy['mapped']:.4f} (pickle {accuracy['pickle']:.4f})")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='hunting-exoplanets-ai',
+        description="Exoplanet detector: headless tools for the KOI ensemble model"
+    )
+    subparsers = parser.add_subparsers(dest='command')
+
+    score = subparsers.add_parser('score', help="Score KOI CSV files without Streamlit")
+    score.add_argument('inputs', nargs='+', help="CSV files or directories of CSV files")
+    score.add_argument('-o', '--output', required=True,
+                       help="Output .csv (single input) or directory for <name>_predictions.csv")
+    score.add_argument('-w', '--workers', type=int, default=None,
+                       help="Worker processes (default: number of CPUs)")
+    score.add_argument('--chunk-rows', type=int, default=None,
+                       help="Rows sent to a worker at a time (default: 50,000)")
+    score.add_argument('--backend', choices=['sklearn', 'compiled', 'mapped', 'parallel'], default=None,
+                       help="Inference backend (default: EXOPLANET_BACKEND or sklearn)")
+    score.set_defaults(func=score_command)
+
+    server = subparsers.add_parser('serve', help="Run the local HTTP inference service")
+    server.add_argument('--host', default='127.0.0.1')
+    server.add_argument('--port', type=int, default=8765)
+    server.add_argument('-w', '--workers', type=int, default=8, help="Request handler threads")
+    server.add_argument('--backend', choices=['sklearn', 'compiled', 'mapped', 'parallel'], default=None,
+                        help="Inference backend (default: EXOPLANET_BACKEND or sklearn)")
+    server.add_argument('--batch-max-size', type=int, default=64,
+                        help="Most rows scored together by the micro-batcher")
+    server.add_argument('--batch-max-wait-ms', type=float, default=5.0,
+                        help="How long the micro-batcher waits for more requests")
+    server.set_defaults(func=serve_command)
+
+    convert_data = subparsers.add_parser('convert-data', help="Build the columnar copies of the data CSVs and the KOI index")
+    convert_data.add_argument('--force', action='store_true', help="Rebuild even if up to date")
+    convert_data.set_defaults(func=convert_data_command)
+
+    training = subparsers.add_parser('train', help="Train the ensemble and preprocessor from the KOI catalog")
+    training.add_argument('--data', default=None, help="KOI CSV (default: data/Kepler.csv)")
+    training.add_argument('--config', default=None,
+                          help="JSON overrides for the split, SMOTE and member parameters")
+    training.add_argument('--output-dir', default=None, help="Where to write the .pkl files (default: models/)")
+    training.add_argument('--member-jobs', default=None,
+                          help="Threads per member while fitting, e.g. rf=4,lgbm=2,xgb=2")
+    training.add_argument('--no-cache', action='store_true', help="Recompute every stage")
+    training.set_defaults(func=train_command)
+
+    tune = subparsers.add_parser('search', help="Successive-halving search of the ensemble members' hyperparameters")
+    tune.add_argument('-o', '--output', default='search.json', help="Training config to write")
+    tune.add_argument('--config', default=None, help="Base training config (split, SMOTE, members)")
+    tune.add_argument('--members', nargs='+', default=None, help="Members to tune (default: all)")
+    tune.add_argument('--candidates', type=int, default=27, help="Configurations per member at the first rung")
+    tune.add_argument('--eta', type=int, default=3, help="Keep 1/eta of the candidates per rung")
+    tune.add_argument('--folds', type=int, default=3, help="Cross-validation folds per trial")
+    tune.add_argument('--max-rounds', type=int, default=None,
+                      help="Budget of the last rung (default: 300 trees, 900 boosting rounds)")
+    tune.add_argument('-w', '--workers', type=int, default=None, help="Trial processes (default: number of CPUs)")
+    tune.add_argument('--checkpoint-dir', default=None,
+                      help="Where finished trials are recorded (default: models/.search/<key>)")
+    tune.set_defaults(func=search_command)
+
+    refresh = subparsers.add_parser('update', help="Update the model with new and changed rows of a refreshed catalog")
+    refresh.add_argument('data', help="Refreshed KOI CSV")
+    refresh.add_argument('--previous', default=None,
+                         help="Catalog the current model was trained on (default: from the bundle, else data/Kepler.csv)")
+    refresh.add_argument('--boost-rounds', type=int, default=30, help="Rounds added to LightGBM and XGBoost")
+    refresh.add_argument('--rf-trees', type=int, default=30, help="Forest trees grown on the new rows")
+    refresh.add_argument('--rf-mode', choices=['replace', 'add'], default='replace',
+                         help="Replace the oldest trees or add to the forest")
+    refresh.add_argument('--no-compare', action='store_true', help="Skip the full retrain used for comparison")
+    refresh.add_argument('--install', action='store_true', help="Serve the new bundle from models/")
+    refresh.set_defaults(func=update_command)
+
+    student = subparsers.add_parser('distill', help="Train the low-latency student model from the ensemble")
+    student.add_argument('--synthetic-rows', type=int, default=50_000,
+                         help="Jittered KOIs added to processed_kepler.csv for distillation")
+    student.add_argument('--output-dir', default=None, help="Where to write the student bundle (default: models/)")
+    student.set_defaults(func=distill_command)
+
+    export = subparsers.add_parser('export-model', help="Write the ensemble as a flat file that processes memory-map")
+    export.add_argument('--model', default=None, help="Pickled ensemble (default: models/ensemble_model_exoplanets.pkl)")
+    export.add_argument('-o', '--output', default=None,
+                        help="Where to write it (default: models/ensemble_model_exoplanets.trees)")
+    export.add_argument('--atol', type=float, default=1e-6, help="Largest probability difference allowed")
+    export.set_defaults(func=export_model_command)
+
+    return parser
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return
+    args.func(args)
 
 
 if __name__ == "__main__":
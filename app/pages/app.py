@@ -1,11 +1,50 @@
 import streamlit as st 
 import sys
 import os
+import importlib
+import threading
+from collections import deque
+from contextlib import nullcontext
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Path of especial variable __file__
-from single_predict import predict_single
-from batch_prediction import batch_prediction
-from stats import stats
+from utils.tracing import Profile, span, trace
+
+# Traces of the last runs that did any work, per session
+SESSION_TRACES = 20
+
+# Page -> (module next to this file, render function). A page module, and the
+# libraries it needs, is imported the first time someone opens that page.
+PAGES = {
+    "Individual Prediction": ("single_predict", "predict_single"),
+    "Batch Prediction and Plots": ("batch_prediction", "batch_prediction"),
+    "Model Statistics (General)": ("stats", "stats"),
+}
+
+
+def load_page(page):
+    """Render function of a page, importing its module on first use"""
+    module_name, function_name = PAGES[page]
+    with span(f"import:{module_name}"):
+        module = importlib.import_module(module_name)
+    return getattr(module, function_name)
+
+
+def _warm_up():
+    from utils.model import warm_up
+
+    try:
+        warm_up()
+    except FileNotFoundError:
+        # Pages report the missing model themselves
+        pass
+
+
+@st.cache_resource
+def warm_up_model():
+    """Load the model once per server process, in the background so the Home page is not held up"""
+    thread = threading.Thread(target=_warm_up, name='model-warm-up', daemon=True)
+    thread.start()
+    return thread
 
 def main_page():
     
@@ -102,21 +141,59 @@ def sidebar():
         
         return st.session_state.page
         
+def diagnostics_panel():
+    """Sidebar panel with the stage timings of this session's recent runs"""
+    with st.sidebar:
+        st.divider()
+        if not st.toggle("🩺 Diagnostics", key='diagnostics'):
+            return
+
+        import pandas as pd
+
+        traces = st.session_state.get('traces')
+        if not traces:
+            st.caption("No scoring run recorded yet")
+        else:
+            labels = [f"{t.name} ({t.seconds * 1000:,.0f} ms)" for t in reversed(traces)]
+            selected = list(reversed(traces))[labels.index(st.selectbox("Run", labels))]
+            spans = pd.DataFrame(selected.spans).sort_values('start_ms', kind='stable')
+            spans['name'] = ['· ' * depth + name for depth, name in zip(spans['depth'], spans['name'])]
+            st.dataframe(spans.drop(columns=['depth']), hide_index=True, width='stretch')
+
+        st.toggle("Profile next scoring run", key='profile_armed',
+                  help="Capture a cProfile of the next run that scores data")
+        profile = st.session_state.get('profile')
+        if profile is not None:
+            st.download_button("📥 Download profile (.prof)", data=profile['data'],
+                               file_name=f"{profile['name']}.prof", mime="application/octet-stream")
+            with st.expander("Profile summary"):
+                st.text(profile['text'])
+
+
 def main():
     
     if 'page' not in st.session_state:
         st.session_state.page = "Home"
     
+    warm_up_model()
     page = sidebar()
     
-    if page == "Home":
-        main_page()
-    elif page == "Individual Prediction":
-        predict_single()
-    elif page == "Batch Prediction and Plots":
-        batch_prediction()
-    elif 'Model Statistics (General)':
-        stats()
+    # Every run is traced; while armed, runs are also profiled until one scores data
+    # (a run is not profiled while another session's run is)
+    profiling = st.session_state.get('profile_armed', False)
+    with trace(f"page:{page}") as run_trace, (Profile() if profiling else nullcontext()) as profile:
+        if page == "Home":
+            main_page()
+        else:
+            load_page(page)()
+
+    if run_trace.spans:
+        st.session_state.setdefault('traces', deque(maxlen=SESSION_TRACES)).append(run_trace)
+    if profile is not None and profile.captured and any(s['name'].startswith('predict:') for s in run_trace.spans):
+        st.session_state.profile = {'name': run_trace.name.replace(':', '_').replace(' ', '_'),
+                                    'data': profile.dump_bytes(), 'text': profile.text()}
+        st.session_state.profile_armed = False
+    diagnostics_panel()
         
 if __name__ == "__main__":
     main()
\ No newline at end of file
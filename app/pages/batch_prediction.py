@@ -1,15 +1,220 @@
 import streamlit as st
 import pandas as pd
+import io
 import os
 import sys
-import matplotlib.pyplot as plt
-from sklearn.metrics import confusion_matrix, classification_report
-import seaborn as sns
 import numpy as np
 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils.preprocessing import predict_with_preprocessing 
+from utils.preprocessing import scoring_version
+from utils.scoring import CLASS_NAMES, score
+from utils.streaming import (DEFAULT_CHUNK_ROWS, DEFAULT_MEMORY_LIMIT_MB, CONFIDENCE_BINS, VALID_DISPOSITIONS,
+                             BatchSummary, classification_table, stream_predictions)
+from utils.tracing import span
+
+# Uploads above this size are scored in streaming mode by default
+STREAMING_THRESHOLD_MB = 50
+
+# Rows shown in the results table; the download has all of them
+PREVIEW_ROWS = 1000
+
+# Rendered charts kept per server process (three per result set)
+FIGURE_CACHE_ENTRIES = 64
+FIGURE_DPI = 200
+
+
+def streaming_settings(uploaded_file):
+    """Let the user choose between in-memory and chunked scoring"""
+    size_mb = uploaded_file.size / (1024 * 1024)
+    use_streaming = st.toggle(
+        "Streaming mode (bounded memory)",
+        value=size_mb > STREAMING_THRESHOLD_MB,
+        help="Read, score and save the file in chunks. Recommended for catalog-sized files."
+    )
+    chunk_rows = DEFAULT_CHUNK_ROWS
+    memory_limit_mb = DEFAULT_MEMORY_LIMIT_MB
+    if use_streaming:
+        with st.expander("Streaming settings"):
+            chunk_rows = st.number_input("Rows per chunk", min_value=1000, value=DEFAULT_CHUNK_ROWS, step=1000)
+            memory_limit_mb = st.number_input("Memory ceiling (MB)", min_value=64, value=DEFAULT_MEMORY_LIMIT_MB, step=64)
+    return use_streaming, int(chunk_rows), int(memory_limit_mb)
+
+
+def run_streaming(uploaded_file, chunk_rows, memory_limit_mb):
+    """Score the upload chunk by chunk; results are kept per session so reruns don't rescore"""
+    # file_id is new for every upload, even of a file with the same name and size
+    key = (uploaded_file.file_id, scoring_version(), chunk_rows, memory_limit_mb)
+    cached = st.session_state.get('streaming_result')
+    if cached is not None and cached[0] == key and os.path.exists(cached[2]):
+        return cached[1], cached[2]
+    if cached is not None and os.path.exists(cached[2]):
+        os.remove(cached[2])
+
+    progress_bar = st.progress(0.0, text="Scoring...")
+
+    def progress(fraction, rows):
+        if fraction is not None:
+            progress_bar.progress(fraction, text=f"Scored {rows:,} rows")
+
+    summary, output_path = stream_predictions(
+        uploaded_file,
+        chunk_rows=chunk_rows,
+        memory_limit_mb=memory_limit_mb,
+        total_bytes=uploaded_file.size,
+        progress=progress
+    )
+    progress_bar.empty()
+    st.session_state.streaming_result = (key, summary, output_path)
+    return summary, output_path
+
+
+def _png(fig):
+    """Render a figure once; reruns display the bytes instead of redrawing"""
+    import matplotlib.pyplot as plt
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=FIGURE_DPI, bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+# Charts are drawn from aggregates only, and cached per aggregate (i.e. per result set)
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def prediction_chart(class_counts):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    pd.Series(class_counts, index=CLASS_NAMES).plot(kind='bar', ax=ax)
+    ax.set_title("Distribution of Predictions")
+    ax.set_xlabel("Class")
+    ax.set_ylabel("Count")
+    return _png(fig)
+
+
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def confidence_chart(confidence_hist):
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots()
+    ax.stairs(confidence_hist, CONFIDENCE_BINS, fill=True)
+    ax.set_title("Distribution of Prediction Confidence")
+    ax.set_xlabel("Confidence Score")
+    ax.set_ylabel("Count")
+    return _png(fig)
+
+
+@st.cache_data(max_entries=FIGURE_CACHE_ENTRIES, show_spinner=False)
+def confusion_chart(confusion):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    sns.heatmap(confusion, annot=True, fmt='d', cmap='Blues', ax=ax,
+                xticklabels=CLASS_NAMES, yticklabels=CLASS_NAMES)
+    ax.set_title('Confusion Matrix')
+    ax.set_xlabel('Predicted')
+    ax.set_ylabel('Actual')
+    return _png(fig)
+
+
+def show_summary(summary):
+    """Charts and metrics of a scored batch, from its BatchSummary only"""
+    st.write("### 📊 Prediction Distribution")
+    with span('render:predictions'):
+        st.image(prediction_chart(summary.class_counts), width='stretch')
+
+    st.write("### 📈 Confidence Distribution")
+    with span('render:confidence'):
+        st.image(confidence_chart(summary.confidence_hist), width='stretch')
+
+    if summary.has_labels:
+        st.write("### 🎯 Model Performance")
+        with span('render:confusion'):
+            st.image(confusion_chart(summary.confusion), width='stretch')
+
+        st.write("### 📊 Classification Metrics")
+        st.dataframe(classification_table(summary.confusion).style.format(precision=2))
+        st.write(f"Overall Accuracy: {summary.accuracy:.2%}")
+
+
+def show_streaming_results(summary, output_path):
+    """Render charts and metrics from the accumulated aggregates only"""
+    if not summary.original_dispositions.empty:
+        st.write("### Original Class Distribution")
+        st.write(summary.original_dispositions)
+
+    st.write(f"### 🎯 Prediction Results ({summary.rows:,} rows, {summary.chunks} chunks)")
+    st.caption(f"Preview of the first {PREVIEW_ROWS:,} rows")
+    st.dataframe(pd.read_csv(output_path, nrows=PREVIEW_ROWS))
+
+    show_summary(summary)
+
+    with open(output_path, 'rb') as f:
+        st.download_button(
+            label="📥 Download Predictions",
+            data=f,
+            file_name="exoplanet_predictions.csv",
+            mime="text/csv"
+        )
+
+
+def preview_rows(results_df, rows=PREVIEW_ROWS):
+    """Evenly spaced rows of a large result table, keeping their row numbers"""
+    if len(results_df) <= rows:
+        return results_df
+    return results_df.iloc[np.linspace(0, len(results_df) - 1, rows).astype(np.intp)]
+
+
+def read_upload(uploaded_file):
+    """Read an upload once per file; reruns reuse the frame and its previews"""
+    key = uploaded_file.file_id
+    cached = st.session_state.get('batch_upload')
+    if cached is not None and cached['key'] == key:
+        return cached
+    # Drop the previous file's results before reading the next one
+    st.session_state.pop('batch_upload', None)
+    st.session_state.pop('batch_result', None)
+
+    uploaded_file.seek(0)
+    with span('read_csv', nbytes=uploaded_file.size):
+        df = pd.read_csv(uploaded_file)
+    upload = {'key': key, 'df': df, 'head': df.head(), 'original': None, 'filtered': None}
+    if 'koi_disposition' in df.columns:
+        upload['original'] = df['koi_disposition'].value_counts()
+        # Filter valid dispositions
+        upload['df'] = df[df['koi_disposition'].isin(VALID_DISPOSITIONS)]
+        upload['filtered'] = upload['df']['koi_disposition'].value_counts()
+    st.session_state.batch_upload = upload
+    return upload
+
+
+def score_upload(uploaded_file):
+    """Score an upload once per model version: the results table, its preview and its aggregates"""
+    upload = read_upload(uploaded_file)
+    key = (upload['key'], scoring_version())
+    cached = st.session_state.get('batch_result')
+    if cached is not None and cached['key'] == key:
+        return cached
+    if upload['df'] is None:
+        # Scored under a model that has since changed; the rows were dropped, so read them again
+        st.session_state.pop('batch_upload')
+        upload = read_upload(uploaded_file)
+
+    # Probabilities are computed once; labels follow from the threshold policy
+    result = score(upload['df'])
+    with span('build_results', rows=len(result)):
+        results_df = result.to_frame()
+    summary = BatchSummary()
+    with span('aggregate', rows=len(result)):
+        summary.update(results_df, result.predictions, result.true_labels)
+    batch = {'key': key, 'results': results_df, 'preview': preview_rows(results_df),
+             'summary': summary, 'csv': None}
+    st.session_state.batch_result = batch
+    # The raw rows are not needed once they are scored
+    upload['df'] = None
+    return batch
+
 
 def batch_prediction():
     st.title("Batch Prediction")
@@ -29,88 +234,47 @@ def batch_prediction():
     uploaded_file = st.file_uploader("Upload your CSV file", type=['csv'])
     
     if uploaded_file:
+        use_streaming, chunk_rows, memory_limit_mb = streaming_settings(uploaded_file)
+        if use_streaming:
+            try:
+                summary, output_path = run_streaming(uploaded_file, chunk_rows, memory_limit_mb)
+                show_streaming_results(summary, output_path)
+            except Exception as e:
+                st.error(f"Prediction error: {str(e)}")
+                st.write("Please check the input data format and try again.")
+            return
+
         try:
             # Load and display raw data
-            df = pd.read_csv(uploaded_file)
+            upload = read_upload(uploaded_file)
             st.write("### 📊 Raw Data Preview")
-            st.dataframe(df.head())
+            st.dataframe(upload['head'])
 
-            # Store true labels if they exist
-            true_labels = None
-            if 'koi_disposition' in df.columns:
+            if upload['original'] is not None:
                 st.write("### Original Class Distribution")
-                st.write(df['koi_disposition'].value_counts())
-                
-                # Filter valid dispositions
-                df = df[df['koi_disposition'].isin(['CANDIDATE', 'CONFIRMED'])]
-                true_labels = df['koi_disposition'].map({'CANDIDATE': 0, 'CONFIRMED': 1})
-                
+                st.write(upload['original'])
                 st.write("### Filtered Class Distribution")
-                st.write(df['koi_disposition'].value_counts())
+                st.write(upload['filtered'])
 
             try:
-                # Use the preprocessing utility to get predictions
-                predictions, probabilities, preprocessed_true_labels = predict_with_preprocessing(df)
-                
-                # Create results dataframe
-                results_df = pd.DataFrame({
-                    'Prediction': ['CONFIRMED' if p == 1 and prob[1] >= 0.55 else 'CANDIDATE' 
-                                 for p, prob in zip(predictions, probabilities)],
-                    'Confidence': np.max(probabilities, axis=1),
-                    'CANDIDATE_Probability': probabilities[:, 0],
-                    'CONFIRMED_Probability': probabilities[:, 1]
-                })
+                batch = score_upload(uploaded_file)
+                results_df = batch['results']
                 
                 # Display results
-                st.write("### 🎯 Prediction Results")
-                st.dataframe(results_df)
-                
-                # Show prediction distribution
-                st.write("### 📊 Prediction Distribution")
-                pred_counts = results_df['Prediction'].value_counts()
-                fig, ax = plt.subplots()
-                pred_counts.plot(kind='bar')
-                plt.title("Distribution of Predictions")
-                plt.xlabel("Class")
-                plt.ylabel("Count")
-                st.pyplot(fig)
-                
-                # Show confidence distribution
-                st.write("### 📈 Confidence Distribution")
-                fig, ax = plt.subplots()
-                plt.hist(results_df['Confidence'], bins=20)
-                plt.title("Distribution of Prediction Confidence")
-                plt.xlabel("Confidence Score")
-                plt.ylabel("Count")
-                st.pyplot(fig)
-                
-                # Create confusion matrix if true labels exist
-                if preprocessed_true_labels is not None:
-                    st.write("### 🎯 Model Performance")
-                    cm = confusion_matrix(preprocessed_true_labels, predictions)
-                    
-                    fig, ax = plt.subplots(figsize=(8, 6))
-                    sns.heatmap(cm, annot=True, fmt='d', cmap='Blues',
-                              xticklabels=['CANDIDATE', 'CONFIRMED'],
-                              yticklabels=['CANDIDATE', 'CONFIRMED'])
-                    plt.title('Confusion Matrix')
-                    plt.xlabel('Predicted')
-                    plt.ylabel('Actual')
-                    st.pyplot(fig)
-                    
-                    st.write("### 📊 Classification Metrics")
-                    report = classification_report(true_labels, predictions,
-                                                target_names=['CANDIDATE', 'CONFIRMED'])
-                    st.text(report)
-                    
-                    accuracy = (cm[0,0] + cm[1,1]) / cm.sum()
-                    st.write(f"Overall Accuracy: {accuracy:.2%}")
+                st.write(f"### 🎯 Prediction Results ({len(results_df):,} rows)")
+                if len(batch['preview']) < len(results_df):
+                    st.caption(f"Preview of {len(batch['preview']):,} evenly spaced rows; "
+                               "download the predictions for all of them")
+                st.dataframe(batch['preview'])
+
+                show_summary(batch['summary'])
                 
-                # Download results
-                csv = results_df.to_csv(index=False)
+                # Download results (serialized on the first rerun that shows the button)
+                if batch['csv'] is None:
+                    batch['csv'] = results_df.to_csv(index=False)
                 st.download_button(
                     label="📥 Download Predictions",
-                    data=csv,
+                    data=batch['csv'],
                     file_name="exoplanet_predictions.csv",
                     mime="text/csv"
                 )
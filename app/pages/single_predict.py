@@ -3,17 +3,28 @@ import numpy as np
 import pandas as pd
 import sys
 import os
-import joblib
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # Path of especial variable __file__
 
-from utils.preprocessing import predict_with_preprocessing 
+from utils.batching import get_batcher
+from utils.model import STUDENT_FILENAME, get_model_path, load_preprocessor
+from utils.preprocessing import get_training_medians
+from utils.data_store import CATALOG, column_medians
+from utils.feature_plan import DELIVNAME_PREFIX
+from utils.koi_index import koi_record, load_index
+from utils.scoring import VERDICT_CONFIRMED, VERDICT_UNCERTAIN, ScoreResult
+from utils.tracing import span
+
+# Form inputs a looked-up KOI fills in (widget key = catalog column)
+NUMBER_FIELDS = ['koi_duration', 'koi_depth', 'koi_steff', 'koi_slogg', 'koi_period', 'koi_impact', 'koi_teq',
+                 'koi_prad', 'koi_insol', 'koi_srad', 'ra', 'dec', 'koi_kepmag']
+FLAG_FIELDS = ['koi_fpflag_nt', 'koi_fpflag_ss', 'koi_fpflag_co', 'koi_fpflag_ec']
 
 
 def get_default_values():
     try:
-        df = pd.read_csv('../data/Kepler.csv')
-        return df.median(numeric_only=True)
+        # Catalog medians, from the columnar copy and cached until Kepler.csv changes
+        return column_medians(CATALOG)
     except Exception as e:
         st.error(f"Error loading default values: {str(e)}")
         return None    
@@ -21,8 +32,7 @@ def get_default_values():
 def get_preprocessor_features():
     """Get the exact feature order from the preprocessor"""
     try:
-        preprocessor = joblib.load('../models/preprocessor.pkl')
-        return preprocessor['features']
+        return load_preprocessor()['features']
     except Exception as e:
         st.error(f"Error loading preprocessor features: {str(e)}")
         return None
@@ -46,6 +56,149 @@ def create_ordered_features(input_data):
     
     return ordered_data
 
+def load_koi(row):
+    """Put a catalog KOI's values into the form; fields the form lacks come from the same record"""
+    record = koi_record(row)
+    # Values the KOI lacks show the training median, which the model would impute for them
+    training_medians = get_training_medians(load_preprocessor())
+    for field in NUMBER_FIELDS:
+        value = record[field]
+        st.session_state[field] = float(value if value is not None else training_medians[field])
+    for field in FLAG_FIELDS:
+        st.session_state[field] = bool(record[field])
+    st.session_state.koi_record = record
+
+
+def clear_koi():
+    st.session_state.pop('koi_record', None)
+    for field in NUMBER_FIELDS + FLAG_FIELDS:
+        st.session_state.pop(field, None)
+
+
+def koi_lookup():
+    """Typeahead search over the catalog's KOI identifiers"""
+    try:
+        index = load_index()
+    except Exception as e:
+        st.error(f"Error loading the KOI index: {str(e)}")
+        return
+
+    query = st.text_input("🔎 Find a known KOI", key='koi_query',
+                          placeholder="K00752.01, Kepler-227 b or KIC 10797460",
+                          help="Loads the object's catalog values, including their uncertainties, into the form")
+    if query:
+        rows = index.search(query)
+        if rows:
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                row = st.selectbox("Matches", rows, format_func=index.label, key='koi_match')
+            with col2:
+                st.button("Load into form", on_click=load_koi, args=(row,))
+        else:
+            st.caption("No KOI matches")
+
+    record = st.session_state.get('koi_record')
+    if record is not None:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.caption(f"Loaded {record['kepoi_name']} ({record['koi_disposition']}); "
+                       "fields not shown in the form use its catalog values")
+        with col2:
+            st.button("Clear", on_click=clear_koi)
+
+
+def _bound(field, limit, upper=True):
+    """Widget limit, widened when a loaded catalog value lies outside it"""
+    value = st.session_state.get(field)
+    if value is None:
+        return limit
+    return max(limit, value) if upper else min(limit, value)
+
+
+def form_input(form, record, default_values):
+    """Model input of the form: the widget values by field, plus a looked-up KOI's record (or {})"""
+    # A looked-up KOI's own values replace the catalog medians; the ones it lacks are
+    # left missing, so they are imputed exactly as for the KOI's catalog row
+    def fallback(field):
+        if field in record:
+            return record[field] if record[field] is not None else np.nan
+        return default_values[field]
+
+    # Default Values
+    input_data = {
+        'koi_duration': form['koi_duration'],
+        'koi_depth': form['koi_depth'],
+        'koi_steff': form['koi_steff'],
+        'koi_slogg': form['koi_slogg'],
+    }
+
+    optional_params = {
+        'koi_period': form['koi_period'] if form['koi_period'] != 0.0 else fallback('koi_period'),
+        'koi_impact': form['koi_impact'] if form['koi_impact'] != 0.0 else fallback('koi_impact'),
+        'koi_teq': form['koi_teq'] if form['koi_teq'] != 0.0 else fallback('koi_teq'),
+        'koi_prad': form['koi_prad'] if form['koi_prad'] != 0.0 else fallback('koi_prad'),
+        'koi_insol': form['koi_insol'] if form['koi_insol'] != 0.0 else fallback('koi_insol'),
+        'koi_srad': form['koi_srad'] if form['koi_srad'] != 0.0 else fallback('koi_srad'),
+        'ra': form['ra'] if form['ra'] != 0.0 else fallback('ra'),
+        'dec': form['dec'] if form['dec'] != 0.0 else fallback('dec'),
+        'koi_kepmag': form['koi_kepmag'] if form['koi_kepmag'] != 0.0 else fallback('koi_kepmag'),
+        'koi_fpflag_nt': int(form['koi_fpflag_nt']),
+        'koi_fpflag_ss': int(form['koi_fpflag_ss']),
+        'koi_fpflag_co': int(form['koi_fpflag_co']),
+        'koi_fpflag_ec': int(form['koi_fpflag_ec'])
+    }
+
+    default_fields = {
+        'koi_period_err1': fallback('koi_period_err1'),
+        'koi_period_err2': fallback('koi_period_err2'),
+        'koi_time0bk': fallback('koi_time0bk'),
+        'koi_time0bk_err1': fallback('koi_time0bk_err1'),
+        'koi_time0bk_err2': fallback('koi_time0bk_err2'),
+        'koi_impact_err1': fallback('koi_impact_err1'),
+        'koi_impact_err2': fallback('koi_impact_err2'),
+        'koi_duration_err1': fallback('koi_duration_err1'),
+        'koi_duration_err2': fallback('koi_duration_err2'),
+        'koi_depth_err1': fallback('koi_depth_err1'),
+        'koi_depth_err2': fallback('koi_depth_err2'),
+        'koi_prad_err1': fallback('koi_prad_err1'),
+        'koi_prad_err2': fallback('koi_prad_err2'),
+        'koi_insol_err1': fallback('koi_insol_err1'),
+        'koi_insol_err2': fallback('koi_insol_err2'),
+        'koi_steff_err1': fallback('koi_steff_err1'),
+        'koi_steff_err2': fallback('koi_steff_err2'),
+        'koi_slogg_err1': fallback('koi_slogg_err1'),
+        'koi_slogg_err2': fallback('koi_slogg_err2'),
+        'koi_srad_err1': fallback('koi_srad_err1'),
+        'koi_srad_err2': fallback('koi_srad_err2'),
+        'koi_model_snr': fallback('koi_model_snr'),
+        'koi_tce_delivname_q1_q16_tce': 1,  # Changed this line
+        'koi_tce_delivname_q1_q17_dr24_tce': 0  # Changed this line
+    }
+    if record:
+        # One-hot of the loaded KOI's pipeline run; q1_q17_dr25 and missing runs set neither
+        delivname = f"{DELIVNAME_PREFIX}{record['koi_tce_delivname']}"
+        for field in ('koi_tce_delivname_q1_q16_tce', 'koi_tce_delivname_q1_q17_dr24_tce'):
+            default_fields[field] = int(field == delivname)
+
+    input_data.update(optional_params)
+    input_data.update(default_fields)
+
+    input_data['depth_duration_ratio'] = input_data['koi_depth'] / (input_data['koi_duration'] + 1e-6)
+    input_data['insol_prad_ratio'] = input_data['koi_insol'] / (input_data['koi_prad'] + 1e-6)
+    input_data['stellar_luminosity_proxy'] = input_data['koi_steff'] * (input_data['koi_srad'] ** 2)
+
+    return create_ordered_features(input_data)
+
+
+def model_tier_choice():
+    """Full ensemble, or the distilled student when one has been trained"""
+    if not os.path.exists(get_model_path(STUDENT_FILENAME)):
+        return 'full'
+    choice = st.radio("Model", ["Full ensemble", "Fast (distilled)"],
+                      help="The distilled model answers faster and agrees with the ensemble on most KOIs "
+                           "(see models/student_report.json)")
+    return 'student' if choice == "Fast (distilled)" else 'full'
+
 def predict_single():
     st.title("Individual Prediction")
     col1, col2 = st.columns([2,1])
@@ -58,7 +211,10 @@ def predict_single():
         """)
     with col2:
         st.warning("⚠️ Default values are used for unfilled fields")
+        tier = model_tier_choice()
     
+    koi_lookup()
+
     try:
         # User inputs in a form
         with st.form("prediction_form"):
@@ -69,54 +225,58 @@ def predict_single():
                 return
             
             st.subheader("Required Parameters")
-            koi_duration = st.number_input(
+            st.number_input(
                 "Transit Duration (hours)", 
                 min_value=0.0, 
-                max_value=24.0,
+                max_value=_bound('koi_duration', 24.0),
+                key='koi_duration',
                 help="Time it takes for the planet to cross in front of its star"
             )
             
-            koi_depth = st.number_input(
+            st.number_input(
                 "Transit Depth (ppm)",
                 min_value=0.0,
+                key='koi_depth',
                 help="Decrease in the brightness of the star during transit"
             )
             
-            koi_steff = st.number_input(
+            st.number_input(
                 "Effective Temperature of the Star (K)",
-                min_value=2000.0,
-                max_value=12000.0,
+                min_value=_bound('koi_steff', 2000.0, upper=False),
+                max_value=_bound('koi_steff', 12000.0),
+                key='koi_steff',
                 help="Surface temperature of the star"
             )
             
-            koi_slogg = st.number_input(
+            st.number_input(
                 "Stellar Surface Gravity (log10[cm/s^2])",
                 min_value=0.0,
-                max_value=5.0,
+                max_value=_bound('koi_slogg', 5.0),
+                key='koi_slogg',
                 help="Measurement of gravity on the surface of the star"
             )
             
             # Optional Parameters in Expanders
             with st.expander("Orbital Parameters"):
-                koi_period = st.number_input("Orbital Period (days)", value=0.0)
-                koi_impact = st.number_input("Impact Parameter", value=0.0)
-                koi_teq = st.number_input("Equilibrium Temperature (K)", value=0.0)
+                st.number_input("Orbital Period (days)", key='koi_period')
+                st.number_input("Impact Parameter", key='koi_impact')
+                st.number_input("Equilibrium Temperature (K)", key='koi_teq')
                 
             with st.expander("Planet Parameters"):
-                koi_prad = st.number_input("Planet Radius (Earth radii)", value=0.0)
-                koi_insol = st.number_input("Insolation Flux (Earth flux)", value=0.0)
+                st.number_input("Planet Radius (Earth radii)", key='koi_prad')
+                st.number_input("Insolation Flux (Earth flux)", key='koi_insol')
                 
             with st.expander("Star Parameters"):
-                koi_srad = st.number_input("Stellar Radius (Solar radii)", value=0.0)
-                ra = st.number_input("Right Ascension", value=0.0)
-                dec = st.number_input("Declination", value=0.0)
-                koi_kepmag = st.number_input("Kepler Magnitude", value=0.0)
+                st.number_input("Stellar Radius (Solar radii)", key='koi_srad')
+                st.number_input("Right Ascension", key='ra')
+                st.number_input("Declination", key='dec')
+                st.number_input("Kepler Magnitude", key='koi_kepmag')
 
             with st.expander("Flag Parameters"):
-                koi_fpflag_nt = st.checkbox("NT Flag")
-                koi_fpflag_ss = st.checkbox("SS Flag")
-                koi_fpflag_co = st.checkbox("CO Flag")
-                koi_fpflag_ec = st.checkbox("EC Flag")
+                st.checkbox("NT Flag", key='koi_fpflag_nt')
+                st.checkbox("SS Flag", key='koi_fpflag_ss')
+                st.checkbox("CO Flag", key='koi_fpflag_co')
+                st.checkbox("EC Flag", key='koi_fpflag_ec')
                 
             
             submitted = st.form_submit_button("Predict")
@@ -129,71 +289,13 @@ def predict_single():
                     if default_values is None:
                         st.error("Could not load default values")
                         return
-               
-                    # Default Values
-                    input_data = {
-                        'koi_duration': koi_duration,
-                        'koi_depth': koi_depth,
-                        'koi_steff': koi_steff,
-                        'koi_slogg': koi_slogg,
-                    }
-                    
-                    optional_params = {
-                        'koi_period': koi_period if koi_period != 0.0 else default_values['koi_period'],
-                        'koi_impact': koi_impact if koi_impact != 0.0 else default_values['koi_impact'],
-                        'koi_teq': koi_teq if koi_teq != 0.0 else default_values['koi_teq'],
-                        'koi_prad': koi_prad if koi_prad != 0.0 else default_values['koi_prad'],
-                        'koi_insol': koi_insol if koi_insol != 0.0 else default_values['koi_insol'],
-                        'koi_srad': koi_srad if koi_srad != 0.0 else default_values['koi_srad'],
-                        'ra': ra if ra != 0.0 else default_values['ra'],
-                        'dec': dec if dec != 0.0 else default_values['dec'],
-                        'koi_kepmag': koi_kepmag if koi_kepmag != 0.0 else default_values['koi_kepmag'],
-                        'koi_fpflag_nt': int(koi_fpflag_nt),
-                        'koi_fpflag_ss': int(koi_fpflag_ss),
-                        'koi_fpflag_co': int(koi_fpflag_co),
-                        'koi_fpflag_ec': int(koi_fpflag_ec)
-                    }
-                    
-                    default_fields = {
-                        'koi_period_err1': default_values['koi_period_err1'],
-                        'koi_period_err2': default_values['koi_period_err2'],
-                        'koi_time0bk': default_values['koi_time0bk'],
-                        'koi_time0bk_err1': default_values['koi_time0bk_err1'],
-                        'koi_time0bk_err2': default_values['koi_time0bk_err2'],
-                        'koi_impact_err1': default_values['koi_impact_err1'],
-                        'koi_impact_err2': default_values['koi_impact_err2'],
-                        'koi_duration_err1': default_values['koi_duration_err1'],
-                        'koi_duration_err2': default_values['koi_duration_err2'],
-                        'koi_depth_err1': default_values['koi_depth_err1'],
-                        'koi_depth_err2': default_values['koi_depth_err2'],
-                        'koi_prad_err1': default_values['koi_prad_err1'],
-                        'koi_prad_err2': default_values['koi_prad_err2'],
-                        'koi_insol_err1': default_values['koi_insol_err1'],
-                        'koi_insol_err2': default_values['koi_insol_err2'],
-                        'koi_steff_err1': default_values['koi_steff_err1'],
-                        'koi_steff_err2': default_values['koi_steff_err2'],
-                        'koi_slogg_err1': default_values['koi_slogg_err1'],
-                        'koi_slogg_err2': default_values['koi_slogg_err2'],
-                        'koi_srad_err1': default_values['koi_srad_err1'],
-                        'koi_srad_err2': default_values['koi_srad_err2'],
-                        'koi_model_snr': default_values['koi_model_snr'],
-                        'koi_tce_delivname_q1_q16_tce': 1,  # Changed this line
-                        'koi_tce_delivname_q1_q17_dr24_tce': 0  # Changed this line
-                    }
-                    
-                    input_data.update(optional_params)
-                    input_data.update(default_fields)
-                    
-                    input_data['depth_duration_ratio'] = input_data['koi_depth'] / (input_data['koi_duration'] + 1e-6)
-                    input_data['insol_prad_ratio'] = input_data['koi_insol'] / (input_data['koi_prad'] + 1e-6)
-                    input_data['stellar_luminosity_proxy'] = input_data['koi_steff'] * (input_data['koi_srad'] ** 2)
-                    
-                    features = create_ordered_features(input_data)
+
+                    # Widget keys are the catalog columns
+                    form = {field: st.session_state[field] for field in NUMBER_FIELDS + FLAG_FIELDS}
+                    features = form_input(form, st.session_state.get('koi_record') or {}, default_values)
                     st.write("Debug: Feature order check")
                     st.write(features.columns.tolist())
                     
-                    features = create_ordered_features(input_data)
-                    
                     # Debug information
                     '''
                     st.write("### Debug Information")
@@ -202,24 +304,24 @@ def predict_single():
                     for i, col in enumerate(features.columns):
                         st.write(f"{i+1}. {col}")
                     '''
-                    predictions, probabilities, _ = predict_with_preprocessing(features)
-                    predictions, probabilities, _ = predict_with_preprocessing(features)
-                    prediction = predictions[0]
-                    probability = probabilities[0]
+                    # Scored together with concurrent requests from other sessions
+                    with span('micro_batch', rows=1):
+                        result = ScoreResult.from_arrays(*get_batcher(tier).predict(features))
+                    verdict = result.verdicts[0]
+                    probability = result.probabilities[0]
             
                     # Show results in an expander
                     with st.expander("Prediction Results", expanded=True):
-                        confidence_threshold = 0.55
+                        confidence_threshold = result.policy.confirmed_threshold
                         exoplanet_probability = probability[1]
                         
-                        if prediction == 1 and exoplanet_probability >= confidence_threshold:
+                        if verdict == VERDICT_CONFIRMED:
                             st.success(f"Possible Exoplanet! (Confidence: {exoplanet_probability:.2%})")
                             st.balloons()
+                        elif verdict == VERDICT_UNCERTAIN:
+                            st.warning(f"Uncertain Classification - More Data Needed (Confidence: {exoplanet_probability:.2%})")
                         else:
-                            if prediction == 1:
-                                st.warning(f"Uncertain Classification - More Data Needed (Confidence: {exoplanet_probability:.2%})")
-                            else:
-                                st.error(f"Probably not an exoplanet (Confidence: {probability[0]:.2%})")
+                            st.error(f"Probably not an exoplanet (Confidence: {probability[0]:.2%})")
                         
                         # Show additional details
                         st.write("---")
@@ -1,12 +1,88 @@
 import streamlit as st
 import pandas as pd
-import io
-from PIL import Image
+import sys
 import os
 
-def load_image(image_path):
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.assets import download_bytes, image_bytes
+from utils.data_store import CATALOG
+from utils.evaluation import get_evaluation
+
+VISUALIZATION_SECTIONS = [
+    "Data Balance & ROC",
+    "Correlations & Interactions",
+    "Confusion Matrix & PR Curve",
+    "Metrics & Probabilities",
+]
+
+METRIC_LABELS = {
+    'accuracy': "Accuracy",
+    'recall': "Recall",
+    'precision': "Precision",
+    'f1': "F1 Score",
+    'roc_auc': "ROC AUC",
+}
+
+CLASS_LABELS = ["CANDIDATE", "CONFIRMED"]
+
+TIER_LABELS = {'full': "full ensemble", 'student': "distilled student model"}
+
+def load_evaluation():
+    """Held-out evaluation of the model tier predictions use (computed once per model version)"""
+    try:
+        return get_evaluation()
+    except Exception as e:
+        st.error(f"Error evaluating model: {str(e)}")
+        return None
+
+def evaluated_model(report):
+    """Which model the metrics belong to, e.g. 'full ensemble (a4d73c339f7d-8f74f114696f:sklearn)'"""
+    tier = report.get('tier', 'full')
+    return f"{TIER_LABELS.get(tier, tier)} ({report.get('model_version', report.get('key', 'unknown version'))})"
+
+def percent(report, metric):
+    return f"{report['metrics'][metric]:.2%}" if report else "n/a"
+
+def show_chart_or_image(report, chart, filename):
+    """Draw the chart from the evaluation report, or the exported image without one"""
+    if report:
+        chart(report)
+        return
+    image = load_image(filename)
+    if image:
+        st.image(image, width='stretch')
+
+def roc_chart(report):
+    curves = report['curves']
+    st.line_chart(pd.DataFrame({'False Positive Rate': curves['fpr'], 'True Positive Rate': curves['tpr']}),
+                  x='False Positive Rate', y='True Positive Rate')
+
+def pr_chart(report):
+    curves = report['curves']
+    st.line_chart(pd.DataFrame({'Recall': curves['recall'], 'Precision': curves['precision']}),
+                  x='Recall', y='Precision')
+
+def confusion_table(report):
+    st.dataframe(pd.DataFrame(report['confusion'],
+                              index=[f"Actual {label}" for label in CLASS_LABELS],
+                              columns=[f"Predicted {label}" for label in CLASS_LABELS]),
+                 width='stretch')
+
+def metrics_chart(report):
+    metrics = report['metrics']
+    st.bar_chart(pd.Series({label: metrics[name] for name, label in METRIC_LABELS.items()}, name="Score"))
+
+def probability_chart(report):
+    histogram = report['histogram']
+    edges = histogram['edges']
+    centers = [f"{(low + high) / 2:.3f}" for low, high in zip(edges[:-1], edges[1:])]
+    st.bar_chart(pd.DataFrame(dict(zip(CLASS_LABELS, histogram['counts'])), index=centers), stack=False,
+                 x_label="CONFIRMED probability", y_label="Count")
+
+def load_image(filename):
+    """Encoded image bytes, decoded and size-fitted once per process"""
     try:
-        return Image.open(image_path)
+        return image_bytes(filename)
     except Exception as e:
         st.error(f"Error loading image: {str(e)}")
         return None
@@ -74,19 +150,14 @@ def stats():
         col1, col2 = st.columns(2)
         
         with col1:
-            # Load and prepare Kepler data for download
+            # Serve the file bytes straight from disk (cached per file version)
             try:
-                df = pd.read_csv('../data/Kepler.csv')
-                # Convert dataframe to CSV string
-                csv_buffer = io.StringIO()
-                df.to_csv(csv_buffer, index=False)
-                csv_str = csv_buffer.getvalue()
-                
+                compress = st.checkbox("Compress (gzip)", value=False)
                 st.download_button(
                     label="📊 Download Kepler Dataset (CSV)",
-                    data=csv_str,
-                    file_name="kepler_data.csv",
-                    mime="text/csv",
+                    data=download_bytes(CATALOG, compress=compress),
+                    file_name="kepler_data.csv.gz" if compress else "kepler_data.csv",
+                    mime="application/gzip" if compress else "text/csv",
                     help="Download the original Kepler Space Telescope dataset"
                 )
             except Exception as e:
@@ -173,82 +244,53 @@ def stats():
         </style>
     """, unsafe_allow_html=True)
 
-    col1, col2, col3, col4,col5 = st.columns(5)
-
-    with col1:
-        st.markdown("""
-            <div class="metric-card">
-                <div class="metric-value">87.45%</div>
-                <div class="metric-label">Accuracy</div>
-            </div>
-        """, unsafe_allow_html=True)
-
-    with col2:
-        st.markdown("""
-            <div class="metric-card">
-                <div class="metric-value">89.56%</div>
-                <div class="metric-label">Recall</div>
-            </div>
-        """, unsafe_allow_html=True)
-
-    with col3:
-        st.markdown("""
-            <div class="metric-card">
-                <div class="metric-value">88.92%</div>
-                <div class="metric-label">Precision</div>
-            </div>
-        """, unsafe_allow_html=True)
-
-    with col4:
-        st.markdown("""
-            <div class="metric-card">
-                <div class="metric-value">89.24%</div>
-                <div class="metric-label">F1 Score</div>
-            </div>
-        """, unsafe_allow_html=True)
-    
-    with col5:
-        st.markdown("""
-            <div class="metric-card">
-                <div class="metric-value">94.05%</div>
-                <div class="metric-label">ROC AUC</div>
-            </div>
-        """, unsafe_allow_html=True)
+    # Metrics of the model tier predictions use, on the held-out split
+    report = load_evaluation()
+    if report:
+        st.caption(f"Held-out metrics of the {evaluated_model(report)}")
+    for col, (metric, label) in zip(st.columns(5), METRIC_LABELS.items()):
+        with col:
+            st.markdown(f"""
+                <div class="metric-card">
+                    <div class="metric-value">{percent(report, metric)}</div>
+                    <div class="metric-label">{label}</div>
+                </div>
+            """, unsafe_allow_html=True)
         
-    st.markdown("""
+    st.markdown(f"""
     <div class='highlight-box' style='margin-top: 20px;'>
         <h4 style='color: #FF4B4B;'>📊 Understanding the Metrics</h4>
         <div style='display: grid; grid-template-columns: repeat(2, 1fr); gap: 20px;'>
             <div>
-                <h5 style='color: #15B3AC;'>Accuracy (87.45%)</h5>
+                <h5 style='color: #15B3AC;'>Accuracy ({percent(report, 'accuracy')})</h5>
                 <p style='color: white;'>
                     Overall correctness of predictions. Represents the proportion of both correct exoplanet 
                     identifications and correct rejections out of all cases.
                 </p>
             </div>
             <div>
-                <h5 style='color: #15B3AC;'>Recall (89.56%)</h5>
+                <h5 style='color: #15B3AC;'>Recall ({percent(report, 'recall')})</h5>
                 <p style='color: white;'>
                     Also known as Sensitivity. Shows how well the model identifies actual exoplanets, 
                     representing the percentage of real exoplanets correctly identified.
                 </p>
             </div>
             <div>
-                <h5 style='color: #15B3AC;'>Precision (88.92%)</h5>
+                <h5 style='color: #15B3AC;'>Precision ({percent(report, 'precision')})</h5>
                 <p style='color: white;'>
                     Indicates prediction quality. Of all objects our model identified as exoplanets, 
                     this percentage were actually confirmed exoplanets.
                 </p>
             </div>
             <div>
-                <h5 style='color: #15B3AC;'>F1 Score (89.24%)</h5>
+                <h5 style='color: #15B3AC;'>F1 Score ({percent(report, 'f1')})</h5>
                 <p style='color: white;'>
                     Harmonic mean of Precision and Recall. Provides a single score that balances both metrics, 
                     particularly useful when seeking a balanced model performance.
                 </p>
             </div>
             <div>
-                <h5 style='color: #15B3AC;'>ROC AUC (94.05%)</h5>
+                <h5 style='color: #15B3AC;'>ROC AUC ({percent(report, 'roc_auc')})</h5>
                 <p style='color: white;'>
                     Area Under the ROC Curve. Measures the model's ability to distinguish between classes. 
                     Our score indicates excellent discrimination capability.
@@ -293,201 +335,199 @@ def stats():
     # Start grid layout - Replace all your current visualization sections with this
     st.markdown('<div class="grid-container">', unsafe_allow_html=True)
 
-        # Row 1: Class Distribution and ROC Curve
-    col1, col2 = st.columns(2)
-    with col1:
-        st.markdown("""
-            <div class="grid-item">
-                <h2 style='color: #15B3AC;'>1️⃣ Class Distribution Analysis</h2>
-            </div>
-        """, unsafe_allow_html=True)
+    # Only the selected section is rendered, so only its two images are loaded
+    section = st.radio("Visualizations", VISUALIZATION_SECTIONS, horizontal=True)
+
+    # Row 1: Class Distribution and ROC Curve
+    if section == VISUALIZATION_SECTIONS[0]:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("""
+                <div class="grid-item">
+                    <h2 style='color: #15B3AC;'>1️⃣ Class Distribution Analysis</h2>
+                </div>
+            """, unsafe_allow_html=True)
         
-        image = load_image("../images/Smote.jpeg")
-        if image:
-            st.image(image, use_container_width=True)
+            image = load_image("Smote.jpeg")
+            if image:
+                st.image(image, width='stretch')
             
-        st.markdown("""
-            <div class="insights-box">
-                <h4 style='color: #FF4B4B;'>📊 Distribution Insights</h4>
-                <ul style='color: white;'>
-                    <li>Before and after SMOTE balancing</li>
-                    <li>Equal class representation achieved</li>
-                    <li>Enhanced training data quality</li>
-                </ul>
-            </div>
-        """, unsafe_allow_html=True)
+            st.markdown("""
+                <div class="insights-box">
+                    <h4 style='color: #FF4B4B;'>📊 Distribution Insights</h4>
+                    <ul style='color: white;'>
+                        <li>Before and after SMOTE balancing</li>
+                        <li>Equal class representation achieved</li>
+                        <li>Enhanced training data quality</li>
+                    </ul>
+                </div>
+            """, unsafe_allow_html=True)
 
-    with col2:
-        st.markdown("""
-            <div class="grid-item">
-                <h2 style='color: #15B3AC;'>2️⃣ ROC Curve Analysis</h2>
-            </div>
-        """, unsafe_allow_html=True)
+        with col2:
+            st.markdown("""
+                <div class="grid-item">
+                    <h2 style='color: #15B3AC;'>2️⃣ ROC Curve Analysis</h2>
+                </div>
+            """, unsafe_allow_html=True)
         
-        image = load_image("../images/ROC.jpeg")
-        if image:
-            st.image(image, use_container_width=True)
+            show_chart_or_image(report, roc_chart, "ROC.jpeg")
             
-        st.markdown("""
-            <div class="insights-box">
-                <h4 style='color: #FF4B4B;'>📈 ROC Analysis Insights</h4>
-                <ul style='color: white;'>
-                    <li>Outstanding AUC score of 0.9405</li>
-                    <li>Excellent discrimination capability</li>
-                    <li>Robust across different thresholds</li>
-                </ul>
-            </div>
-        """, unsafe_allow_html=True)
+            st.markdown(f"""
+                <div class="insights-box">
+                    <h4 style='color: #FF4B4B;'>📈 ROC Analysis Insights</h4>
+                    <ul style='color: white;'>
+                        <li>Outstanding AUC score of {percent(report, 'roc_auc')}</li>
+                        <li>Excellent discrimination capability</li>
+                        <li>Robust across different thresholds</li>
+                    </ul>
+                </div>
+            """, unsafe_allow_html=True)
 
     # Row 2: Correlation and Feature Interactions
-    col3, col4 = st.columns(2)
-    with col3:
-        st.markdown("""
-            <div class="grid-item">
-                <h2 style='color: #15B3AC;'>3️⃣ Feature Correlation Matrix</h2>
-            </div>
-        """, unsafe_allow_html=True)
+    if section == VISUALIZATION_SECTIONS[1]:
+        col3, col4 = st.columns(2)
+        with col3:
+            st.markdown("""
+                <div class="grid-item">
+                    <h2 style='color: #15B3AC;'>3️⃣ Feature Correlation Matrix</h2>
+                </div>
+            """, unsafe_allow_html=True)
         
-        image = load_image("../images/Correlation.jpeg")
-        if image:
-            st.image(image, use_container_width=True)
+            image = load_image("Correlation.jpeg")
+            if image:
+                st.image(image, width='stretch')
             
-        st.markdown("""
-            <div class="insights-box">
-                <h4 style='color: #FF4B4B;'>🔍 Correlation Insights</h4>
-                <ul style='color: white;'>
-                    <li>Key feature relationships identified</li>
-                    <li>Strong predictive indicators found</li>
-                    <li>Feature importance validation</li>
-                </ul>
-            </div>
-        """, unsafe_allow_html=True)
+            st.markdown("""
+                <div class="insights-box">
+                    <h4 style='color: #FF4B4B;'>🔍 Correlation Insights</h4>
+                    <ul style='color: white;'>
+                        <li>Key feature relationships identified</li>
+                        <li>Strong predictive indicators found</li>
+                        <li>Feature importance validation</li>
+                    </ul>
+                </div>
+            """, unsafe_allow_html=True)
 
-    with col4:
-        st.markdown("""
-            <div class="grid-item">
-                <h2 style='color: #15B3AC;'>4️⃣ Feature Interactions</h2>
-            </div>
-        """, unsafe_allow_html=True)
+        with col4:
+            st.markdown("""
+                <div class="grid-item">
+                    <h2 style='color: #15B3AC;'>4️⃣ Feature Interactions</h2>
+                </div>
+            """, unsafe_allow_html=True)
         
-        image = load_image("../images/ScatterPlot.jpeg")
-        if image:
-            st.image(image, use_container_width=True)
+            image = load_image("ScatterPlot.jpeg")
+            if image:
+                st.image(image, width='stretch')
             
-        st.markdown("""
-            <div class="insights-box">
-                <h4 style='color: #FF4B4B;'>📈 Pattern Analysis</h4>
-                <ul style='color: white;'>
-                    <li>Clear feature relationships</li>
-                    <li>Distinct class separation</li>
-                    <li>Predictive patterns revealed</li>
-                </ul>
-            </div>
-        """, unsafe_allow_html=True)
+            st.markdown("""
+                <div class="insights-box">
+                    <h4 style='color: #FF4B4B;'>📈 Pattern Analysis</h4>
+                    <ul style='color: white;'>
+                        <li>Clear feature relationships</li>
+                        <li>Distinct class separation</li>
+                        <li>Predictive patterns revealed</li>
+                    </ul>
+                </div>
+            """, unsafe_allow_html=True)
 
     # Row 3: Confusion Matrix and Precision-Recall
-    col5, col6 = st.columns(2)
-    with col5:
-        st.markdown("""
-            <div class="grid-item">
-                <h2 style='color: #15B3AC;'>5️⃣ Confusion Matrix</h2>
-            </div>
-        """, unsafe_allow_html=True)
+    if section == VISUALIZATION_SECTIONS[2]:
+        col5, col6 = st.columns(2)
+        with col5:
+            st.markdown("""
+                <div class="grid-item">
+                    <h2 style='color: #15B3AC;'>5️⃣ Confusion Matrix</h2>
+                </div>
+            """, unsafe_allow_html=True)
         
-        image = load_image("../images/ConfusionMatrix.jpeg")
-        if image:
-            st.image(image, use_container_width=True)
+            show_chart_or_image(report, confusion_table, "ConfusionMatrix.jpeg")
             
-        st.markdown("""
-            <div class="insights-box">
-                <h4 style='color: #FF4B4B;'>🎯 Classification Results</h4>
-                <ul style='color: white;'>
-                    <li>High true positive rate achieved</li>
-                    <li>Minimal false classifications</li>
-                    <li>Balanced performance across classes</li>
-                </ul>
-            </div>
-        """, unsafe_allow_html=True)
+            st.markdown("""
+                <div class="insights-box">
+                    <h4 style='color: #FF4B4B;'>🎯 Classification Results</h4>
+                    <ul style='color: white;'>
+                        <li>High true positive rate achieved</li>
+                        <li>Minimal false classifications</li>
+                        <li>Balanced performance across classes</li>
+                    </ul>
+                </div>
+            """, unsafe_allow_html=True)
 
-    with col6:
-        st.markdown("""
-            <div class="grid-item">
-                <h2 style='color: #15B3AC;'>6️⃣ Precision-Recall Curve</h2>
-            </div>
-        """, unsafe_allow_html=True)
+        with col6:
+            st.markdown("""
+                <div class="grid-item">
+                    <h2 style='color: #15B3AC;'>6️⃣ Precision-Recall Curve</h2>
+                </div>
+            """, unsafe_allow_html=True)
         
-        image = load_image("../images/PR_Curve.jpeg")
-        if image:
-            st.image(image, use_container_width=True)
+            show_chart_or_image(report, pr_chart, "PR_Curve.jpeg")
             
-        st.markdown("""
-            <div class="insights-box">
-                <h4 style='color: #FF4B4B;'>📊 Performance Trade-off</h4>
-                <ul style='color: white;'>
-                    <li>High precision: 88.92%</li>
-                    <li>Strong recall: 89.56%</li>
-                    <li>Optimal balance achieved</li>
-                </ul>
-            </div>
-        """, unsafe_allow_html=True)
+            st.markdown(f"""
+                <div class="insights-box">
+                    <h4 style='color: #FF4B4B;'>📊 Performance Trade-off</h4>
+                    <ul style='color: white;'>
+                        <li>High precision: {percent(report, 'precision')}</li>
+                        <li>Strong recall: {percent(report, 'recall')}</li>
+                        <li>Optimal balance achieved</li>
+                    </ul>
+                </div>
+            """, unsafe_allow_html=True)
 
     # Row 4: Metrics and Probability Distribution
-    col7, col8 = st.columns(2)
-    with col7:
-        st.markdown("""
-            <div class="grid-item">
-                <h2 style='color: #15B3AC;'>7️⃣ Performance Metrics</h2>
-            </div>
-        """, unsafe_allow_html=True)
+    if section == VISUALIZATION_SECTIONS[3]:
+        col7, col8 = st.columns(2)
+        with col7:
+            st.markdown("""
+                <div class="grid-item">
+                    <h2 style='color: #15B3AC;'>7️⃣ Performance Metrics</h2>
+                </div>
+            """, unsafe_allow_html=True)
         
-        image = load_image("../images/Metrics.jpeg")
-        if image:
-            st.image(image, use_container_width=True)
+            show_chart_or_image(report, metrics_chart, "Metrics.jpeg")
             
-        st.markdown("""
-            <div class="insights-box">
-                <h4 style='color: #FF4B4B;'>📈 Key Indicators</h4>
-                <ul style='color: white;'>
-                    <li>Overall accuracy: 87.45%</li>
-                    <li>F1-Score: 89.24%</li>
-                    <li>Consistent cross-validation results</li>
-                </ul>
-            </div>
-        """, unsafe_allow_html=True)
+            st.markdown(f"""
+                <div class="insights-box">
+                    <h4 style='color: #FF4B4B;'>📈 Key Indicators</h4>
+                    <ul style='color: white;'>
+                        <li>Overall accuracy: {percent(report, 'accuracy')}</li>
+                        <li>F1-Score: {percent(report, 'f1')}</li>
+                        <li>Consistent cross-validation results</li>
+                    </ul>
+                </div>
+            """, unsafe_allow_html=True)
 
-    with col8:
-        st.markdown("""
-            <div class="grid-item">
-                <h2 style='color: #15B3AC;'>8️⃣ Probability Distribution</h2>
-            </div>
-        """, unsafe_allow_html=True)
+        with col8:
+            st.markdown("""
+                <div class="grid-item">
+                    <h2 style='color: #15B3AC;'>8️⃣ Probability Distribution</h2>
+                </div>
+            """, unsafe_allow_html=True)
         
-        image = load_image("../images/Prob_Dist.jpeg")
-        if image:
-            st.image(image, use_container_width=True)
+            show_chart_or_image(report, probability_chart, "Prob_Dist.jpeg")
             
-        st.markdown("""
-            <div class="insights-box">
-                <h4 style='color: #FF4B4B;'>🎯 Classification Confidence</h4>
-                <ul style='color: white;'>
-                    <li>Clear separation between classes</li>
-                    <li>High confidence predictions</li>
-                    <li>Robust decision boundaries</li>
-                </ul>
-            </div>
-        """, unsafe_allow_html=True)
+            st.markdown("""
+                <div class="insights-box">
+                    <h4 style='color: #FF4B4B;'>🎯 Classification Confidence</h4>
+                    <ul style='color: white;'>
+                        <li>Clear separation between classes</li>
+                        <li>High confidence predictions</li>
+                        <li>Robust decision boundaries</li>
+                    </ul>
+                </div>
+            """, unsafe_allow_html=True)
+
     # Close grid container
     st.markdown('</div>', unsafe_allow_html=True)
 
 
     # Final Summary Section
-    st.markdown("""
+    st.markdown(f"""
     <div class='highlight-box' style='background-color: #1E1E1E; margin-top: 2em;'>
         <h3 style='color: #FF4B4B;'>🌟 Model Performance Summary</h3>
         <p style='color: white;'>Our ensemble model demonstrates exceptional performance in exoplanet detection:</p>
         <ul style='color: white;'>
             <li>High accuracy and balanced precision-recall metrics</li>
-            <li>Excellent discrimination capability (AUC = 0.9405)</li>
+            <li>Excellent discrimination capability (AUC = {percent(report, 'roc_auc')})</li>
             <li>Robust performance across different classification thresholds</li>
             <li>Successfully addresses class imbalance through SMOTE</li>
         </ul>
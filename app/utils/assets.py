@@ -0,0 +1,86 @@
+import io
+import os
+import gzip
+import threading
+from functools import lru_cache
+
+from .data_store import CATALOG, get_data_path
+
+# Images are shrunk to at most this width once; the dashboard shows them at half page width
+MAX_IMAGE_WIDTH = 1000
+
+_lock = threading.Lock()
+_downloads = {}
+
+
+def get_image_path(filename):
+    """Get absolute path to a file in the images directory"""
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(app_dir, 'images', filename)
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _gzip_path(name):
+    return get_data_path(os.path.join('.columnar', name + '.gz'))
+
+
+def download_bytes(name=CATALOG, compress=False):
+    """Bytes of a data file for st.download_button, read from disk once per file version.
+
+    The gzip variant is also written next to the columnar copy so other
+    processes and restarts reuse it instead of compressing again.
+    """
+    path = get_data_path(name)
+    signature = _signature(path)
+    key = (name, compress)
+    cached = _downloads.get(key)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with _lock:
+        cached = _downloads.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        if not compress:
+            with open(path, 'rb') as f:
+                data = f.read()
+        else:
+            gz_path = _gzip_path(name)
+            if os.path.exists(gz_path) and os.stat(gz_path).st_mtime_ns >= signature[0]:
+                with open(gz_path, 'rb') as f:
+                    data = f.read()
+            else:
+                with open(path, 'rb') as f:
+                    data = gzip.compress(f.read(), compresslevel=6, mtime=0)
+                os.makedirs(os.path.dirname(gz_path), exist_ok=True)
+                with open(gz_path + '.tmp', 'wb') as f:
+                    f.write(data)
+                os.replace(gz_path + '.tmp', gz_path)
+        _downloads[key] = (signature, data)
+        return data
+
+
+@lru_cache(maxsize=32)
+def _fitted_image(path, signature, max_width):
+    from PIL import Image
+
+    with Image.open(path) as image:
+        image_format = image.format or 'JPEG'
+        if image.width > max_width:
+            image = image.resize((max_width, round(image.height * max_width / image.width)),
+                                 Image.Resampling.LANCZOS)
+        else:
+            image.load()
+        buffer = io.BytesIO()
+        image.convert('RGB').save(buffer, format=image_format, quality=90)
+    return buffer.getvalue()
+
+
+def image_bytes(filename, max_width=MAX_IMAGE_WIDTH):
+    """Encoded image, decoded and size-fitted once per process and file version"""
+    path = get_image_path(filename)
+    return _fitted_image(path, _signature(path), max_width)
@@ -0,0 +1,110 @@
+import os
+import glob
+import time
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from .model import warm_up
+from .scoring import score
+from .streaming import DEFAULT_CHUNK_ROWS
+
+logger = logging.getLogger(__name__)
+
+# Columns copied from the input so predictions can be joined back to the catalog
+ID_COLUMNS = ['kepid', 'kepoi_name', 'kepler_name']
+
+_worker_backend = None
+
+
+def _init_worker(backend):
+    """Runs once in every worker process: load the model before the first chunk arrives"""
+    global _worker_backend
+    _worker_backend = backend
+    warm_up(backend)
+
+
+def score_chunk(chunk, backend=None):
+    """Predictions for one chunk of raw KOI rows, with the identifier columns in front"""
+    results = score(chunk, backend=backend or _worker_backend).to_frame()
+    ids = [col for col in ID_COLUMNS if col in chunk.columns]
+    if ids:
+        results = pd.concat([chunk[ids].reset_index(drop=True), results], axis=1)
+    return results
+
+
+def find_inputs(paths):
+    """Expand files and directories into a sorted list of CSV files"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.csv'))))
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise FileNotFoundError(f"Input not found: {path}")
+    return files
+
+
+def output_path_for(input_path, output, n_inputs):
+    """Output file for an input: `output` itself for a single .csv target, else a file inside it"""
+    if n_inputs == 1 and output.endswith('.csv'):
+        return output
+    name = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output, f"{name}_predictions.csv")
+
+
+def score_file(executor, input_path, output_path, chunk_rows, max_in_flight):
+    """Shard one CSV across the pool; chunks are written back in input order"""
+    start = time.perf_counter()
+    rows = 0
+    pending = deque()
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w', newline='') as out:
+        def write_next():
+            nonlocal rows
+            results = pending.popleft().result()
+            results.to_csv(out, index=False, header=rows == 0)
+            rows += len(results)
+
+        for chunk in pd.read_csv(input_path, chunksize=chunk_rows):
+            pending.append(executor.submit(score_chunk, chunk))
+            if len(pending) >= max_in_flight:
+                write_next()
+        while pending:
+            write_next()
+
+    seconds = time.perf_counter() - start
+    return {
+        'input': input_path,
+        'output': output_path,
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_second': rows / seconds if seconds else 0.0,
+    }
+
+
+def score_files(paths, output, workers=None, chunk_rows=DEFAULT_CHUNK_ROWS, backend=None, report=print):
+    """Score every CSV in `paths` with a process pool where each worker loads the model once"""
+    files = find_inputs(paths)
+    if not files:
+        raise FileNotFoundError("No CSV files to score")
+    workers = workers or os.cpu_count() or 1
+
+    summaries = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(backend,)) as executor:
+        for input_path in files:
+            summary = score_file(executor, input_path, output_path_for(input_path, output, len(files)),
+                                 chunk_rows, max_in_flight=2 * workers)
+            report(f"{summary['input']}: {summary['rows']:,} rows in {summary['seconds']:.2f}s "
+                   f"({summary['rows_per_second']:,.0f} rows/s) -> {summary['output']}")
+            summaries.append(summary)
+
+    total_rows = sum(summary['rows'] for summary in summaries)
+    seconds = time.perf_counter() - start
+    report(f"Total: {total_rows:,} rows from {len(files)} file(s) in {seconds:.2f}s "
+           f"({total_rows / seconds if seconds else 0.0:,.0f} rows/s, {workers} workers)")
+    return summaries
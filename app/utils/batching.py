@@ -0,0 +1,193 @@
+import os
+import time
+import queue
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+from .model import load_feature_plan
+from .preprocessing import predict_with_preprocessing
+from .tracing import current_trace, trace
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH = int(os.environ.get('EXOPLANET_BATCH_MAX_SIZE', 64))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get('EXOPLANET_BATCH_MAX_WAIT_MS', 5.0))
+
+
+def _score(df, tier=None):
+    predictions, probabilities, _ = predict_with_preprocessing(df, tier=tier)
+    return predictions, probabilities
+
+
+def _prepare(df):
+    """Check and convert one request before it is batched with others.
+
+    Model columns are converted to float64 here, on the caller's thread,
+    so a malformed request fails alone instead of failing the batch. The
+    pipeline run is one-hot encoded first, so a request sending it raw and
+    one sending the dummies concatenate without changing either's rows.
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError(f"Expected a DataFrame of KOI rows, got {type(df).__name__}")
+    if df.empty:
+        raise ValueError("No rows to score")
+    plan = load_feature_plan()
+    df = plan.encode_dummies(df)
+    columns = [name for name in plan.features if name in df.columns]
+    try:
+        return df.astype({name: np.float64 for name in columns})
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid feature values: {str(e)}")
+
+
+class MicroBatcher:
+    """Collects concurrent small prediction requests and scores them together.
+
+    Callers submit raw KOI rows and get a Future. A background thread takes
+    the first waiting request, keeps collecting for up to max_wait_ms or
+    until max_batch rows are queued, scores everything with one call and
+    hands each caller its own slice. Imputation uses training medians, so a
+    row gets the same result whether it is scored alone or in a batch.
+    Requests are checked by prepare_fn before they are queued, and a batch
+    that still fails is rescored request by request, so one bad request
+    only fails its own caller.
+    """
+
+    def __init__(self, score_fn=_score, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS,
+                 prepare_fn=_prepare):
+        self.score_fn = score_fn
+        self.prepare_fn = prepare_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._sizes = Counter()
+        self._stats_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, df):
+        """Queue raw KOI rows; the Future resolves to (predictions, probabilities) for these rows"""
+        if self._closed:
+            raise RuntimeError("MicroBatcher is closed")
+        future = Future()
+        try:
+            df = self.prepare_fn(df)
+        except Exception as e:
+            future.set_exception(e)
+            return future
+        # The batch's timing spans are copied into the caller's trace, if any
+        self._queue.put((df, future, current_trace()))
+        return future
+
+    def predict(self, df, timeout=None):
+        """Blocking submit(): (predictions, probabilities) for df"""
+        return self.submit(df).result(timeout=timeout)
+
+    def _collect(self):
+        """Block for one request, then gather more until the batch is full or the wait expires"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        rows = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while rows < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch
+
+    def _score_batch(self, frames, callers):
+        """(predictions, probabilities) of the frames scored together"""
+        combined = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+        if not callers:
+            return self.score_fn(combined)
+        with trace('micro-batch') as batch_trace:
+            result = self.score_fn(combined)
+        # The spans are tagged with the batcher thread, which scored them for the caller
+        thread = threading.current_thread().name
+        for caller in callers:
+            caller.merge(batch_trace, batch_rows=len(combined), shared_by=len(frames), thread=thread)
+        return result
+
+    def _deliver(self, batch):
+        """Score a batch and resolve its futures; True if it was scored as one batch"""
+        frames = [df for df, _, _ in batch]
+        futures = [future for _, future, _ in batch]
+        callers = [caller for _, _, caller in batch if caller is not None]
+        try:
+            predictions, probabilities = self._score_batch(frames, callers)
+        except Exception as e:
+            if len(batch) == 1:
+                futures[0].set_exception(e)
+                return False
+            # Something in the batch still failed: find out which request by scoring them alone
+            logger.warning("Batch of %d requests failed (%s), rescoring them one by one", len(batch), e)
+            for item in batch:
+                self._deliver([item])
+            return False
+
+        with self._stats_lock:
+            self._sizes[sum(len(df) for df in frames)] += 1
+        bounds = np.cumsum([0] + [len(df) for df in frames])
+        for future, start, stop in zip(futures, bounds[:-1], bounds[1:]):
+            future.set_result((predictions[start:stop], probabilities[start:stop]))
+        return True
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            self._deliver(batch)
+
+    def stats(self):
+        """How many batches were scored and how large they were"""
+        with self._stats_lock:
+            sizes = dict(self._sizes)
+        batches = sum(sizes.values())
+        rows = sum(size * count for size, count in sizes.items())
+        return {
+            'batches': batches,
+            'rows': rows,
+            'mean_batch_size': round(rows / batches, 2) if batches else 0.0,
+            'max_batch_size': max(sizes, default=0),
+            'batch_size_counts': dict(sorted(sizes.items())),
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+        }
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+
+_batchers = {}
+_batcher_lock = threading.Lock()
+
+
+def get_batcher(tier=None):
+    """Process-wide MicroBatcher of a model tier, shared by every session and request thread"""
+    batcher = _batchers.get(tier)
+    if batcher is None:
+        with _batcher_lock:
+            batcher = _batchers.get(tier)
+            if batcher is None:
+                batcher = _batchers[tier] = MicroBatcher(score_fn=lambda df: _score(df, tier))
+    return batcher
@@ -0,0 +1,182 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import tempfile
+import warnings
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CATALOG = 'Kepler.csv'
+PROCESSED = 'processed_kepler.csv'
+
+# Columnar copies live next to the CSVs, one directory of .npy files per dataset
+COLUMNAR_DIR = '.columnar'
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+
+_lock = threading.Lock()
+_medians = {}
+
+
+def get_data_path(filename):
+    """Get absolute path to a file in the data directory"""
+    app_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(app_dir, 'data', filename)
+
+
+def _columnar_path(name):
+    return get_data_path(os.path.join(COLUMNAR_DIR, os.path.splitext(name)[0]))
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(directory, manifest):
+    path = os.path.join(directory, MANIFEST)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def convert(name):
+    """Parse the CSV once and write one typed .npy file per column plus a manifest"""
+    source = get_data_path(name)
+    target = _columnar_path(name)
+    df = pd.read_csv(source)
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=os.path.dirname(target))
+    columns = []
+    for i, column in enumerate(df.columns):
+        values = df[column]
+        if pd.api.types.is_bool_dtype(values):
+            array, kind = values.to_numpy(dtype=np.bool_), 'bool'
+        elif pd.api.types.is_numeric_dtype(values):
+            array, kind = values.to_numpy(dtype=np.float64 if values.hasnans else values.dtype), 'numeric'
+        else:
+            # Fixed-width unicode so the column can be memory-mapped; '' marks a missing value
+            array, kind = values.fillna('').astype(str).to_numpy(dtype=str), 'string'
+        filename = f"{i:03d}.npy"
+        np.save(os.path.join(staging, filename), array, allow_pickle=False)
+        columns.append({'name': column, 'file': filename, 'kind': kind, 'dtype': array.dtype.str})
+
+    _write_manifest(staging, {
+        'format_version': FORMAT_VERSION,
+        'source': name,
+        **_source_signature(source),
+        'sha256': _sha256(source),
+        'rows': len(df),
+        'columns': columns,
+    })
+
+    # Swap the new directory in; readers holding old memory maps keep their files
+    with _lock:
+        try:
+            if os.path.isdir(target):
+                retired = tempfile.mkdtemp(prefix='.retired-', dir=os.path.dirname(target))
+                os.replace(target, os.path.join(retired, 'data'))
+                os.replace(staging, target)
+                shutil.rmtree(retired, ignore_errors=True)
+            else:
+                os.replace(staging, target)
+        except OSError:
+            # Another process swapped in its own conversion first
+            shutil.rmtree(staging, ignore_errors=True)
+    logger.info("Converted %s to columnar format (%d rows, %d columns)", name, len(df), len(columns))
+    return _read_manifest(target)
+
+
+def ensure_columnar(name):
+    """Manifest of an up-to-date columnar copy of the CSV, converting it if missing or stale"""
+    source = get_data_path(name)
+    target = _columnar_path(name)
+    manifest = _read_manifest(target)
+    if manifest is None or manifest.get('format_version') != FORMAT_VERSION:
+        return convert(name)
+
+    signature = _source_signature(source)
+    if signature['size'] == manifest['size'] and signature['mtime_ns'] == manifest['mtime_ns']:
+        return manifest
+    if signature['size'] == manifest['size'] and _sha256(source) == manifest['sha256']:
+        # Touched (e.g. by a checkout) but unchanged
+        manifest.update(signature)
+        _write_manifest(target, manifest)
+        return manifest
+    return convert(name)
+
+
+def load_columns(name, columns=None, mmap=True):
+    """Dict of column name -> ndarray, memory-mapped read-only by default (no copy, no parsing)"""
+    manifest = ensure_columnar(name)
+    directory = _columnar_path(name)
+    by_name = {entry['name']: entry for entry in manifest['columns']}
+    wanted = list(by_name) if columns is None else list(columns)
+    missing = [column for column in wanted if column not in by_name]
+    if missing:
+        raise KeyError(f"Columns not in {name}: {missing}")
+    return {
+        column: np.load(os.path.join(directory, by_name[column]['file']),
+                        mmap_mode='r' if mmap else None, allow_pickle=False)
+        for column in wanted
+    }
+
+
+def list_columns(name, kind=None):
+    """Column names of a dataset, optionally only those of one kind ('numeric', 'string', 'bool')"""
+    manifest = ensure_columnar(name)
+    return [entry['name'] for entry in manifest['columns'] if kind is None or entry['kind'] == kind]
+
+
+def load_frame(name, columns=None):
+    """DataFrame with the requested columns, missing strings restored as NaN"""
+    manifest = ensure_columnar(name)
+    kinds = {entry['name']: entry['kind'] for entry in manifest['columns']}
+    arrays = load_columns(name, columns)
+    data = {}
+    for column, array in arrays.items():
+        if kinds[column] == 'string':
+            series = pd.Series(np.asarray(array).tolist())
+            data[column] = series.where(series != '', np.nan)
+        else:
+            data[column] = array
+    return pd.DataFrame(data)
+
+
+def column_medians(name=CATALOG):
+    """Median of every numeric column, recomputed only when the dataset changes"""
+    manifest = ensure_columnar(name)
+    cached = _medians.get(name)
+    if cached is not None and cached[0] == manifest['sha256']:
+        return cached[1]
+    arrays = load_columns(name, list_columns(name, 'numeric'))
+    with warnings.catch_warnings():
+        # All-empty columns (e.g. koi_teq_err1) have a NaN median, as in pandas
+        warnings.simplefilter('ignore', RuntimeWarning)
+        medians = pd.Series({column: float(np.nanmedian(array)) if len(array) else np.nan
+                             for column, array in arrays.items()})
+    _medians[name] = (manifest['sha256'], medians)
+    return medians
@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import logging
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from .data_store import CATALOG, PROCESSED, load_frame
+from .evaluation import RANDOM_STATE, evaluate, holdout_split
+from .feature_plan import DELIVNAME_PREFIX, FeaturePlan
+from .model import (STUDENT_FILENAME, get_model_path, load_compiled_model,
+                    load_model, load_preprocessor, model_version)
+from .preprocessing import get_training_medians, preprocess_features
+from .scoring import CONFIRMED_THRESHOLD, ScoreResult
+from .synthetic import KOISampler
+from .tree_engine import compile_lightgbm
+
+logger = logging.getLogger(__name__)
+
+STUDENT_REPORT = 'student_report.json'
+
+# Shallow GBM fitted to the teacher's probabilities (cross-entropy accepts soft labels)
+STUDENT_PARAMS = {
+    'objective': 'cross_entropy',
+    'n_estimators': 300,
+    'learning_rate': 0.1,
+    'num_leaves': 31,
+    'max_depth': 6,
+    'min_child_samples': 10,
+    'random_state': RANDOM_STATE,
+    'verbose': -1,
+}
+
+# Perturbed KOIs added to the distillation set (half from processed_kepler.csv, half from Kepler.csv)
+DEFAULT_SYNTHETIC_ROWS = 50_000
+PERTURBATION_JITTER = 0.05
+
+# Agreement is also reported for rows whose teacher probability is this close to the threshold
+NEAR_THRESHOLD = 0.1
+
+
+def processed_frame(features):
+    """processed_kepler.csv as unscaled model columns.
+
+    The file was written with drop_first dummies, so the first
+    koi_tce_delivname dummy is rebuilt from the others.
+    """
+    df = load_frame(PROCESSED)
+    for name in features:
+        if name.startswith(DELIVNAME_PREFIX) and name not in df.columns:
+            others = [col for col in df.columns if col.startswith(DELIVNAME_PREFIX)]
+            df[name] = 1 - df[others].sum(axis=1)
+    # Flags and dummies stay integers, so only measurements get jittered
+    return df[features]
+
+
+def distillation_inputs(preprocessor, synthetic_rows, seed=RANDOM_STATE):
+    """Scaled model inputs: every processed_kepler.csv row plus jittered KOIs.
+
+    Half of the jittered rows are copies of processed_kepler.csv rows; the
+    other half are raw catalog rows sent through the regular inference
+    preprocessing, so the student also sees inputs shaped like live traffic
+    (catalog imputation, delivname dummies).
+    """
+    features = preprocessor['features']
+    base = processed_frame(features)
+    perturbed = KOISampler(catalog=base, jitter=PERTURBATION_JITTER).sample(synthetic_rows // 2, seed=seed)
+    # Engineered ratios follow the jittered raw values
+    perturbed = preprocess_features(perturbed, get_training_medians(preprocessor))[features]
+    catalog = KOISampler(jitter=PERTURBATION_JITTER).sample(synthetic_rows - synthetic_rows // 2, seed=seed + 1)
+    return np.vstack([
+        preprocessor['scaler'].transform(pd.concat([base, perturbed], ignore_index=True)),
+        FeaturePlan.from_preprocessor(preprocessor).transform(catalog),
+    ])
+
+
+def fit_student(X, teacher_probability, params=None):
+    from lightgbm import LGBMRegressor
+
+    return LGBMRegressor(**(params or STUDENT_PARAMS)).fit(X, teacher_probability)
+
+
+def fidelity(teacher, student, threshold=CONFIRMED_THRESHOLD):
+    """How closely the student's probabilities and reported labels follow the teacher's"""
+    teacher = ScoreResult.from_arrays(np.argmax(teacher, axis=1), teacher)
+    student = ScoreResult.from_arrays(np.argmax(student, axis=1), student)
+    agree = teacher.labels == student.labels
+    near = np.abs(teacher.confirmed_probability - threshold) <= NEAR_THRESHOLD
+    return {
+        'rows': len(teacher),
+        'agreement': float(agree.mean()),
+        'probability_mae': float(np.abs(teacher.confirmed_probability - student.confirmed_probability).mean()),
+        'near_threshold_rows': int(near.sum()),
+        'near_threshold_agreement': float(agree[near].mean()) if near.any() else None,
+    }
+
+
+def _latency_ms(model, X, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model.predict_proba(X)
+        timings.append(time.perf_counter() - start)
+    return round(float(np.median(timings)) * 1000, 4)
+
+
+def latency(models, X, repeat=200):
+    """Median predict_proba latency per model, for one row and for 1,000 rows"""
+    return {name: {'1_row_ms': _latency_ms(model, X[:1], repeat),
+                   '1000_rows_ms': _latency_ms(model, X[:1000], max(repeat // 20, 3))}
+            for name, model in models.items()}
+
+
+def distill(synthetic_rows=DEFAULT_SYNTHETIC_ROWS, params=None, output_dir=None, seed=RANDOM_STATE):
+    """Train the student tier on the current ensemble's probabilities and write it with its report.
+
+    Fidelity is measured on inputs the student was not fitted on: the
+    held-out split of the catalog and fresh synthetic KOIs, both through
+    the regular raw-row preprocessing.
+    """
+    start = time.perf_counter()
+    preprocessor = load_preprocessor()
+    teacher = load_model()
+    X = distillation_inputs(preprocessor, synthetic_rows, seed)
+    student = fit_student(X, teacher.predict_proba(X)[:, 1], params)
+    fit_seconds = time.perf_counter() - start
+    compiled = compile_lightgbm(student, len(preprocessor['features']))
+
+    plan = FeaturePlan.from_preprocessor(preprocessor)
+    test, labels = holdout_split(load_frame(CATALOG))
+    sets = {
+        'holdout': plan.transform(test),
+        'synthetic': plan.transform(KOISampler().sample(20_000, seed=seed + 2)),
+    }
+    report = {
+        'teacher_version': model_version(),
+        'params': params or STUDENT_PARAMS,
+        'distillation_rows': len(X),
+        'fit_seconds': round(fit_seconds, 3),
+        'fidelity': {name: fidelity(teacher.predict_proba(X_eval), compiled.predict_proba(X_eval))
+                     for name, X_eval in sets.items()},
+        'accuracy': {
+            'teacher': evaluate(labels, teacher.predict_proba(sets['holdout']))['metrics'],
+            'student': evaluate(labels, compiled.predict_proba(sets['holdout']))['metrics'],
+        },
+        'latency': latency({'full:sklearn': teacher, 'full:compiled': load_compiled_model(),
+                            'student': compiled}, sets['synthetic']),
+        'created_at': time.time(),
+    }
+
+    output_dir = output_dir or os.path.dirname(get_model_path(STUDENT_FILENAME))
+    os.makedirs(output_dir, exist_ok=True)
+    bundle = {'model': student, 'features': preprocessor['features'], 'report': report}
+    path = os.path.join(output_dir, STUDENT_FILENAME)
+    joblib.dump(bundle, path + '.tmp')
+    os.replace(path + '.tmp', path)
+    with open(os.path.join(output_dir, STUDENT_REPORT), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report
@@ -0,0 +1,169 @@
+import os
+import json
+import time
+import logging
+import threading
+
+import numpy as np
+
+from .data_store import CATALOG, ensure_columnar, load_frame
+from .model import get_model_path
+from .preprocessing import DEFAULT_TIER, predict_with_preprocessing, scoring_version
+
+logger = logging.getLogger(__name__)
+
+# Held-out split used when the model was trained (notebook: 70/30, stratified, seed 42)
+TEST_SIZE = 0.3
+RANDOM_STATE = 42
+LABELS = {'CANDIDATE': 0, 'CONFIRMED': 1}
+
+HISTOGRAM_BINS = 20
+
+# One JSON report per (model tier and version, preprocessor, dataset) version
+EVALUATION_DIR = get_model_path('.evaluation')
+
+_lock = threading.Lock()
+_reports = {}
+
+
+def holdout_split(df):
+    """Raw test rows and 0/1 labels of the training-time held-out split"""
+    from sklearn.model_selection import train_test_split
+
+    df = df[df['koi_disposition'].isin(list(LABELS))].reset_index(drop=True)
+    labels = df['koi_disposition'].map(LABELS).to_numpy(dtype=np.int64)
+    _, test_index = train_test_split(np.arange(len(df)), test_size=TEST_SIZE,
+                                     random_state=RANDOM_STATE, stratify=labels)
+    test_index = np.sort(test_index)
+    return df.iloc[test_index].reset_index(drop=True), labels[test_index]
+
+
+def confusion(y_true, y_pred):
+    """2x2 confusion matrix (rows: actual, columns: predicted) from one bincount"""
+    return np.bincount(2 * y_true + y_pred, minlength=4).reshape(2, 2)
+
+
+def ranking_curves(y_true, score):
+    """ROC and precision-recall curves from a single sort and cumulative sums.
+
+    Rows are sorted by decreasing score once; the true/false positive counts
+    at every distinct threshold are the cumulative sums at the last row of
+    each run of equal scores. AUC uses the trapezoidal rule and average
+    precision the step-wise sum, as in sklearn.
+    """
+    order = np.argsort(-score, kind='mergesort')
+    score = score[order]
+    y_true = y_true[order]
+    last = np.r_[np.flatnonzero(np.diff(score)), len(score) - 1]
+    tps = np.cumsum(y_true)[last]
+    fps = last + 1 - tps
+    positives, negatives = tps[-1], fps[-1]
+
+    fpr = np.r_[0.0, fps / negatives]
+    tpr = np.r_[0.0, tps / positives]
+    precision = tps / (tps + fps)
+    recall = tps / positives
+    return {
+        'thresholds': score[last],
+        'fpr': fpr,
+        'tpr': tpr,
+        'precision': precision,
+        'recall': recall,
+        'roc_auc': float(np.trapezoid(tpr, fpr)),
+        'average_precision': float(np.sum(np.diff(np.r_[0.0, recall]) * precision)),
+    }
+
+
+def probability_histograms(y_true, score, bins=HISTOGRAM_BINS):
+    """Counts of CONFIRMED probability per equal-width bin, one row per actual class"""
+    index = np.minimum((score * bins).astype(np.int64), bins - 1)
+    return np.bincount(y_true * bins + index, minlength=2 * bins).reshape(2, bins)
+
+
+def evaluate(y_true, probabilities, classes=(0, 1)):
+    """Metrics, confusion matrix, curves and histograms for held-out predictions"""
+    y_true = np.asarray(y_true, dtype=np.int64)
+    score = np.asarray(probabilities)[:, 1]
+    y_pred = np.asarray(classes)[np.argmax(probabilities, axis=1)].astype(np.int64)
+
+    matrix = confusion(y_true, y_pred)
+    (tn, fp), (fn, tp) = matrix
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    curves = ranking_curves(y_true, score)
+    metrics = {
+        'accuracy': (tp + tn) / len(y_true),
+        'recall': recall,
+        'precision': precision,
+        'f1': 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        'roc_auc': curves.pop('roc_auc'),
+        'average_precision': curves.pop('average_precision'),
+    }
+    return {
+        'rows': len(y_true),
+        'metrics': {name: float(value) for name, value in metrics.items()},
+        'confusion': matrix.tolist(),
+        'curves': {name: values.tolist() for name, values in curves.items()},
+        'histogram': {
+            'edges': np.linspace(0, 1, HISTOGRAM_BINS + 1).tolist(),
+            'counts': probability_histograms(y_true, score).tolist(),
+        },
+    }
+
+
+def evaluation_key(name=CATALOG, tier=None):
+    """Store key: version of the tier's model and the preprocessor, plus the dataset hash"""
+    version = scoring_version(tier=tier).replace(':', '-')
+    return f"{version}-{ensure_columnar(name)['sha256'][:12]}"
+
+
+def _report_path(key):
+    return os.path.join(EVALUATION_DIR, f"{key}.json")
+
+
+def _read_report(key):
+    try:
+        with open(_report_path(key)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_report(key, report):
+    os.makedirs(EVALUATION_DIR, exist_ok=True)
+    path = _report_path(key)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(report, f)
+    os.replace(path + '.tmp', path)
+
+
+def run_evaluation(name=CATALOG, tier=None):
+    """Score the held-out split with a model tier (default: the one predictions use) and build its report"""
+    start = time.perf_counter()
+    tier = tier or DEFAULT_TIER
+    test, labels = holdout_split(load_frame(name))
+    _, probabilities, _ = predict_with_preprocessing(test, use_cache=False, tier=tier)
+    report = evaluate(labels, probabilities)
+    report['dataset'] = name
+    report['tier'] = tier
+    report['model_version'] = scoring_version(tier=tier)
+    report['seconds'] = round(time.perf_counter() - start, 3)
+    report['created_at'] = time.time()
+    return report
+
+
+def get_evaluation(name=CATALOG, tier=None):
+    """Evaluation report for a model tier, computed once per version and stored on disk"""
+    key = evaluation_key(name, tier)
+    report = _reports.get(key)
+    if report is not None:
+        return report
+    with _lock:
+        report = _reports.get(key) or _read_report(key)
+        if report is None:
+            report = run_evaluation(name, tier)
+            report['key'] = key
+            _write_report(key, report)
+            logger.info("Evaluated model %s on %d held-out rows in %.2fs", key, report['rows'], report['seconds'])
+        _reports[key] = report
+    return report
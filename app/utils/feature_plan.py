@@ -0,0 +1,112 @@
+import numpy as np
+
+from .tracing import span
+
+DELIVNAME_COLUMN = 'koi_tce_delivname'
+DELIVNAME_PREFIX = DELIVNAME_COLUMN + '_'
+
+# Engineered features: name -> (left operand, right operand, operation)
+ENGINEERED_FEATURES = {
+    'depth_duration_ratio': ('koi_depth', 'koi_duration', 'ratio'),
+    'insol_prad_ratio': ('koi_insol', 'koi_prad', 'ratio'),
+    'stellar_luminosity_proxy': ('koi_steff', 'koi_srad', 'times_square'),
+}
+
+
+class FeaturePlan:
+    """Raw KOI columns -> scaled model input, compiled once from preprocessor.pkl.
+
+    Produces exactly what preprocess_features + scaler.transform produce, but
+    writes every column straight into one preallocated matrix in training
+    feature order: raw columns are copied, the koi_tce_delivname dummies are
+    copied when the input has them and compared in place otherwise, missing values get the training medians in one masked
+    copy, ratios are computed into their own columns and the scaler's
+    mean/scale are applied in place.
+    """
+
+    def __init__(self, features, mean, scale, medians=None, dtype=np.float64):
+        self.features = list(features)
+        self.dtype = np.dtype(dtype)
+        self.mean = np.asarray(mean, dtype=self.dtype)
+        self.scale = np.asarray(scale, dtype=self.dtype)
+        self.medians = None if medians is None else np.asarray(medians, dtype=self.dtype)
+
+        index = {name: i for i, name in enumerate(self.features)}
+        self.dummies = [(index[name], name[len(DELIVNAME_PREFIX):])
+                        for name in self.features if name.startswith(DELIVNAME_PREFIX)]
+        self.engineered = [(index[name], index[left], index[right], operation)
+                           for name, (left, right, operation) in ENGINEERED_FEATURES.items()
+                           if name in index]
+        derived = {i for i, _ in self.dummies} | {i for i, _, _, _ in self.engineered}
+        self.raw = [(i, name) for i, name in enumerate(self.features) if i not in derived]
+
+    @classmethod
+    def from_preprocessor(cls, prep, dtype=np.float64):
+        scaler = prep['scaler']
+        return cls(prep['features'], scaler.mean_, scaler.scale_, prep.get('medians'), dtype=dtype)
+
+    @property
+    def n_features(self):
+        return len(self.features)
+
+    def transform(self, df, out=None):
+        """Scaled feature matrix (n_rows, n_features) for a raw KOI DataFrame"""
+        n_rows = len(df)
+        with span('features', rows=n_rows):
+            out = self._features(df, out)
+        with span('scale', rows=n_rows, nbytes=out.nbytes):
+            out -= self.mean
+            out /= self.scale
+        return out
+
+    def _dummy(self, df, name, value, delivname):
+        """One koi_tce_delivname dummy column, or NaN when the input has neither form"""
+        # Dummies already in the input (e.g. the single-prediction form) are used as given
+        if name in df.columns:
+            return df[name].to_numpy(dtype=self.dtype, na_value=np.nan)
+        if delivname is not None:
+            return (delivname == value).astype(self.dtype)
+        return np.full(len(df), np.nan, dtype=self.dtype)
+
+    def encode_dummies(self, df):
+        """df with the koi_tce_delivname dummies as columns in place of koi_tce_delivname.
+
+        transform() gives the same rows either way. Frames that send the
+        run raw and frames that send it one-hot can only be concatenated
+        once both are in this form.
+        """
+        delivname = df[DELIVNAME_COLUMN].to_numpy() if DELIVNAME_COLUMN in df.columns else None
+        dummies = {self.features[i]: self._dummy(df, self.features[i], value, delivname)
+                   for i, value in self.dummies if self.features[i] not in df.columns}
+        return df.drop(columns=[DELIVNAME_COLUMN], errors='ignore').assign(**dummies)
+
+    def _features(self, df, out):
+        """Unscaled matrix: raw columns, dummies, imputation and engineered features"""
+        n_rows = len(df)
+        if out is None:
+            # Column-major: every step below writes or reads whole columns
+            out = np.empty((n_rows, self.n_features), dtype=self.dtype, order='F')
+
+        for i, name in self.raw:
+            if name in df.columns:
+                out[:, i] = df[name].to_numpy(dtype=self.dtype, na_value=np.nan)
+            else:
+                out[:, i] = np.nan
+
+        delivname = df[DELIVNAME_COLUMN].to_numpy() if DELIVNAME_COLUMN in df.columns else None
+        for i, value in self.dummies:
+            out[:, i] = self._dummy(df, self.features[i], value, delivname)
+
+        medians = self.medians
+        if medians is None:
+            # Preprocessors saved before medians were stored: fall back to batch medians
+            with np.errstate(invalid='ignore'):
+                medians = np.nanmedian(out, axis=0) if n_rows else np.zeros(self.n_features)
+        np.copyto(out, medians, where=np.isnan(out))
+
+        for i, left, right, operation in self.engineered:
+            if operation == 'ratio':
+                np.divide(out[:, left], out[:, right] + 1e-6, out=out[:, i])
+            else:
+                np.multiply(out[:, left], out[:, right] ** 2, out=out[:, i])
+        return out
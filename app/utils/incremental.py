@@ -0,0 +1,312 @@
+import os
+import copy
+import json
+import time
+import shutil
+import logging
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from .data_store import CATALOG, get_data_path
+from .evaluation import LABELS, RANDOM_STATE, evaluate, holdout_split
+from .feature_plan import FeaturePlan
+from .model import MODEL_FILENAME, PREPROCESSOR_FILENAME, _file_sha256, get_model_path
+from .preprocessing import get_training_medians, preprocess_features
+from .training import clean_frame, load_config, train
+
+logger = logging.getLogger(__name__)
+
+# Versioned bundles: <BUNDLE_DIR>/<version>/{model, preprocessor, bundle.json}
+BUNDLE_DIR = get_model_path('bundles')
+BUNDLE_MANIFEST = 'bundle.json'
+
+# Rows are matched between catalog versions by KOI name
+KEY_COLUMN = 'kepoi_name'
+
+DEFAULT_BOOST_ROUNDS = 30
+DEFAULT_RF_TREES = 30
+
+
+def changed_rows(previous, current):
+    """Labelled rows of `current` that are new or differ from `previous` (matched on kepoi_name)"""
+    if KEY_COLUMN not in previous.columns or KEY_COLUMN not in current.columns:
+        raise ValueError(f"Both catalogs need a '{KEY_COLUMN}' column to match rows")
+    current = current[current['koi_disposition'].isin(list(LABELS))]
+    old = previous.drop_duplicates(KEY_COLUMN).set_index(KEY_COLUMN)
+    is_new = ~current[KEY_COLUMN].isin(old.index).to_numpy()
+
+    matched = current[~is_new]
+    before = old.loc[matched[KEY_COLUMN], matched.columns.drop(KEY_COLUMN)]
+    after = matched.set_index(KEY_COLUMN)[before.columns]
+    # Equal, or missing in both
+    same = (before.to_numpy() == after.to_numpy()) | (before.isna().to_numpy() & after.isna().to_numpy())
+    is_changed = np.zeros(len(current), dtype=bool)
+    is_changed[~is_new] = ~same.all(axis=1)
+    return current[is_new | is_changed], int(is_new.sum()), int(is_changed.sum())
+
+
+def balanced_weights(y):
+    """Sample weights giving both classes the same total weight, as SMOTE does for a full training"""
+    counts = np.bincount(y, minlength=2).astype(np.float64)
+    present = counts > 0
+    per_class = np.where(present, len(y) / (present.sum() * np.maximum(counts, 1)), 0.0)
+    return per_class[y]
+
+
+def _affine(old_scaler, new_scaler):
+    """(a, b) with new_scaled = a * old_scaled + b, per feature"""
+    a = old_scaler.scale_ / new_scaler.scale_
+    b = (old_scaler.mean_ - new_scaler.mean_) / new_scaler.scale_
+    return a, b
+
+
+def _rescale_forest(forest, a, b):
+    forest = copy.deepcopy(forest)
+    for tree in forest.estimators_:
+        nodes = tree.tree_
+        split = nodes.feature >= 0
+        # Writes through to the tree's node array
+        nodes.threshold[split] = nodes.threshold[split] * a[nodes.feature[split]] + b[nodes.feature[split]]
+    return forest
+
+
+def _rescale_lightgbm(lgbm, a, b):
+    import lightgbm
+
+    lines = lgbm.booster_.model_to_string().split('\n')
+    features = None
+    for i, line in enumerate(lines):
+        if line.startswith('split_feature='):
+            features = np.array(line.split('=', 1)[1].split(), dtype=np.intp)
+        elif line.startswith('threshold=') and features is not None:
+            thresholds = np.array(line.split('=', 1)[1].split(), dtype=np.float64)
+            thresholds = thresholds * a[features] + b[features]
+            lines[i] = 'threshold=' + ' '.join(repr(float(t)) for t in thresholds)
+            features = None
+    # tree_sizes holds byte offsets of the old text; without it the trees are parsed in sequence
+    lines = [line for line in lines if not line.startswith('tree_sizes=')]
+    lgbm = copy.deepcopy(lgbm)
+    lgbm._Booster = lightgbm.Booster(model_str='\n'.join(lines))
+    return lgbm
+
+
+def _rescale_xgboost(xgb, a, b):
+    model = json.loads(xgb.get_booster().save_raw('json'))
+    for tree in model['learner']['gradient_booster']['model']['trees']:
+        split = np.asarray(tree['left_children']) != -1
+        features = np.asarray(tree['split_indices'])[split]
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float64)
+        conditions[split] = conditions[split] * a[features] + b[features]
+        tree['split_conditions'] = conditions.tolist()
+    xgb = copy.deepcopy(xgb)
+    xgb.get_booster().load_model(bytearray(json.dumps(model).encode()))
+    return xgb
+
+
+def rescale_members(model, old_scaler, new_scaler):
+    """The ensemble with every split threshold moved from the old scaler's space to the new one.
+
+    Scaling is a per-feature affine map, so a tree splitting old-scaled
+    inputs at t makes the same decisions on new-scaled inputs at a*t + b
+    (up to float32 rounding at the thresholds).
+    """
+    a, b = _affine(old_scaler, new_scaler)
+    rescale = {'RandomForestClassifier': _rescale_forest, 'LGBMClassifier': _rescale_lightgbm,
+               'XGBClassifier': _rescale_xgboost}
+    model = copy.copy(model)
+    model.estimators_ = [rescale[type(estimator).__name__](estimator, a, b) for estimator in model.estimators_]
+    model.named_estimators_ = copy.copy(model.named_estimators_)
+    for (name, _), estimator in zip(model.estimators, model.estimators_):
+        model.named_estimators_[name] = estimator
+    return model
+
+
+def continue_lightgbm(lgbm, X, y, rounds, weights=None):
+    """Add boosting rounds fitted on (X, y) after the existing trees"""
+    import lightgbm
+
+    params = dict(lgbm.booster_.params, num_threads=0)
+    params.pop('num_iterations', None)
+    booster = lightgbm.train(params, lightgbm.Dataset(X, y, weight=weights), num_boost_round=rounds,
+                             init_model=lgbm.booster_, keep_training_booster=False)
+    lgbm = copy.deepcopy(lgbm)
+    lgbm._Booster = booster
+    lgbm.set_params(n_estimators=booster.current_iteration())
+    return lgbm
+
+
+def continue_xgboost(xgb, X, y, rounds, weights=None):
+    """Add boosting rounds fitted on (X, y) after the existing trees"""
+    import xgboost
+
+    params = {name: value for name, value in xgb.get_xgb_params().items() if value is not None}
+    booster = xgboost.train(params, xgboost.DMatrix(X, label=y, weight=weights), num_boost_round=rounds,
+                            xgb_model=xgb.get_booster())
+    xgb = copy.deepcopy(xgb)
+    xgb._Booster = booster
+    xgb.set_params(n_estimators=booster.num_boosted_rounds())
+    return xgb
+
+
+def refresh_forest(forest, X, y, n_trees, mode='replace', weights=None, random_state=RANDOM_STATE):
+    """Replace the oldest n_trees of the forest (or add n_trees) with trees grown on (X, y) only"""
+    from sklearn.base import clone
+
+    # Rows with zero weight register a class the delta lacks, so the new
+    # trees still output both class columns without learning from them
+    missing = np.setdiff1d(forest.classes_, y)
+    weights = np.r_[np.ones(len(y)) if weights is None else weights, np.zeros(len(missing))]
+    X = np.vstack([X, np.zeros((len(missing), X.shape[1]))])
+    y = np.r_[y, missing]
+
+    grown = clone(forest).set_params(n_estimators=n_trees, random_state=random_state, n_jobs=None)
+    grown.fit(X, y, sample_weight=weights)
+
+    forest = copy.copy(forest)
+    kept = forest.estimators_[n_trees:] if mode == 'replace' else forest.estimators_
+    forest.estimators_ = list(kept) + list(grown.estimators_)
+    forest.n_estimators = len(forest.estimators_)
+    return forest
+
+
+def _read_manifest(directory):
+    try:
+        with open(os.path.join(directory, BUNDLE_MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def comparison_rows(previous, current, delta):
+    """Held-out rows none of the compared models trained on, with their labels.
+
+    These are rows of the refreshed catalog's held-out split (which the full
+    retrain leaves out) that were also held out of the previous catalog
+    (which the current model left out) and are not in the delta.
+    """
+    test, labels = holdout_split(current)
+    previous_test, _ = holdout_split(previous)
+    keep = (test[KEY_COLUMN].isin(previous_test[KEY_COLUMN]) & ~test[KEY_COLUMN].isin(delta[KEY_COLUMN])).to_numpy()
+    return test[keep].reset_index(drop=True), labels[keep]
+
+
+def _holdout_metrics(model, preprocessor, test, labels):
+    X = FeaturePlan.from_preprocessor(preprocessor).transform(test)
+    return evaluate(labels, model.predict_proba(X), model.classes_)['metrics']
+
+
+def update(data_path, previous_path=None, base_dir=None, boost_rounds=DEFAULT_BOOST_ROUNDS,
+           rf_trees=DEFAULT_RF_TREES, rf_mode='replace', compare=True, install=False):
+    """Update the current model with the new and changed rows of a refreshed catalog.
+
+    The scaler statistics are updated with the delta rows and every member's
+    split thresholds are moved to the new scale. LightGBM and XGBoost then
+    continue boosting on the delta rows, and a slice of forest trees is
+    replaced (or added) with trees grown on the delta rows only. The result
+    is written as a new versioned bundle. With compare, a full retrain on
+    the refreshed catalog is run too and the held-out metrics of both are
+    reported.
+    """
+    if rf_mode not in ('replace', 'add'):
+        raise ValueError(f"Unknown forest mode '{rf_mode}', expected 'replace' or 'add'")
+    base_dir = base_dir or os.path.dirname(get_model_path(MODEL_FILENAME))
+    base_manifest = _read_manifest(base_dir) or {}
+    previous_path = previous_path or base_manifest.get('data') or get_data_path(CATALOG)
+    for path in (data_path, previous_path):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Catalog not found at: {path}")
+
+    start = time.perf_counter()
+    model = joblib.load(os.path.join(base_dir, MODEL_FILENAME))
+    preprocessor = joblib.load(os.path.join(base_dir, PREPROCESSOR_FILENAME))
+    previous = pd.read_csv(previous_path)
+    current = pd.read_csv(data_path)
+    delta, n_new, n_changed = changed_rows(previous, current)
+    if not len(delta):
+        raise ValueError("No new or changed labelled rows: nothing to update")
+
+    # Delta rows in training feature order, imputed with the training medians
+    features, y = clean_frame(delta)
+    medians = get_training_medians(preprocessor)
+    unscaled = preprocess_features(features, medians)[preprocessor['features']]
+
+    old_scaler = preprocessor['scaler']
+    scaler = copy.deepcopy(old_scaler).partial_fit(unscaled)
+    updated = rescale_members(model, old_scaler, scaler)
+    X = scaler.transform(unscaled)
+    weights = balanced_weights(y)
+
+    members = []
+    for (name, _), estimator in zip(updated.estimators, updated.estimators_):
+        kind = type(estimator).__name__
+        if kind == 'LGBMClassifier':
+            estimator = continue_lightgbm(estimator, X, y, boost_rounds, weights)
+        elif kind == 'XGBClassifier':
+            estimator = continue_xgboost(estimator, X, y, boost_rounds, weights)
+        elif kind == 'RandomForestClassifier':
+            estimator = refresh_forest(estimator, X, y, rf_trees, rf_mode, weights)
+        members.append((name, estimator))
+    updated.estimators_ = [estimator for _, estimator in members]
+    updated.named_estimators_ = copy.copy(updated.named_estimators_)
+    for name, estimator in members:
+        updated.named_estimators_[name] = estimator
+    preprocessor = dict(preprocessor, scaler=scaler)
+    update_seconds = time.perf_counter() - start
+
+    parent = _file_sha256(os.path.join(base_dir, MODEL_FILENAME))[:12]
+    version = f"{time.strftime('%Y%m%d-%H%M%S')}-{parent}"
+    directory = os.path.join(BUNDLE_DIR, version)
+    os.makedirs(directory, exist_ok=True)
+    joblib.dump(updated, os.path.join(directory, MODEL_FILENAME))
+    joblib.dump(preprocessor, os.path.join(directory, PREPROCESSOR_FILENAME))
+
+    report = {
+        'version': version,
+        'parent': parent,
+        'data': os.path.abspath(data_path),
+        'data_sha256': _file_sha256(data_path),
+        'previous': os.path.abspath(previous_path),
+        'rows': {'new': n_new, 'changed': n_changed, 'delta': len(delta),
+                 'confirmed': int(y.sum()), 'candidate': int(len(y) - y.sum())},
+        'settings': {'boost_rounds': boost_rounds, 'rf_trees': rf_trees, 'rf_mode': rf_mode},
+        'update_seconds': round(update_seconds, 3),
+        'created_at': time.time(),
+    }
+
+    if compare:
+        test, labels = comparison_rows(previous, current, delta)
+        metrics = {
+            'base': _holdout_metrics(model, dict(preprocessor, scaler=old_scaler), test, labels),
+            'incremental': _holdout_metrics(updated, preprocessor, test, labels),
+        }
+        retrain_dir = os.path.join(directory, 'retrain')
+        retrained = train(data_path=data_path, config=load_config(), output_dir=retrain_dir)
+        metrics['retrain'] = _holdout_metrics(joblib.load(os.path.join(retrain_dir, MODEL_FILENAME)),
+                                              joblib.load(os.path.join(retrain_dir, PREPROCESSOR_FILENAME)),
+                                              test, labels)
+        shutil.rmtree(retrain_dir, ignore_errors=True)
+        report['retrain_seconds'] = retrained['seconds']
+        report['comparison_rows'] = len(labels)
+        report['metrics'] = metrics
+        report['delta_vs_retrain'] = {name: round(value - metrics['retrain'][name], 6)
+                                      for name, value in metrics['incremental'].items()}
+
+    with open(os.path.join(directory, BUNDLE_MANIFEST), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if install:
+        install_bundle(directory, base_dir)
+    report['bundle'] = directory
+    return report
+
+
+def install_bundle(directory, models_dir=None):
+    """Make a bundle the served model (the registry reloads on the next check)"""
+    models_dir = models_dir or os.path.dirname(get_model_path(MODEL_FILENAME))
+    # Preprocessor first: the ensemble is what marks a new version as complete
+    for filename in (PREPROCESSOR_FILENAME, MODEL_FILENAME, BUNDLE_MANIFEST):
+        target = os.path.join(models_dir, filename)
+        shutil.copyfile(os.path.join(directory, filename), target + '.tmp')
+        os.replace(target + '.tmp', target)
@@ -0,0 +1,153 @@
+import os
+import logging
+import threading
+
+import numpy as np
+
+from .data_store import CATALOG, _columnar_path, ensure_columnar, load_columns
+
+logger = logging.getLogger(__name__)
+
+# Columns a KOI can be looked up by
+ID_COLUMNS = ('kepoi_name', 'kepler_name', 'kepid')
+
+# Bump when the index layout changes, so old files are rebuilt
+INDEX_VERSION = 1
+
+DEFAULT_LIMIT = 20
+
+_lock = threading.Lock()
+_indexes = {}
+_columns = {}
+
+
+def normalize(text):
+    """Search form of an identifier: case and surrounding spaces are ignored"""
+    return str(text).strip().upper()
+
+
+def _index_path(name):
+    """Stored next to the dataset's columnar copy, e.g. data/.columnar/Kepler.koi_index.npz"""
+    return _columnar_path(name) + '.koi_index.npz'
+
+
+class KOIIndex:
+    """Sorted identifier keys of a catalog for prefix search.
+
+    Every KOI has up to four keys: its kepoi_name (K00752.01), the same
+    without the K and leading zeros (752.01), its kepler_name and its
+    kepid. A prefix query is two binary searches over the sorted keys.
+    """
+
+    def __init__(self, keys, rows, labels, sha256):
+        self.keys = keys
+        self.rows = rows
+        self.labels = labels
+        self.sha256 = sha256
+
+    @classmethod
+    def build(cls, columns, sha256):
+        kepoi = columns['kepoi_name']
+        kepler = columns['kepler_name']
+        kepid = np.asarray(columns['kepid']).astype(np.int64)
+        n_rows = len(kepoi)
+
+        keys, rows = [], []
+        for row in range(n_rows):
+            candidates = {normalize(kepoi[row]), normalize(kepler[row]), str(kepid[row])}
+            if kepoi[row]:
+                candidates.add(normalize(kepoi[row]).lstrip('K').lstrip('0'))
+            for key in candidates - {''}:
+                keys.append(key)
+                rows.append(row)
+        keys = np.array(keys, dtype=str)
+        rows = np.array(rows, dtype=np.int32)
+        order = np.argsort(keys, kind='stable')
+        labels = np.array([' · '.join(part for part in (kepoi[row], kepler[row], f"KIC {kepid[row]}") if part)
+                           for row in range(n_rows)], dtype=str)
+        return cls(keys[order], rows[order], labels, sha256)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            if int(data['version']) != INDEX_VERSION:
+                raise ValueError(f"KOI index {path} has version {int(data['version'])}, expected {INDEX_VERSION}")
+            return cls(data['keys'], data['rows'], data['labels'], str(data['sha256']))
+
+    def save(self, path):
+        with open(path + '.tmp', 'wb') as f:
+            np.savez(f, keys=self.keys, rows=self.rows, labels=self.labels,
+                     sha256=np.array(self.sha256), version=np.array(INDEX_VERSION))
+        os.replace(path + '.tmp', path)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def search(self, query, limit=DEFAULT_LIMIT):
+        """Catalog rows with an identifier starting with query, exact matches first"""
+        # 'KIC 10797460' and 'KOI-752.01' are written forms of a kepid and a kepoi_name
+        prefix = normalize(query).removeprefix('KIC').removeprefix('KOI-').strip()
+        if not prefix:
+            return []
+        start = np.searchsorted(self.keys, prefix, side='left')
+        # U+FFFF sorts after every character used in identifiers
+        end = np.searchsorted(self.keys, prefix + '\uffff', side='left')
+        matches = []
+        for position in sorted(range(start, end), key=lambda i: (self.keys[i] != prefix, len(self.keys[i]))):
+            row = int(self.rows[position])
+            if row not in matches:
+                matches.append(row)
+                if len(matches) == limit:
+                    break
+        return matches
+
+    def label(self, row):
+        return str(self.labels[row])
+
+
+def load_index(name=CATALOG):
+    """Index of a catalog, read from disk and rebuilt only when the catalog changes"""
+    manifest = ensure_columnar(name)
+    cached = _indexes.get(name)
+    if cached is not None and cached.sha256 == manifest['sha256']:
+        return cached
+    with _lock:
+        cached = _indexes.get(name)
+        if cached is not None and cached.sha256 == manifest['sha256']:
+            return cached
+        path = _index_path(name)
+        index = None
+        if os.path.exists(path):
+            try:
+                index = KOIIndex.load(path)
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning("Rebuilding unreadable KOI index %s: %s", path, e)
+        if index is None or index.sha256 != manifest['sha256']:
+            index = KOIIndex.build(load_columns(name, ID_COLUMNS), manifest['sha256'])
+            index.save(path)
+            logger.info("Built KOI index for %s (%d objects, %d keys)", name, len(index), len(index.keys))
+        _indexes[name] = index
+        return index
+
+
+def koi_record(row, name=CATALOG):
+    """Every raw column of one catalog row; missing values are None.
+
+    Reads one element from each memory-mapped column, so the cost does
+    not depend on the catalog size.
+    """
+    manifest = ensure_columnar(name)
+    cached = _columns.get(name)
+    if cached is None or cached[0] != manifest['sha256']:
+        cached = _columns[name] = (manifest['sha256'], load_columns(name))
+    kinds = {entry['name']: entry['kind'] for entry in manifest['columns']}
+    record = {}
+    for column, array in cached[1].items():
+        value = array[row].item()
+        if kinds[column] == 'string':
+            record[column] = value or None
+        elif kinds[column] == 'numeric' and isinstance(value, float) and np.isnan(value):
+            record[column] = None
+        else:
+            record[column] = value
+    return record
@@ -1,5 +1,22 @@
 import os
-import joblib
+import time
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILENAME = 'ensemble_model_exoplanets.pkl'
+PREPROCESSOR_FILENAME = 'preprocessor.pkl'
+STUDENT_FILENAME = 'student_model.pkl'
+# Flat, memory-mapped copy of the ensemble's tree arrays (see utils.model_format)
+MAPPED_FILENAME = 'ensemble_model_exoplanets.trees'
+
+# Seconds between two stat() calls on the same artifact
+RELOAD_CHECK_INTERVAL = 2.0
 
 
 def get_model_path(filename):
@@ -9,11 +26,313 @@ def get_model_path(filename):
     model_dir = os.path.join(app_dir, 'models')  # Points to models directory at app level
     return os.path.join(model_dir, filename)
 
+
+def _file_signature(path):
+    """Cheap change detector: modification time and size"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _file_sha256(path):
+    """Content hash of an artifact, used as its version"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _resident_bytes():
+    """Current resident set size of this process (0 if unknown)"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _read_artifact(path):
+    """Exported .trees files are memory-mapped; everything else is a joblib pickle"""
+    if path.endswith('.trees'):
+        from .model_format import read_model_file
+
+        return read_model_file(path)
+    import joblib
+
+    return joblib.load(path)
+
+
+_source_hashes = {}
+
+
+def _current_sha256(path):
+    """Content hash of a file, recomputed only when its mtime/size change"""
+    signature = _file_signature(path)
+    cached = _source_hashes.get(path)
+    if cached is None or cached[0] != signature:
+        cached = _source_hashes[path] = (signature, _file_sha256(path))
+    return cached[1]
+
+
+@dataclass(frozen=True)
+class Artifact:
+    """A deserialized model file plus the metadata of its load"""
+    obj: object
+    path: str
+    signature: tuple
+    sha256: str
+    load_seconds: float
+    resident_bytes: int
+    file_bytes: int
+    loaded_at: float
+
+    @property
+    def version(self):
+        return self.sha256[:12]
+
+
+class ModelRegistry:
+    """Process-wide cache of the model and preprocessor.
+
+    Each artifact is unpickled once and shared by every caller. When the file
+    on disk changes (mtime/size, confirmed by content hash) the new version is
+    loaded next to the old one and swapped in with a single assignment, so
+    concurrent callers always see a complete object.
+    """
+
+    def __init__(self, check_interval=RELOAD_CHECK_INTERVAL):
+        self.check_interval = check_interval
+        self._artifacts = {}
+        self._last_check = {}
+        self._reloads = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._derived = {}
+
+    def _lock_for(self, filename):
+        with self._locks_guard:
+            return self._locks.setdefault(filename, threading.Lock())
+
+    def _load(self, filename, path, signature, sha256):
+        rss_before = _resident_bytes()
+        start = time.perf_counter()
+        obj = _read_artifact(path)
+        load_seconds = time.perf_counter() - start
+        artifact = Artifact(
+            obj=obj,
+            path=path,
+            signature=signature,
+            sha256=sha256,
+            load_seconds=load_seconds,
+            resident_bytes=max(_resident_bytes() - rss_before, 0),
+            file_bytes=signature[1],
+            loaded_at=time.time(),
+        )
+        logger.info("Loaded %s (version %s) in %.3fs, ~%.1f MB resident",
+                    filename, artifact.version, load_seconds,
+                    artifact.resident_bytes / 1e6)
+        return artifact
+
+    def get_artifact(self, filename):
+        """Return the current Artifact for filename, loading or reloading it if needed"""
+        artifact = self._artifacts.get(filename)
+        now = time.monotonic()
+        if artifact is not None and now - self._last_check.get(filename, 0.0) < self.check_interval:
+            return artifact
+
+        path = get_model_path(filename)
+        with self._lock_for(filename):
+            artifact = self._artifacts.get(filename)
+            try:
+                signature = _file_signature(path)
+            except FileNotFoundError:
+                if artifact is not None:
+                    # Keep serving the loaded version while the file is being replaced
+                    return artifact
+                raise FileNotFoundError(f"Model file not found: {path}")
+
+            self._last_check[filename] = now
+            if artifact is not None and artifact.signature == signature:
+                return artifact
+
+            sha256 = _file_sha256(path)
+            if artifact is not None and artifact.sha256 == sha256:
+                # Touched but not modified
+                self._artifacts[filename] = _replace_signature(artifact, signature)
+                return self._artifacts[filename]
+
+            new_artifact = self._load(filename, path, signature, sha256)
+            if artifact is not None:
+                self._reloads[filename] = self._reloads.get(filename, 0) + 1
+            self._artifacts[filename] = new_artifact
+            return new_artifact
+
+    def get(self, filename):
+        return self.get_artifact(filename).obj
+
+    def get_derived(self, filename, name, build):
+        """Object computed from an artifact by build(obj), cached until the artifact changes"""
+        artifact = self.get_artifact(filename)
+        key = (filename, name)
+        cached = self._derived.get(key)
+        if cached is not None and cached[0] == artifact.sha256:
+            return cached[1]
+        with self._lock_for(f"{filename}:{name}"):
+            cached = self._derived.get(key)
+            if cached is not None and cached[0] == artifact.sha256:
+                return cached[1]
+            start = time.perf_counter()
+            value = build(artifact.obj)
+            logger.info("Built %s for %s (version %s) in %.3fs",
+                        name, filename, artifact.version, time.perf_counter() - start)
+            self._derived[key] = (artifact.sha256, value)
+            return value
+
+    def stats(self):
+        """Load time and memory footprint of every loaded artifact"""
+        return [
+            {
+                'name': filename,
+                'version': artifact.version,
+                'load_seconds': round(artifact.load_seconds, 4),
+                'resident_mb': round(artifact.resident_bytes / 1e6, 2),
+                'file_mb': round(artifact.file_bytes / 1e6, 2),
+                'loaded_at': artifact.loaded_at,
+                'reloads': self._reloads.get(filename, 0),
+            }
+            for filename, artifact in self._artifacts.items()
+        ]
+
+    def clear(self):
+        with self._locks_guard:
+            self._artifacts = {}
+            self._last_check = {}
+            self._derived = {}
+
+
+def _replace_signature(artifact, signature):
+    return Artifact(**{**artifact.__dict__, 'signature': signature})
+
+
+registry = ModelRegistry()
+
+
 def load_model():
     try:
-        model_path = get_model_path('ensemble_model_exoplanets.pkl')
-        model = joblib.load(model_path)
-        return model
-    
+        return registry.get(MODEL_FILENAME)
+
     except FileNotFoundError:
         raise FileNotFoundError("Model file not found.")
+
+
+def load_compiled_model():
+    """Array-backed form of the ensemble (see utils.tree_engine), rebuilt when the model changes"""
+    from .tree_engine import compile_ensemble
+
+    try:
+        return registry.get_derived(MODEL_FILENAME, 'compiled', compile_ensemble)
+
+    except FileNotFoundError:
+        raise FileNotFoundError("Model file not found.")
+
+
+def load_parallel_model():
+    """The ensemble with its members scored concurrently (see utils.parallel_ensemble)"""
+    from .parallel_ensemble import ParallelEnsemble
+
+    try:
+        return registry.get_derived(MODEL_FILENAME, 'parallel', ParallelEnsemble)
+
+    except FileNotFoundError:
+        raise FileNotFoundError("Model file not found.")
+
+
+def load_mapped_model():
+    """The ensemble's tree arrays mapped from the exported file, shared by every process using it"""
+    try:
+        model = registry.get(MAPPED_FILENAME)
+    except FileNotFoundError:
+        raise FileNotFoundError("Mapped model not found. Run 'python main.py export-model' first.")
+
+    # Without the pickle (e.g. a deployment that only ships the .trees file) there is nothing to compare
+    source = get_model_path(MODEL_FILENAME)
+    if os.path.exists(source) and _current_sha256(source) != model.source_sha256:
+        raise ValueError(f"{MAPPED_FILENAME} was exported from another version of {MODEL_FILENAME}; "
+                         f"run 'python main.py export-model' again")
+    return model
+
+
+def load_student_model():
+    """Compiled distilled student (see utils.distill), rebuilt when its file changes"""
+    from .tree_engine import compile_lightgbm
+
+    try:
+        return registry.get_derived(STUDENT_FILENAME, 'compiled',
+                                    lambda bundle: compile_lightgbm(bundle['model'], len(bundle['features'])))
+
+    except FileNotFoundError:
+        raise FileNotFoundError("Student model not found. Run 'python main.py distill' first.")
+
+
+def student_features():
+    return registry.get(STUDENT_FILENAME)['features']
+
+
+def load_preprocessor():
+    try:
+        return registry.get(PREPROCESSOR_FILENAME)
+
+    except FileNotFoundError:
+        raise FileNotFoundError("Preprocessor not found. Please train the model first.")
+
+
+def model_version():
+    """Combined version of the model and preprocessor currently in use"""
+    model = registry.get_artifact(MODEL_FILENAME)
+    preprocessor = registry.get_artifact(PREPROCESSOR_FILENAME)
+    return f"{model.version}-{preprocessor.version}"
+
+
+def mapped_model_version():
+    """Same as model_version() for the pickle the mapped file came from, without loading the pickle"""
+    mapped = registry.get(MAPPED_FILENAME)
+    preprocessor = registry.get_artifact(PREPROCESSOR_FILENAME)
+    return f"{mapped.source_sha256[:12]}-{preprocessor.version}"
+
+
+def student_version():
+    """Version of the student model plus the preprocessor feeding it"""
+    student = registry.get_artifact(STUDENT_FILENAME)
+    preprocessor = registry.get_artifact(PREPROCESSOR_FILENAME)
+    return f"{student.version}-{preprocessor.version}"
+
+
+def load_feature_plan():
+    """Compiled preprocessing plan (see utils.feature_plan), rebuilt when the preprocessor changes"""
+    from .feature_plan import FeaturePlan
+
+    try:
+        return registry.get_derived(PREPROCESSOR_FILENAME, 'feature_plan', FeaturePlan.from_preprocessor)
+
+    except FileNotFoundError:
+        raise FileNotFoundError("Preprocessor not found. Please train the model first.")
+
+
+def warm_up(backend=None, tier=None):
+    """Load the artifacts a backend and tier score with and run one dummy prediction.
+
+    Only the selected model is loaded: with the mapped backend a process
+    maps the exported file and never unpickles the ensemble.
+    """
+    from .preprocessing import BACKENDS, DEFAULT_BACKEND, DEFAULT_TIER
+
+    start = time.perf_counter()
+    backend = backend or DEFAULT_BACKEND
+    tier = tier or DEFAULT_TIER
+    plan = load_feature_plan()
+    model = load_student_model() if tier == 'student' else BACKENDS[backend]()
+    model.predict_proba(np.zeros((1, plan.n_features)))
+    logger.info("Model warm-up (%s) finished in %.3fs",
+                'student' if tier == 'student' else backend, time.perf_counter() - start)
+    return registry.stats()
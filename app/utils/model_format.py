@@ -0,0 +1,266 @@
+import os
+import json
+import mmap
+import time
+import zlib
+import struct
+import logging
+
+import numpy as np
+
+from .tree_engine import (GROUP_NAMES, CompiledEnsemble, check_parity,
+                          compile_ensemble)
+
+logger = logging.getLogger(__name__)
+
+# File layout (all little-endian):
+#   magic (8 bytes) | format version (u32) | header length (u32) | header crc32 (u32) | reserved (u32)
+#   header: UTF-8 JSON with the scalars and the offset, dtype, shape and crc32 of every array
+#   arrays: raw C-order data, each starting on an ALIGNMENT boundary so it can be mapped in place
+MAGIC = b'EXOTREES'
+FORMAT_VERSION = 1
+PREFIX = struct.Struct('<8sIIII')
+ALIGNMENT = 64
+
+# Node and tree arrays stored in the file, with the dtype CompiledEnsemble uses for each
+ARRAYS = {
+    'feature': np.int32,
+    'threshold': np.float32,
+    'left': np.int32,
+    'default_left': np.bool_,
+    'value': np.float64,
+    'roots': np.int32,
+    'depths': np.int32,
+    'groups': np.int8,
+}
+
+
+def _group_ranges(compiled):
+    """(group, first node, end node) of each member; builders append members one after the other"""
+    ranges = []
+    for group in np.unique(compiled.groups):
+        trees = np.flatnonzero(compiled.groups == group)
+        end = compiled.roots[trees[-1] + 1] if trees[-1] + 1 < compiled.n_trees else compiled.n_nodes
+        ranges.append((int(group), int(compiled.roots[trees[0]]), int(end)))
+    return ranges
+
+
+def _round_down_float32(threshold):
+    """Largest float32 <= threshold; on float32 inputs x > t and x > this give the same answer"""
+    rounded = threshold.astype(np.float32)
+    above = rounded.astype(np.float64) > threshold
+    rounded[above] = np.nextafter(rounded[above], np.float32(-np.inf))
+    return rounded
+
+
+def float32_thresholds(compiled):
+    """float32 thresholds plus float64 copies of the members where float32 is not lossless.
+
+    Forest and XGBoost nodes read the float32-cast half of the input, so
+    rounding their thresholds down to float32 never changes a split.
+    LightGBM nodes compare float64 inputs; a member keeps its float64
+    thresholds unless every one of them is already a float32 value.
+    """
+    threshold = np.asarray(compiled.threshold, dtype=np.float64)
+    reads_float32 = compiled.feature >= compiled.n_features
+    rounded = _round_down_float32(threshold)
+    exact = []
+    for group, start, end in _group_ranges(compiled):
+        nodes = slice(start, end)
+        lossless = reads_float32[nodes] | (rounded[nodes].astype(np.float64) == threshold[nodes])
+        if not lossless.all():
+            exact.append((start, threshold[nodes].copy()))
+            logger.info("%s keeps float64 thresholds (%d of %d nodes are not float32 values)",
+                        GROUP_NAMES[group], int((~lossless).sum()), end - start)
+    return rounded, exact
+
+
+def compact(compiled):
+    """The compiled ensemble with float32 thresholds wherever that is lossless"""
+    threshold, exact = float32_thresholds(compiled)
+    return CompiledEnsemble(
+        n_features=compiled.n_features,
+        feature=compiled.feature,
+        threshold=threshold,
+        left=compiled.left,
+        default_left=compiled.default_left,
+        value=compiled.value,
+        roots=compiled.roots,
+        depths=compiled.depths,
+        groups=compiled.groups,
+        weights=compiled.weights,
+        xgb_base_margin=compiled.xgb_base_margin,
+        exact_thresholds=exact,
+    )
+
+
+class MappedEnsemble(CompiledEnsemble):
+    """CompiledEnsemble whose arrays are read-only views of a memory-mapped model file.
+
+    Processes that map the same file share one copy in the page cache.
+    """
+
+    def __init__(self, path, metadata, arrays):
+        super().__init__(
+            n_features=metadata['n_features'],
+            weights=metadata['weights'],
+            xgb_base_margin=metadata['xgb_base_margin'],
+            exact_thresholds=[(start, arrays[f"exact_{i}"]) for i, start in enumerate(metadata['exact_starts'])],
+            **{name: arrays[name] for name in ARRAYS},
+        )
+        self.path = path
+        self.metadata = metadata
+
+    @property
+    def source_sha256(self):
+        """Content hash of the pickle this file was exported from"""
+        return self.metadata['source_sha256']
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_model_file(compiled, path, metadata=None):
+    """Write a (compacted) CompiledEnsemble to path atomically; returns the header"""
+    arrays = {name: np.ascontiguousarray(getattr(compiled, name), dtype=dtype) for name, dtype in ARRAYS.items()}
+    for i, (_, exact) in enumerate(compiled.exact_thresholds):
+        arrays[f"exact_{i}"] = np.ascontiguousarray(exact, dtype=np.float64)
+
+    # Offsets are relative to the start of the data section, which follows the header
+    table, offset = {}, 0
+    for name, array in arrays.items():
+        offset = _aligned(offset)
+        table[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset,
+                       'crc32': zlib.crc32(array.data)}
+        offset += array.nbytes
+    header = dict(metadata or {},
+                  n_features=int(compiled.n_features),
+                  n_trees=int(compiled.n_trees),
+                  n_nodes=int(compiled.n_nodes),
+                  weights=[float(w) for w in compiled.weights],
+                  xgb_base_margin=float(compiled.xgb_base_margin),
+                  exact_starts=[start for start, _ in compiled.exact_thresholds],
+                  arrays=table)
+    encoded = json.dumps(header, sort_keys=True).encode()
+    data_start = _aligned(PREFIX.size + len(encoded))
+
+    with open(path + '.tmp', 'wb') as f:
+        f.write(PREFIX.pack(MAGIC, FORMAT_VERSION, len(encoded), zlib.crc32(encoded), 0))
+        f.write(encoded)
+        for name, array in arrays.items():
+            f.seek(data_start + table[name]['offset'])
+            f.write(array.data)
+    os.replace(path + '.tmp', path)
+    return header
+
+
+def read_model_file(path, verify=True):
+    """Map a model file and return a MappedEnsemble; verify checks every array's crc32"""
+    with open(path, 'rb') as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError(f"Model file {path} is empty")
+
+    if len(buffer) < PREFIX.size:
+        raise ValueError(f"Model file {path} is truncated")
+    magic, version, header_length, header_crc, _ = PREFIX.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not an exported model file")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Model file {path} has format version {version}, this code reads {FORMAT_VERSION}; "
+                         f"run 'python main.py export-model' again")
+    encoded = buffer[PREFIX.size:PREFIX.size + header_length]
+    if len(encoded) != header_length or zlib.crc32(encoded) != header_crc:
+        raise ValueError(f"Model file {path} has a corrupted header")
+    metadata = json.loads(encoded)
+    data_start = _aligned(PREFIX.size + header_length)
+
+    arrays = {}
+    for name, entry in metadata['arrays'].items():
+        dtype = np.dtype(entry['dtype'])
+        count = int(np.prod(entry['shape']))
+        start = data_start + entry['offset']
+        if start + count * dtype.itemsize > len(buffer):
+            raise ValueError(f"Model file {path} is truncated")
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=start).reshape(entry['shape'])
+        if verify and zlib.crc32(array.data) != entry['crc32']:
+            raise ValueError(f"Model file {path} is corrupted (checksum mismatch in '{name}')")
+        arrays[name] = array
+    return MappedEnsemble(path, metadata, arrays)
+
+
+def parity_rows(seed=0):
+    """Catalog rows and fresh synthetic KOIs through the inference preprocessing"""
+    from .data_store import CATALOG, load_frame
+    from .model import load_feature_plan
+    from .synthetic import KOISampler
+
+    plan = load_feature_plan()
+    return np.vstack([plan.transform(load_frame(CATALOG)), plan.transform(KOISampler().sample(10_000, seed=seed))])
+
+
+def export_model(model_path=None, output_path=None, atol=1e-6):
+    """Export the pickled ensemble to the flat model file and check it against the pickle.
+
+    The exported file is mapped back and must match the pickle's
+    probabilities within atol and its labels and held-out accuracy
+    exactly; otherwise nothing is written. Returns the export report.
+    """
+    import joblib
+
+    from .data_store import CATALOG, load_frame
+    from .evaluation import evaluate, holdout_split
+    from .model import MAPPED_FILENAME, MODEL_FILENAME, _file_sha256, get_model_path, load_feature_plan
+
+    model_path = model_path or get_model_path(MODEL_FILENAME)
+    output_path = output_path or get_model_path(MAPPED_FILENAME)
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model file not found: {model_path}")
+
+    start = time.perf_counter()
+    model = joblib.load(model_path)
+    pickle_seconds = time.perf_counter() - start
+    compacted = compact(compile_ensemble(model))
+    metadata = {'source': os.path.basename(model_path), 'source_sha256': _file_sha256(model_path),
+                'created_at': time.time()}
+    write_model_file(compacted, output_path + '.new', metadata)
+
+    try:
+        start = time.perf_counter()
+        mapped = read_model_file(output_path + '.new')
+        load_seconds = time.perf_counter() - start
+
+        X = parity_rows()
+        max_diff = check_parity(model, mapped, X, atol=atol)
+        disagreements = int((model.predict(X) != mapped.predict(X)).sum())
+        if disagreements:
+            raise ValueError(f"Exported model changes {disagreements} of {len(X)} labels")
+        test, labels = holdout_split(load_frame(CATALOG))
+        X_test = load_feature_plan().transform(test)
+        accuracy = {name: evaluate(labels, estimator.predict_proba(X_test))['metrics']['accuracy']
+                    for name, estimator in (('pickle', model), ('mapped', mapped))}
+        if accuracy['pickle'] != accuracy['mapped']:
+            raise ValueError(f"Exported model accuracy {accuracy['mapped']:.4f} differs from "
+                             f"the pickle's {accuracy['pickle']:.4f}")
+        os.replace(output_path + '.new', output_path)
+    finally:
+        if os.path.exists(output_path + '.new'):
+            os.remove(output_path + '.new')
+
+    exact_nodes = sum(len(exact) for _, exact in compacted.exact_thresholds)
+    return {
+        'path': output_path,
+        'source_sha256': metadata['source_sha256'],
+        'trees': compacted.n_trees,
+        'nodes': compacted.n_nodes,
+        'float32_threshold_nodes': compacted.n_nodes - exact_nodes,
+        'file_bytes': os.path.getsize(output_path),
+        'pickle_bytes': os.path.getsize(model_path),
+        'pickle_load_seconds': round(pickle_seconds, 4),
+        'load_seconds': round(load_seconds, 4),
+        'parity_rows': len(X),
+        'max_abs_diff': max_diff,
+        'holdout_accuracy': accuracy,
+    }
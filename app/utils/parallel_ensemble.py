@@ -0,0 +1,117 @@
+import os
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .tracing import current_trace
+
+# Per-member thread counts, e.g. "rf=4,lgbm=2,xgb=2"; unset members share the cores
+MEMBER_JOBS = os.environ.get('EXOPLANET_MEMBER_JOBS', '')
+
+# Below this many rows the members run one after another in the calling thread
+PARALLEL_MIN_ROWS = 256
+
+# Smallest row slice handed to one forest thread
+MIN_SLICE_ROWS = 1024
+
+FOREST_TYPES = ('RandomForestClassifier', 'ExtraTreesClassifier')
+
+
+def parse_member_jobs(spec):
+    """'rf=4,lgbm=2' -> {'rf': 4, 'lgbm': 2}"""
+    jobs = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, value = item.partition('=')
+        if not value.isdigit() or int(value) < 1:
+            raise ValueError(f"Invalid member jobs '{item}', expected name=<threads>")
+        jobs[name.strip()] = int(value)
+    return jobs
+
+
+def default_member_jobs(names, cpus=None):
+    """Half the cores for the forest (the slowest member), the rest split between the boosters"""
+    cpus = cpus or os.cpu_count() or 1
+    boosters = [name for name in names if name != 'rf']
+    jobs = {name: max(1, (cpus - cpus // 2) // max(len(boosters), 1)) for name in boosters}
+    if 'rf' in names:
+        jobs['rf'] = max(1, cpus // 2)
+    return jobs
+
+
+class ParallelEnsemble:
+    """Soft VotingClassifier whose members score concurrently on a thread pool.
+
+    The forest, LightGBM and XGBoost spend their time in native code that
+    releases the GIL, so the members run on separate threads. Each member
+    also gets its own thread count: LightGBM and XGBoost through their
+    native thread settings, and the forest by splitting rows across
+    threads. Row splitting keeps sklearn's tree-by-tree summation order
+    for every row, so the result does not depend on the thread count. The
+    member probabilities are averaged exactly as VotingClassifier does,
+    which makes the output bit-identical to model.predict_proba.
+    """
+
+    def __init__(self, model, member_jobs=None):
+        if getattr(model, 'voting', None) != 'soft':
+            raise ValueError("Only soft-voting ensembles can run in parallel")
+        self.classes_ = model.classes_
+        self.weights = model._weights_not_none
+        self.names = [name for name, estimator in model.estimators if estimator != 'drop']
+        jobs = default_member_jobs(self.names)
+        jobs.update(parse_member_jobs(MEMBER_JOBS) if member_jobs is None else member_jobs)
+        self.member_jobs = {name: jobs.get(name, 1) for name in self.names}
+
+        self.members = []
+        for name, estimator in zip(self.names, model.estimators_):
+            kind = type(estimator).__name__
+            if kind == 'XGBClassifier':
+                # Thread count is a booster setting: configure a private copy
+                estimator = copy.deepcopy(estimator)
+                estimator.set_params(n_jobs=self.member_jobs[name])
+            self.members.append((name, kind, estimator))
+
+        self._member_pool = ThreadPoolExecutor(max_workers=len(self.members), thread_name_prefix='member')
+        forest_jobs = max([self.member_jobs[name] for name, kind, _ in self.members if kind in FOREST_TYPES],
+                          default=1)
+        self._slice_pool = ThreadPoolExecutor(max_workers=forest_jobs, thread_name_prefix='forest-slice')
+
+    def _forest_proba(self, estimator, X, jobs):
+        n_slices = min(jobs, max(len(X) // MIN_SLICE_ROWS, 1))
+        if n_slices == 1:
+            return estimator.predict_proba(X)
+        bounds = np.linspace(0, len(X), n_slices + 1).astype(int)
+        futures = [self._slice_pool.submit(estimator.predict_proba, X[start:stop])
+                   for start, stop in zip(bounds[:-1], bounds[1:])]
+        return np.concatenate([future.result() for future in futures])
+
+    def _member_proba(self, name, kind, estimator, X):
+        start = time.perf_counter()
+        if kind in FOREST_TYPES:
+            probabilities = self._forest_proba(estimator, X, self.member_jobs[name])
+        elif kind == 'LGBMClassifier':
+            probabilities = estimator.predict_proba(X, num_threads=self.member_jobs[name])
+        else:
+            probabilities = estimator.predict_proba(X)
+        return probabilities, time.perf_counter() - start
+
+    def predict_proba(self, X):
+        if len(X) < PARALLEL_MIN_ROWS:
+            results = [self._member_proba(name, kind, estimator, X) for name, kind, estimator in self.members]
+        else:
+            futures = [self._member_pool.submit(self._member_proba, name, kind, estimator, X)
+                       for name, kind, estimator in self.members]
+            results = [future.result() for future in futures]
+
+        active = current_trace()
+        if active is not None:
+            for (name, _, _), (_, seconds) in zip(self.members, results):
+                active.record(f"member:{name}", seconds, rows=len(X))
+
+        # Same stacking, order and weights as VotingClassifier.predict_proba
+        return np.average(np.asarray([probabilities for probabilities, _ in results]),
+                          axis=0, weights=self.weights)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
@@ -0,0 +1,179 @@
+import os
+import hashlib
+import threading
+
+import numpy as np
+
+from .tracing import span
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get('EXOPLANET_CACHE_MAX_ENTRIES', 200_000))
+DEFAULT_MAX_MB = float(os.environ.get('EXOPLANET_CACHE_MAX_MB', 64))
+CACHE_ENABLED = os.environ.get('EXOPLANET_PREDICTION_CACHE', '1') != '0'
+
+# Bytes per entry: two key halves, the probability pair and the last-use tick, all 8 bytes wide
+ENTRY_BYTES = 8 * (2 + 2 + 1)
+
+# A full cache evicts this fraction of its limit beyond what a store needs
+EVICT_FRACTION = 16
+
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+_SEEDS = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xC2B2AE3D27D4EB4F))
+
+
+def _mix(x):
+    """splitmix64 finalizer, applied element-wise (uint64 arithmetic wraps)"""
+    x = (x ^ (x >> np.uint64(30))) * _MIX_1
+    x = (x ^ (x >> np.uint64(27))) * _MIX_2
+    return x ^ (x >> np.uint64(31))
+
+
+def row_keys(X):
+    """Stable 128-bit key per row of the final feature matrix, computed column by column.
+
+    Keys only depend on the float64 values (and their order), so they are the
+    same across processes and runs. Returns an (n, 2) uint64 array.
+    """
+    X = np.asarray(X, dtype=np.float64) + 0.0  # -0.0 -> 0.0
+    bits = X.view(np.uint64) if X.flags.c_contiguous else np.ascontiguousarray(X).view(np.uint64)
+    halves = []
+    with np.errstate(over='ignore'):
+        for seed in _SEEDS:
+            h = np.full(len(X), seed, dtype=np.uint64)
+            for j in range(X.shape[1]):
+                h = _mix(h ^ (bits[:, j] + seed))
+            halves.append(h)
+    return np.stack(halves, axis=1)
+
+
+def _version_key(version):
+    """Two uint64 words derived from a model version string"""
+    digest = hashlib.blake2b(str(version).encode(), digest_size=16).digest()
+    return np.frombuffer(digest, dtype=np.uint64)
+
+
+class PredictionCache:
+    """Bounded LRU of class probabilities keyed by (model version, feature vector key).
+
+    Entries are parallel arrays sorted by the first key word, so a lookup
+    or store of n rows is a searchsorted over the whole batch rather than
+    a loop over rows. The model version is folded into the key. Recency
+    is the tick of the last lookup or store that touched an entry, and
+    evictions drop the oldest ticks in bulk.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_mb=DEFAULT_MAX_MB):
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._hi = np.zeros(0, dtype=np.uint64)
+        self._lo = np.zeros(0, dtype=np.uint64)
+        self._probabilities = np.zeros((0, 2))
+        self._used = np.zeros(0, dtype=np.int64)
+        self._tick = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def nbytes(self):
+        return self._hi.nbytes + self._lo.nbytes + self._probabilities.nbytes + self._used.nbytes
+
+    @property
+    def limit(self):
+        """Most entries the cache holds: max_entries, or fewer if max_mb is smaller"""
+        return min(self.max_entries, self.max_bytes // ENTRY_BYTES)
+
+    def _find(self, hi, lo):
+        """Position of each key in the sorted arrays and whether it is there"""
+        positions = np.searchsorted(self._hi, hi)
+        found = np.zeros(len(hi), dtype=bool)
+        inside = positions < len(self._hi)
+        found[inside] = (self._hi[positions[inside]] == hi[inside]) & (self._lo[positions[inside]] == lo[inside])
+        return positions, found
+
+    def lookup(self, version, keys):
+        """Cached probabilities (NaN rows for misses) and the boolean miss mask"""
+        keys = np.asarray(keys, dtype=np.uint64) ^ _version_key(version)
+        probabilities = np.full((len(keys), 2), np.nan)
+        with self._lock:
+            positions, found = self._find(keys[:, 0], keys[:, 1])
+            probabilities[found] = self._probabilities[positions[found]]
+            self._tick += 1
+            self._used[positions[found]] = self._tick
+            hits = int(found.sum())
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return probabilities, ~found
+
+    def store(self, version, keys, probabilities):
+        limit = self.limit
+        if limit <= 0:
+            return
+        # A batch larger than the cache would only evict itself
+        keys = (np.asarray(keys, dtype=np.uint64) ^ _version_key(version))[-limit:]
+        probabilities = np.asarray(probabilities, dtype=np.float64)[-limit:]
+        order = np.lexsort((keys[:, 1], keys[:, 0]))
+        hi, lo, probabilities = keys[order, 0], keys[order, 1], probabilities[order]
+        # Equal rows have equal probabilities, so the first of each will do
+        unique = np.ones(len(hi), dtype=bool)
+        unique[1:] = (hi[1:] != hi[:-1]) | (lo[1:] != lo[:-1])
+        hi, lo, probabilities = hi[unique], lo[unique], probabilities[unique]
+        with self._lock:
+            self._tick += 1
+            positions, found = self._find(hi, lo)
+            self._probabilities[positions[found]] = probabilities[found]
+            self._used[positions[found]] = self._tick
+            new = ~found
+
+            overflow = len(self._hi) + int(new.sum()) - limit
+            if overflow > 0:
+                # Make room for the next few stores too, so a full cache is not scanned on every store
+                overflow = min(overflow + limit // EVICT_FRACTION, len(self._hi))
+                keep = np.ones(len(self._hi), dtype=bool)
+                keep[np.argpartition(self._used, overflow - 1)[:overflow]] = False
+                self._hi, self._lo = self._hi[keep], self._lo[keep]
+                self._probabilities, self._used = self._probabilities[keep], self._used[keep]
+                self.evictions += overflow
+                positions = np.searchsorted(self._hi, hi)
+
+            if not new.any():
+                return
+            # keys are sorted by (hi, lo), so the insert positions are ascending
+            at = positions[new]
+            self._hi = np.insert(self._hi, at, hi[new])
+            self._lo = np.insert(self._lo, at, lo[new])
+            self._probabilities = np.insert(self._probabilities, at, probabilities[new], axis=0)
+            self._used = np.insert(self._used, at, self._tick)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._hi),
+            'mb': round(self.nbytes / (1024 * 1024), 2),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / total, 4) if total else 0.0,
+            'evictions': self.evictions,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._hi, self._lo = self._hi[:0], self._lo[:0]
+            self._probabilities, self._used = self._probabilities[:0], self._used[:0]
+
+
+prediction_cache = PredictionCache()
+
+
+def cached_predict_proba(model, X, version, cache=prediction_cache):
+    """model.predict_proba(X) where only rows missing from the cache reach the model"""
+    with span('cache_lookup', rows=len(X)):
+        keys = row_keys(X)
+        probabilities, miss = cache.lookup(version, keys)
+    if miss.any():
+        with span('model', rows=int(miss.sum())):
+            fresh = model.predict_proba(X[miss])
+        probabilities[miss] = fresh
+        cache.store(version, keys[miss], fresh)
+    return probabilities
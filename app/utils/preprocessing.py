@@ -1,64 +1,113 @@
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import StandardScaler
-import joblib
 import os
 
+from .model import (load_model, load_compiled_model, load_mapped_model, load_parallel_model, load_feature_plan,
+                    load_student_model, mapped_model_version, model_version, student_features, student_version)
+from .prediction_cache import CACHE_ENABLED, cached_predict_proba
+from .tracing import current_trace, frame_bytes, span
+
 # Define model path
 MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models', 'ensemble_model_exoplanets.pkl')
 PREPROCESSOR_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'models', 'preprocessor.pkl')
 
+# Inference backends: the pickled VotingClassifier, its array-backed compiled form,
+# the same arrays memory-mapped from the exported file, or the members scored concurrently
+BACKENDS = {
+    'sklearn': load_model,
+    'compiled': load_compiled_model,
+    'mapped': load_mapped_model,
+    'parallel': load_parallel_model,
+}
+DEFAULT_BACKEND = os.environ.get('EXOPLANET_BACKEND', 'sklearn')
+
+# Model tiers: the full ensemble, or the distilled student for low-latency single predictions
+TIERS = ('full', 'student')
+DEFAULT_TIER = os.environ.get('EXOPLANET_TIER', 'full')
+
+class _MemberTimedVoting:
+    """Soft VotingClassifier evaluated member by member, with a timing span per member.
+
+    Averages the same member probabilities in the same order as
+    VotingClassifier.predict_proba, so the output is identical.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.classes_ = model.classes_
+        self.names = [name for name, estimator in model.estimators if estimator != 'drop']
+
+    def predict_proba(self, X):
+        probabilities = []
+        for name, estimator in zip(self.names, self.model.estimators_):
+            with span(f"member:{name}", rows=len(X)):
+                probabilities.append(estimator.predict_proba(X))
+        return np.average(np.asarray(probabilities), axis=0, weights=self.model._weights_not_none)
+
+
 def fit_preprocessor(df):
-    """Fit the scaler with training data and save feature order"""
+    """Fit the scaler with training data and save feature order and imputation medians"""
+    import joblib
+    from sklearn.preprocessing import StandardScaler
+
     feature_columns = df.columns.tolist()
     scaler = StandardScaler()
     scaler.fit(df)
     
-    # Save both scaler and feature order
+    # Save scaler, feature order and training medians (aligned with the features)
     joblib.dump({
         'scaler': scaler,
-        'features': feature_columns
+        'features': feature_columns,
+        'medians': df.median(numeric_only=True).reindex(feature_columns).to_numpy(dtype=float)
     }, PREPROCESSOR_PATH)
 
-def transform_data(df):
-    """Transform new data using saved preprocessor"""
+
+def get_training_medians(prep):
+    """Training-time medians as a Series indexed by feature, or None for old preprocessors"""
+    medians = prep.get('medians')
+    if medians is None:
+        return None
+    return pd.Series(medians, index=prep['features'])
+
+def transform_array(df):
+    """Transform new data into the scaled model input matrix.
+
+    Returns (X, true_labels): X is an ndarray in training feature order and
+    true_labels is None unless the frame has a koi_disposition column.
+    """
     try:
-        # Load preprocessor components
-        if os.path.exists(PREPROCESSOR_PATH):
-            prep = joblib.load(PREPROCESSOR_PATH)
-            scaler = prep['scaler']
-            feature_columns = prep['features']
-        else:
-            raise FileNotFoundError("Preprocessor not found. Please train the model first.")
+        # Compiled once per preprocessor version
+        plan = load_feature_plan()
 
         # Store disposition if exists for later use
-        has_disposition = False
         true_labels = None
         if 'koi_disposition' in df.columns:
-            has_disposition = True
             true_labels = df['koi_disposition'].map({'CANDIDATE': 0, 'CONFIRMED': 1})
-            df = df.drop(columns=['koi_disposition'])
 
-        # Process data
-        processed_df = preprocess_features(df)
-        
-        # Scale features
-        scaled_data = scaler.transform(processed_df)
-        scaled_df = pd.DataFrame(scaled_data, columns=processed_df.columns)
-        
-        # Ensure feature order matches training
-        for col in feature_columns:
-            if col not in scaled_df.columns:
-                scaled_df[col] = 0
-                
-        return scaled_df[feature_columns], true_labels if has_disposition else scaled_df[feature_columns]
-        
+        with span('preprocess', rows=len(df), nbytes=frame_bytes(df)):
+            return plan.transform(df), true_labels
+
     except Exception as e:
         raise ValueError(f"Error preprocessing data: {str(e)}")
+
+
+def transform_data(df):
+    """Transform new data using saved preprocessor"""
+    X, true_labels = transform_array(df)
+    scaled_df = pd.DataFrame(X, columns=load_feature_plan().features, copy=False)
+    if true_labels is not None:
+        return scaled_df, true_labels
+    return scaled_df
    
 
-def preprocess_features(df):
-    """Apply feature engineering and cleaning"""
+def preprocess_features(df, medians=None):
+    """Apply feature engineering and cleaning.
+
+    Missing values are filled with the training medians when given, so the
+    result does not depend on which other rows are in the batch. This is the
+    pandas reference for utils.feature_plan.FeaturePlan, which the inference
+    path uses.
+    """
     # Drop unnecessary columns
     columns_to_drop = ['kepid', 'kepoi_name', 'kepler_name', 'koi_pdisposition',
                       'koi_score', 'koi_teq_err1', 'koi_teq_err2', 'koi_tce_plnt_num']
@@ -76,7 +125,10 @@ def preprocess_features(df):
         df = pd.concat([df, dummies[expected_dummies]], axis=1)
     
     # Fill missing values
-    df = df.fillna(df.median(numeric_only=True))
+    if medians is None:
+        # Preprocessors saved before medians were stored: fall back to batch medians
+        medians = df.median(numeric_only=True)
+    df = df.fillna(medians)
     
     # Create engineered features
     if set(['koi_depth', 'koi_duration']).issubset(df.columns):
@@ -88,27 +140,55 @@ def preprocess_features(df):
     
     return df
 
-def predict_with_preprocessing(raw_data):
+def scoring_version(backend=None, tier=None):
+    """Version of the model predict_with_preprocessing uses for a backend and tier.
+
+    Results computed under one version are stale once it changes.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if (tier or DEFAULT_TIER) == 'student':
+        return f"{student_version()}:student"
+    # The mapped backend never loads the pickle, so its version comes from the file header
+    version = mapped_model_version() if backend == 'mapped' else model_version()
+    return f"{version}:{backend}"
+
+
+def _tier_model(tier, backend):
+    """(model, cache version, span name) for a tier; the backend only applies to the full ensemble"""
+    if tier == 'student':
+        if student_features() != load_feature_plan().features:
+            raise ValueError("Student model was distilled for other features; run 'python main.py distill' again")
+        return load_student_model(), scoring_version(backend, tier), "predict:student"
+
+    model = BACKENDS[backend]()
+    if current_trace() is not None and getattr(model, 'voting', None) == 'soft':
+        model = _MemberTimedVoting(model)
+    return model, scoring_version(backend, tier), f"predict:{backend}"
+
+
+def predict_with_preprocessing(raw_data, backend=None, use_cache=CACHE_ENABLED, tier=None):
     """Complete prediction pipeline with preprocessing"""
     try:
+        backend = backend or DEFAULT_BACKEND
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend '{backend}', expected one of {sorted(BACKENDS)}")
+        tier = tier or DEFAULT_TIER
+        if tier not in TIERS:
+            raise ValueError(f"Unknown model tier '{tier}', expected one of {list(TIERS)}")
+
         # Preprocess data
-        processed_result = transform_data(raw_data)
+        processed_data, true_labels = transform_array(raw_data)
         
-        # Unpack results
-        if isinstance(processed_result, tuple):
-            processed_data, true_labels = processed_result
-        else:
-            processed_data = processed_result
-            true_labels = None
-        
-        # Load and apply model
-        if os.path.exists(MODEL_PATH):
-            model = joblib.load(MODEL_PATH)
-        else:
-            raise FileNotFoundError("Model file not found at specified path")
-            
-        predictions = model.predict(processed_data)
-        probabilities = model.predict_proba(processed_data)
+        # Apply the model (cached once per process)
+        model, version, span_name = _tier_model(tier, backend)
+
+        # Rows already scored by this model version are answered from the cache
+        with span(span_name, rows=len(processed_data), nbytes=processed_data.nbytes):
+            if use_cache:
+                probabilities = cached_predict_proba(model, processed_data, version)
+            else:
+                probabilities = model.predict_proba(processed_data)
+        predictions = model.classes_[np.argmax(probabilities, axis=1)]
         
         return predictions, probabilities, true_labels
         
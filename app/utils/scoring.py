@@ -0,0 +1,84 @@
+import os
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .preprocessing import predict_with_preprocessing
+
+CLASS_NAMES = np.array(['CANDIDATE', 'CONFIRMED'])
+
+# Columns of a results table, in order
+RESULT_COLUMNS = ['Prediction', 'Confidence', 'CANDIDATE_Probability', 'CONFIRMED_Probability']
+
+# A row is only reported as CONFIRMED above this probability
+CONFIRMED_THRESHOLD = float(os.environ.get('EXOPLANET_CONFIRMED_THRESHOLD', 0.55))
+
+# Verdicts: the model's class combined with the confidence threshold
+VERDICT_CANDIDATE = 0   # model says CANDIDATE
+VERDICT_UNCERTAIN = 1   # model says CONFIRMED, but below the threshold
+VERDICT_CONFIRMED = 2   # model says CONFIRMED at or above the threshold
+
+
+@dataclass(frozen=True)
+class ThresholdPolicy:
+    """How class probabilities become reported labels"""
+    confirmed_threshold: float = CONFIRMED_THRESHOLD
+
+    def verdicts(self, predictions, probabilities):
+        """Verdict code per row, computed with array operations only"""
+        model_confirmed = np.asarray(predictions) == 1
+        above = np.asarray(probabilities)[:, 1] >= self.confirmed_threshold
+        return (model_confirmed.astype(np.int8) + (model_confirmed & above)).astype(np.int8)
+
+
+DEFAULT_POLICY = ThresholdPolicy()
+
+
+@dataclass(frozen=True)
+class ScoreResult:
+    """Probabilities of a scored batch and everything derived from them"""
+    predictions: np.ndarray
+    probabilities: np.ndarray
+    verdicts: np.ndarray
+    policy: ThresholdPolicy = DEFAULT_POLICY
+    true_labels: pd.Series = None
+
+    @classmethod
+    def from_arrays(cls, predictions, probabilities, policy=DEFAULT_POLICY, true_labels=None):
+        probabilities = np.asarray(probabilities)
+        return cls(np.asarray(predictions), probabilities, policy.verdicts(predictions, probabilities),
+                   policy, true_labels)
+
+    def __len__(self):
+        return len(self.predictions)
+
+    @property
+    def confirmed_probability(self):
+        return self.probabilities[:, 1]
+
+    @property
+    def confidence(self):
+        """Probability of the class the model chose"""
+        return self.probabilities.max(axis=1)
+
+    @property
+    def labels(self):
+        """Reported class names: CONFIRMED only above the threshold"""
+        return CLASS_NAMES[(self.verdicts == VERDICT_CONFIRMED).astype(np.intp)]
+
+    def to_frame(self):
+        """Results table (prediction, confidence, class probabilities)"""
+        return pd.DataFrame(dict(zip(RESULT_COLUMNS, (
+            self.labels,
+            self.confidence,
+            self.probabilities[:, 0],
+            self.probabilities[:, 1]
+        ))))
+
+
+def score(df, backend=None, policy=DEFAULT_POLICY, use_cache=None, tier=None):
+    """Score raw KOI rows once and derive labels under the threshold policy"""
+    kwargs = {} if use_cache is None else {'use_cache': use_cache}
+    predictions, probabilities, true_labels = predict_with_preprocessing(df, backend=backend, tier=tier, **kwargs)
+    return ScoreResult.from_arrays(predictions, probabilities, policy, true_labels)
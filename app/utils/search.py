@@ -0,0 +1,255 @@
+import os
+import json
+import math
+import time
+import logging
+import warnings
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from .evaluation import RANDOM_STATE, ranking_curves
+from .model import get_model_path
+from .training import (THREAD_PARAMS, StageCache, load_config, member_classes,
+                       prepare_split, resample, stage_key)
+
+logger = logging.getLogger(__name__)
+
+# One directory per search (shared arrays + finished-trial checkpoint)
+SEARCH_DIR = get_model_path('.search')
+CHECKPOINT = 'trials.jsonl'
+
+# Values tried per member; n_estimators is the budget and is not sampled
+SEARCH_SPACES = {
+    'rf': {
+        'max_depth': [None, 8, 12, 16, 20],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4],
+        'max_features': ['sqrt', 'log2', 0.5],
+    },
+    'lgbm': {
+        'learning_rate': [0.02, 0.05, 0.1],
+        'num_leaves': [15, 31, 63],
+        'min_child_samples': [10, 20, 40],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+    },
+    'xgb': {
+        'learning_rate': [0.02, 0.05, 0.1],
+        'max_depth': [3, 4, 6, 8],
+        'min_child_weight': [1, 3, 5],
+        'subsample': [0.7, 0.85, 1.0],
+        'colsample_bytree': [0.6, 0.8, 1.0],
+    },
+}
+
+# Largest budget per member: trees for the forest, boosting rounds for the boosters
+MAX_ROUNDS = {'rf': 300, 'lgbm': 900, 'xgb': 900}
+
+# Boosters stop when the validation loss has not improved for this many rounds
+EARLY_STOPPING_ROUNDS = 30
+
+DEFAULT_CANDIDATES = 27
+DEFAULT_ETA = 3
+DEFAULT_FOLDS = 3
+
+_shared = {}
+
+
+def _init_worker(directory):
+    """Runs once per worker: map the shared training arrays (no per-trial copies)"""
+    _shared['X'] = np.load(os.path.join(directory, 'X.npy'), mmap_mode='r')
+    _shared['y'] = np.load(os.path.join(directory, 'y.npy'), mmap_mode='r')
+    _shared['folds'] = {}
+
+
+def _fold(fold, n_folds, random_state, smote):
+    """Training and validation arrays of one CV fold, resampled inside the fold, cached per worker"""
+    key = (fold, n_folds, random_state, smote)
+    if key not in _shared['folds']:
+        from sklearn.model_selection import StratifiedKFold
+
+        X, y = _shared['X'], _shared['y']
+        splits = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state).split(X, y)
+        train_index, val_index = list(splits)[fold]
+        X_fit, y_fit = X[train_index], y[train_index]
+        if smote:
+            X_fit, y_fit = resample(X_fit, y_fit, random_state)
+        _shared['folds'][key] = (X_fit, y_fit, X[val_index], y[val_index])
+    return _shared['folds'][key]
+
+
+def fit_trial(member, params, budget, X, y, X_val, y_val):
+    """Fit one member at a budget; returns (estimator, rounds actually used)"""
+    estimator = member_classes()[member](**dict(params, n_estimators=budget))
+    estimator.set_params(**{THREAD_PARAMS[member]: 1})
+    if member == 'lgbm':
+        import lightgbm
+
+        with warnings.catch_warnings():
+            # lightgbm>=4.7 prefers eval_X/eval_y, which 4.6 (the minimum supported) lacks
+            warnings.filterwarnings('ignore', message=".*'eval_set' is deprecated")
+            estimator.fit(X, y, eval_set=[(X_val, y_val)],
+                          callbacks=[lightgbm.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+        return estimator, int(estimator.best_iteration_ or budget)
+    if member == 'xgb':
+        estimator.set_params(early_stopping_rounds=EARLY_STOPPING_ROUNDS)
+        estimator.fit(X, y, eval_set=[(X_val, y_val)], verbose=False)
+        return estimator, int(estimator.best_iteration) + 1
+    return estimator.fit(X, y), budget
+
+
+def run_trial(trial):
+    """Cross-validated ROC AUC of one candidate at one budget (runs in a worker)"""
+    start = time.perf_counter()
+    scores, rounds = [], []
+    for fold in range(trial['folds']):
+        X_fit, y_fit, X_val, y_val = _fold(fold, trial['folds'], trial['random_state'], trial['smote'])
+        estimator, used = fit_trial(trial['member'], trial['params'], trial['budget'],
+                                    X_fit, y_fit, X_val, y_val)
+        scores.append(ranking_curves(y_val.astype(np.int64), estimator.predict_proba(X_val)[:, 1])['roc_auc'])
+        rounds.append(used)
+    return dict(trial, score=float(np.mean(scores)), rounds=int(np.median(rounds)),
+                seconds=round(time.perf_counter() - start, 3))
+
+
+def sample_candidates(member, base, n, rng):
+    """The configured member first, then distinct random draws from its search space"""
+    space = SEARCH_SPACES[member]
+    base = dict(base)
+    base.pop('n_estimators', None)
+    candidates = [base]
+    seen = {json.dumps(base, sort_keys=True)}
+    for _ in range(50 * n):
+        if len(candidates) >= n:
+            break
+        params = dict(base, **{name: values[rng.integers(len(values))] for name, values in space.items()})
+        params = {name: value.item() if isinstance(value, np.generic) else value for name, value in params.items()}
+        if json.dumps(params, sort_keys=True) not in seen:
+            seen.add(json.dumps(params, sort_keys=True))
+            candidates.append(params)
+    return candidates
+
+
+def rung_budgets(n_candidates, eta, max_rounds):
+    """Budget per rung: max_rounds at the last rung, divided by eta for each rung before it"""
+    n_rungs = max(1, math.ceil(math.log(n_candidates, eta))) if n_candidates > 1 else 1
+    return [max(1, max_rounds // eta ** (n_rungs - 1 - rung)) for rung in range(n_rungs)]
+
+
+def _read_checkpoint(path):
+    """Finished trials by id; a line cut short by an interruption is ignored"""
+    trials = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                trials[record['id']] = record
+    except FileNotFoundError:
+        pass
+    return trials
+
+
+def _share_arrays(directory, X, y):
+    os.makedirs(directory, exist_ok=True)
+    for name, array in (('X', X), ('y', y)):
+        path = os.path.join(directory, f"{name}.npy")
+        if not os.path.exists(path):
+            np.save(path + '.tmp.npy', np.ascontiguousarray(array))
+            os.replace(path + '.tmp.npy', path)
+
+
+def search(data_path=None, config=None, members=None, n_candidates=DEFAULT_CANDIDATES, eta=DEFAULT_ETA,
+           folds=DEFAULT_FOLDS, workers=None, max_rounds=None, seed=RANDOM_STATE, checkpoint_dir=None):
+    """Successive-halving search over the ensemble members' hyperparameters.
+
+    Every member starts with n_candidates configurations at a small budget
+    (trees, or boosting rounds with early stopping); after each rung only
+    the best 1/eta go on to eta times the budget. Trials run on a process
+    pool whose workers memory-map the same training arrays. Each finished
+    trial is appended to a checkpoint, so an interrupted search resumes
+    where it stopped. Returns (config, summary): config is the input
+    training config with the winning member parameters.
+    """
+    start = time.perf_counter()
+    config = config or load_config()
+    members = members or list(config['members'])
+    unknown = set(members) - set(SEARCH_SPACES)
+    if unknown:
+        raise ValueError(f"No search space for members {sorted(unknown)}, expected {sorted(SEARCH_SPACES)}")
+    rounds = {member: max_rounds or MAX_ROUNDS[member] for member in members}
+
+    data_path, split_key, split = prepare_split(data_path, config, StageCache())
+    search_key = stage_key('search', split_key, members, n_candidates, eta, folds, rounds, seed,
+                           config['smote'], SEARCH_SPACES, EARLY_STOPPING_ROUNDS)
+    directory = checkpoint_dir or os.path.join(SEARCH_DIR, search_key)
+    _share_arrays(directory, split['X_train'], split['y_train'])
+    checkpoint = os.path.join(directory, CHECKPOINT)
+    finished = _read_checkpoint(checkpoint)
+    resumed = len(finished)
+
+    rng = np.random.default_rng(seed)
+    alive = {member: list(enumerate(sample_candidates(member, config['members'][member], n_candidates, rng))) for member in members}
+    budgets = {member: rung_budgets(len(alive[member]), eta, rounds[member]) for member in members}
+    n_rungs = max(len(b) for b in budgets.values())
+    results = {}
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), mp_context=context,
+                             initializer=_init_worker, initargs=(directory,)) as pool, \
+            open(checkpoint, 'a') as log:
+        for rung in range(n_rungs):
+            trials = []
+            for member in members:
+                if rung >= len(budgets[member]):
+                    continue
+                for index, params in alive[member]:
+                    budget = budgets[member][rung]
+                    trials.append({
+                        'id': stage_key('trial', member, params, budget),
+                        'member': member, 'candidate': index, 'rung': rung, 'budget': budget,
+                        'params': params, 'folds': folds, 'random_state': seed, 'smote': config['smote'],
+                    })
+
+            pending = [pool.submit(run_trial, trial) for trial in trials if trial['id'] not in finished]
+            for future in as_completed(pending):
+                record = future.result()
+                finished[record['id']] = record
+                log.write(json.dumps(record) + '\n')
+                log.flush()
+                logger.info("Rung %d %s #%d (budget %d): AUC %.4f in %.1fs", rung, record['member'],
+                            record['candidate'], record['budget'], record['score'], record['seconds'])
+
+            for member in members:
+                if rung >= len(budgets[member]):
+                    continue
+                ranked = sorted((finished[trial['id']] for trial in trials if trial['member'] == member),
+                                key=lambda record: (-record['score'], record['candidate']))
+                results[member] = ranked[0]
+                keep = {record['candidate'] for record in ranked[:max(1, len(ranked) // eta)]}
+                alive[member] = [(index, params) for index, params in alive[member] if index in keep]
+
+    best = {}
+    for member, record in results.items():
+        # Boosters keep the rounds early stopping settled on; the forest keeps its budget
+        best[member] = dict(record['params'], n_estimators=record['rounds'])
+    tuned = dict(config, members=dict(config['members'], **best))
+    summary = {
+        'checkpoint': checkpoint,
+        'trials': len(finished),
+        'resumed_trials': resumed,
+        'best': {member: {'score': record['score'], 'candidate': record['candidate'], 'params': best[member]}
+                 for member, record in results.items()},
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+    return tuned, summary
+
+
+def write_config(config, path):
+    """Save a training config for `main.py train --config`"""
+    with open(path + '.tmp', 'w') as f:
+        json.dump(config, f, indent=2)
+    os.replace(path + '.tmp', path)
@@ -0,0 +1,292 @@
+import io
+import json
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib import request as urllib_request
+
+import numpy as np
+import pandas as pd
+
+from .batching import DEFAULT_MAX_BATCH, DEFAULT_MAX_WAIT_MS, MicroBatcher
+from .model import registry, warm_up
+from .prediction_cache import prediction_cache
+from .preprocessing import predict_with_preprocessing, scoring_version
+from .scoring import score
+from .streaming import build_results
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_WORKERS = 8
+
+# Requests above this size are rejected with 413
+MAX_BODY_BYTES = 256 * 1024 * 1024
+
+# Unread bodies up to this size are drained after an error to keep the connection;
+# larger ones (and a 413's) close it instead
+MAX_DRAIN_BYTES = 1024 * 1024
+
+# Latency samples kept per route (and per route and status) for the percentiles
+LATENCY_WINDOW = 10_000
+
+ROUTES = {'GET': ('/health', '/metrics'), 'POST': ('/predict', '/predict/batch')}
+
+
+def _percentiles(samples, count):
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99]) * 1000
+    return {
+        'count': count,
+        'p50_ms': round(float(p50), 3),
+        'p90_ms': round(float(p90), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(samples.max()) * 1000, 3),
+    }
+
+
+class LatencyTracker:
+    """Rolling window of request latencies per route, and per route and status code when given"""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, status=None):
+        keys = [route] if status is None else [route, (route, int(status))]
+        with self._lock:
+            for key in keys:
+                self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+                self._counts[key] = self._counts.get(key, 0) + 1
+
+    def summary(self):
+        """p50/p90/p99/max latency in milliseconds per route, with a 'by_status' breakdown"""
+        with self._lock:
+            snapshot = {key: np.array(samples) for key, samples in self._samples.items()}
+            counts = dict(self._counts)
+        summary = {}
+        for key, samples in snapshot.items():
+            if isinstance(key, str):
+                summary.setdefault(key, {}).update(_percentiles(samples, counts[key]))
+        for key, samples in snapshot.items():
+            if isinstance(key, tuple):
+                route, status = key
+                summary[route].setdefault('by_status', {})[str(status)] = _percentiles(samples, counts[key])
+        return summary
+
+
+def score_frame_arrays(df, backend=None):
+    """(predictions, probabilities) for raw KOI rows"""
+    predictions, probabilities, _ = predict_with_preprocessing(df, backend=backend)
+    return predictions, probabilities
+
+
+def score_frame(df, backend=None):
+    """Results table (prediction, confidence, probabilities) for raw KOI rows"""
+    return score(df, backend=backend).to_frame()
+
+
+def parse_records(body, content_type):
+    """Raw KOI rows from a CSV, NDJSON or JSON request body"""
+    if 'csv' in content_type:
+        return pd.read_csv(io.BytesIO(body)), 'csv'
+    if 'ndjson' in content_type or 'jsonlines' in content_type:
+        return pd.read_json(io.BytesIO(body), lines=True), 'ndjson'
+    payload = json.loads(body)
+    if isinstance(payload, dict):
+        payload = [payload]
+    return pd.DataFrame.from_records(payload), 'json'
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    """Routes: GET /health, GET /metrics, POST /predict (one KOI as JSON), POST /predict/batch (CSV or NDJSON)"""
+
+    protocol_version = 'HTTP/1.1'
+    server_version = 'ExoplanetInference/1.0'
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status, body, content_type='application/json'):
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode()
+        self._status = status
+        self.send_response(status)
+        if self.close_connection:
+            self.send_header('Connection', 'close')
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise OverflowError(f"Request body larger than {MAX_BODY_BYTES} bytes")
+        body = self.rfile.read(length)
+        self._body_read = True
+        return body
+
+    def _discard_body(self):
+        """Leave no unread body to be parsed as the next request on this keep-alive connection"""
+        if self._body_read:
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if 0 <= length <= MAX_DRAIN_BYTES:
+            self.rfile.read(length)
+            self._body_read = True
+        else:
+            self.close_connection = True
+
+    def _record_latency(self, start):
+        """Latency of every request, failed ones included, by route and status code"""
+        # Unknown paths share one route, so arbitrary URLs cannot grow the metrics
+        path = self.path if self.path in ROUTES.get(self.command, ()) else '(unknown)'
+        # No response sent means the handler raised; the server closes the connection
+        status = getattr(self, '_status', None) or 500
+        self.server.latency.record(f"{self.command} {path}", time.perf_counter() - start, status)
+
+    def do_GET(self):
+        start = time.perf_counter()
+        self._status = None
+        self._body_read = False
+        try:
+            self._discard_body()
+            self._get()
+        finally:
+            self._record_latency(start)
+
+    def do_POST(self):
+        start = time.perf_counter()
+        self._status = None
+        self._body_read = False
+        try:
+            self._post()
+        finally:
+            self._record_latency(start)
+
+    def _get(self):
+        if self.path == '/health':
+            # Version of the artifact this server scores with; the mapped backend and
+            # the student tier never unpickle the ensemble, so neither does /health
+            self._send(200, {'status': 'ok', 'model_version': scoring_version(self.server.backend)})
+        elif self.path == '/metrics':
+            self._send(200, {
+                'latency': self.server.latency.summary(),
+                'batching': self.server.batcher.stats(),
+                'prediction_cache': prediction_cache.stats(),
+                'artifacts': registry.stats(),
+            })
+        else:
+            self._send(404, {'error': f"Unknown route {self.path}"})
+
+    def _post(self):
+        if self.path not in ROUTES['POST']:
+            self._discard_body()
+            self._send(404, {'error': f"Unknown route {self.path}"})
+            return
+        try:
+            body = self._read_body()
+            df, body_format = parse_records(body, self.headers.get('Content-Type', 'application/json'))
+            if df.empty:
+                raise ValueError("No rows to score")
+            if self.path == '/predict' and len(df) == 1:
+                # Concurrent single-KOI requests are scored together
+                results = build_results(*self.server.batcher.predict(df))
+            else:
+                results = score_frame(df, backend=self.server.backend)
+        except OverflowError as e:
+            self._discard_body()
+            self._send(413, {'error': str(e)})
+            return
+        except Exception as e:
+            self._discard_body()
+            self._send(400, {'error': str(e)})
+            return
+
+        if self.path == '/predict':
+            records = results.to_dict(orient='records')
+            self._send(200, records[0] if len(records) == 1 else records)
+        elif body_format == 'csv':
+            self._send(200, results.to_csv(index=False).encode(), 'text/csv')
+        else:
+            self._send(200, results.to_json(orient='records', lines=True).encode(), 'application/x-ndjson')
+
+
+class InferenceServer(HTTPServer):
+    """HTTP server that keeps the model resident and handles requests on a thread pool"""
+
+    def __init__(self, address, workers=DEFAULT_WORKERS, backend=None,
+                 batch_max_size=DEFAULT_MAX_BATCH, batch_max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        super().__init__(address, InferenceRequestHandler)
+        self.backend = backend
+        self.latency = LatencyTracker()
+        self.batcher = MicroBatcher(score_fn=lambda df: score_frame_arrays(df, backend),
+                                    max_batch=batch_max_size, max_wait_ms=batch_max_wait_ms)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='inference')
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+        self.batcher.close()
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, backend=None,
+          batch_max_size=DEFAULT_MAX_BATCH, batch_max_wait_ms=DEFAULT_MAX_WAIT_MS):
+    """Warm the model up and serve until interrupted"""
+    warm_up(backend)
+    server = InferenceServer((host, port), workers=workers, backend=backend,
+                             batch_max_size=batch_max_size, batch_max_wait_ms=batch_max_wait_ms)
+    logger.info("Serving predictions on http://%s:%d with %d workers", host, port, workers)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+class InferenceClient:
+    """Minimal client for a running inference server"""
+
+    def __init__(self, url=f"http://{DEFAULT_HOST}:{DEFAULT_PORT}", timeout=60):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _post(self, path, body, content_type):
+        req = urllib_request.Request(self.url + path, data=body, method='POST',
+                                     headers={'Content-Type': content_type})
+        with urllib_request.urlopen(req, timeout=self.timeout) as response:
+            return response.read()
+
+    def predict_single(self, koi):
+        """Prediction for one KOI given as a dict of raw columns"""
+        return json.loads(self._post('/predict', json.dumps(koi).encode(), 'application/json'))
+
+    def predict_batch(self, df):
+        """Results DataFrame for a frame of raw KOI rows"""
+        body = self._post('/predict/batch', df.to_csv(index=False).encode(), 'text/csv')
+        return pd.read_csv(io.BytesIO(body))
+
+    def metrics(self):
+        with urllib_request.urlopen(self.url + '/metrics', timeout=self.timeout) as response:
+            return json.loads(response.read())
@@ -0,0 +1,184 @@
+import os
+import time
+import tempfile
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .scoring import CLASS_NAMES, DEFAULT_POLICY, RESULT_COLUMNS, ScoreResult, score
+from .tracing import span
+
+VALID_DISPOSITIONS = ['CANDIDATE', 'CONFIRMED']
+
+DEFAULT_CHUNK_ROWS = 50_000
+DEFAULT_MEMORY_LIMIT_MB = 512
+
+# Rough number of float64 copies of a chunk alive at once in the scoring path
+# (raw frame, processed frame, scaled array, model inputs, results)
+WORKING_COPIES = 8
+
+# Results written without an output_path go here. Sessions that are abandoned never
+# delete theirs, so each new file prunes the directory to the newest few recent ones.
+OUTPUT_DIR = os.path.join(tempfile.gettempdir(), 'exoplanet_predictions')
+OUTPUT_MAX_FILES = 16
+OUTPUT_MAX_AGE_SECONDS = 6 * 3600
+
+# Confidence is the winning class probability, so it lives in [0.5, 1]
+CONFIDENCE_BINS = np.linspace(0.5, 1.0, 21)
+
+
+def build_results(predictions, probabilities, policy=DEFAULT_POLICY):
+    """Results table for a scored batch, built with vectorized operations"""
+    return ScoreResult.from_arrays(predictions, probabilities, policy).to_frame()
+
+
+def chunk_rows_for_budget(n_columns, memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB,
+                          chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Largest chunk size (capped at chunk_rows) whose working set fits in the memory ceiling"""
+    bytes_per_row = max(n_columns, 1) * 8 * WORKING_COPIES
+    budget_rows = int(memory_limit_mb * 1024 * 1024 // bytes_per_row)
+    return max(1, min(chunk_rows, budget_rows))
+
+
+def prune_outputs(max_files=OUTPUT_MAX_FILES, max_age_seconds=OUTPUT_MAX_AGE_SECONDS):
+    """Delete result files in OUTPUT_DIR older than max_age_seconds or beyond the newest max_files"""
+    try:
+        paths = [entry.path for entry in os.scandir(OUTPUT_DIR) if entry.name.endswith('.csv')]
+    except FileNotFoundError:
+        return
+    mtimes = {}
+    for path in paths:
+        try:
+            mtimes[path] = os.path.getmtime(path)
+        except OSError:
+            pass
+    cutoff = time.time() - max_age_seconds
+    newest = sorted(mtimes, key=mtimes.get, reverse=True)
+    for rank, path in enumerate(newest):
+        if rank >= max_files or mtimes[path] < cutoff:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def new_output_path():
+    """Fresh results file in the bounded OUTPUT_DIR"""
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    prune_outputs(max_files=OUTPUT_MAX_FILES - 1)
+    handle, path = tempfile.mkstemp(prefix='predictions_', suffix='.csv', dir=OUTPUT_DIR)
+    os.close(handle)
+    return path
+
+
+@dataclass
+class BatchSummary:
+    """Aggregates of a scored file, updated chunk by chunk"""
+    rows: int = 0
+    chunks: int = 0
+    class_counts: np.ndarray = field(default_factory=lambda: np.zeros(2, dtype=np.int64))
+    confidence_hist: np.ndarray = field(default_factory=lambda: np.zeros(len(CONFIDENCE_BINS) - 1, dtype=np.int64))
+    confusion: np.ndarray = field(default_factory=lambda: np.zeros((2, 2), dtype=np.int64))
+    has_labels: bool = False
+    original_dispositions: pd.Series = field(default_factory=lambda: pd.Series(dtype=np.int64))
+
+    def update(self, results, predictions, true_labels=None):
+        confirmed = (results['Prediction'].to_numpy() == 'CONFIRMED').astype(np.intp)
+        self.class_counts += np.bincount(confirmed, minlength=2)
+        self.confidence_hist += np.histogram(results['Confidence'].to_numpy(), bins=CONFIDENCE_BINS)[0]
+        if true_labels is not None:
+            self.has_labels = True
+            codes = np.asarray(true_labels, dtype=np.intp) * 2 + np.asarray(predictions, dtype=np.intp)
+            self.confusion += np.bincount(codes, minlength=4).reshape(2, 2)
+        self.rows += len(results)
+        self.chunks += 1
+
+    def count_dispositions(self, dispositions):
+        self.original_dispositions = self.original_dispositions.add(
+            dispositions.value_counts(), fill_value=0).astype(np.int64)
+
+    @property
+    def prediction_counts(self):
+        return pd.Series(self.class_counts, index=CLASS_NAMES, name='count')
+
+    @property
+    def accuracy(self):
+        total = self.confusion.sum()
+        return float(np.trace(self.confusion) / total) if total else float('nan')
+
+
+def classification_table(confusion):
+    """Per-class precision, recall, F1 and support from a 2x2 confusion matrix"""
+    confusion = np.asarray(confusion, dtype=np.float64)
+    true_positive = np.diag(confusion)
+    support = confusion.sum(axis=1)
+    predicted = confusion.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, true_positive / predicted, 0.0)
+        recall = np.where(support > 0, true_positive / support, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    return pd.DataFrame({
+        'precision': precision,
+        'recall': recall,
+        'f1-score': f1,
+        'support': support.astype(np.int64)
+    }, index=CLASS_NAMES)
+
+
+def stream_predictions(source, output_path=None, chunk_rows=DEFAULT_CHUNK_ROWS,
+                       memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB, total_bytes=None,
+                       progress=None, backend=None):
+    """Score a CSV chunk by chunk, writing results to disk with bounded memory.
+
+    source is a path or a seekable binary file object. Each chunk is preprocessed,
+    scaled and scored on its own; only the aggregates in the returned
+    BatchSummary grow with the file. Results are appended to output_path
+    (a new file in OUTPUT_DIR if None), which always has a header, even when
+    every row is filtered out. progress(fraction, rows) is called per chunk.
+    Returns (summary, output_path).
+    """
+    if output_path is None:
+        output_path = new_output_path()
+
+    own_file = None
+    if isinstance(source, (str, os.PathLike)):
+        total_bytes = total_bytes or os.path.getsize(source)
+        source = own_file = open(source, 'rb')
+
+    summary = BatchSummary()
+    try:
+        source.seek(0)
+        n_columns = len(pd.read_csv(source, nrows=0).columns)
+        source.seek(0)
+        rows_per_chunk = chunk_rows_for_budget(n_columns, memory_limit_mb, chunk_rows)
+
+        with open(output_path, 'w', newline='') as out:
+            pd.DataFrame(columns=RESULT_COLUMNS).to_csv(out, index=False)
+            chunks = pd.read_csv(source, chunksize=rows_per_chunk)
+            while True:
+                with span('read_csv'):
+                    chunk = next(chunks, None)
+                if chunk is None:
+                    break
+                if 'koi_disposition' in chunk.columns:
+                    summary.count_dispositions(chunk['koi_disposition'])
+                    chunk = chunk[chunk['koi_disposition'].isin(VALID_DISPOSITIONS)]
+                if len(chunk):
+                    result = score(chunk, backend=backend)
+                    with span('build_results', rows=len(chunk)):
+                        results = result.to_frame()
+                        summary.update(results, result.predictions, result.true_labels)
+                    with span('write_csv', rows=len(results)):
+                        results.to_csv(out, index=False, header=False)
+
+                if progress is not None:
+                    fraction = min(source.tell() / total_bytes, 1.0) if total_bytes else None
+                    progress(fraction, summary.rows)
+    finally:
+        if own_file is not None:
+            own_file.close()
+
+    if progress is not None:
+        progress(1.0, summary.rows)
+    return summary, output_path
@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+from .data_store import CATALOG, load_frame
+
+# Relative noise added to float columns so generated rows are not exact catalog copies
+DEFAULT_JITTER = 0.01
+
+
+class KOISampler:
+    """Vectorized generator of synthetic KOI rows that follow the catalog's distributions.
+
+    Rows are bootstrapped from the catalog, which keeps the joint structure
+    of the columns, the missing-value patterns and the mix of
+    koi_tce_delivname values. Float columns then get a small multiplicative
+    jitter so every generated row is a new feature vector (and misses the
+    prediction cache, as real traffic would).
+    """
+
+    def __init__(self, catalog=None, jitter=DEFAULT_JITTER):
+        self.catalog = load_frame(CATALOG) if catalog is None else catalog.reset_index(drop=True)
+        self.jitter = jitter
+        self.float_columns = self.catalog.select_dtypes(include='float').columns.tolist()
+
+    def sample(self, n_rows, seed=0):
+        """DataFrame of n_rows synthetic KOIs with the catalog's columns and dtypes"""
+        rng = np.random.default_rng(seed)
+        df = self.catalog.take(rng.integers(0, len(self.catalog), n_rows)).reset_index(drop=True)
+        if self.jitter and self.float_columns:
+            noise = 1.0 + self.jitter * rng.standard_normal((n_rows, len(self.float_columns)))
+            df[self.float_columns] = df[self.float_columns].to_numpy() * noise
+        df['kepid'] = np.arange(n_rows, dtype=np.int64)
+        return df
+
+
+def generate_kois(n_rows, seed=0, jitter=DEFAULT_JITTER):
+    """n_rows synthetic KOI rows sampled from the Kepler catalog"""
+    return KOISampler(jitter=jitter).sample(n_rows, seed=seed)
@@ -0,0 +1,179 @@
+import io
+import os
+import json
+import time
+import marshal
+import pstats
+import cProfile
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Append one JSON line per finished trace to this file when set
+TRACE_LOG = os.environ.get('EXOPLANET_TRACE_LOG')
+
+# Finished traces kept in memory for the diagnostics panel
+RECENT_TRACES = 50
+
+_current = contextvars.ContextVar('exoplanet_trace', default=None)
+_log_lock = threading.Lock()
+# cProfile hooks sys.monitoring, which is process-wide, so one Profile runs at a time
+_profile_lock = threading.Lock()
+recent_traces = deque(maxlen=RECENT_TRACES)
+
+
+class Trace:
+    """Timing spans of one request (a page run, a CLI file, an HTTP call).
+
+    Spans are recorded flat with their nesting depth, in the order they
+    started. Outside an active trace span() costs one context variable
+    lookup, so the scoring path can be instrumented unconditionally.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.spans = []
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._depth = 0
+        self._lock = threading.Lock()
+        self.seconds = None
+
+    def add(self, name, start, seconds, depth, rows=None, nbytes=None, **fields):
+        span = {'name': name, 'start_ms': round((start - self._start) * 1000, 3),
+                'ms': round(seconds * 1000, 3), 'depth': depth}
+        if rows is not None:
+            span['rows'] = int(rows)
+        if nbytes is not None:
+            span['bytes'] = int(nbytes)
+        span.update(fields)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def record(self, name, seconds, rows=None, nbytes=None, **fields):
+        """Add a span of known duration that ends now, at the current nesting depth"""
+        return self.add(name, time.perf_counter() - seconds, seconds, self._depth, rows, nbytes, **fields)
+
+    def merge(self, other, **fields):
+        """Copy the spans of another trace (e.g. a shared micro-batch) under the current span"""
+        offset_ms = (other._start - self._start) * 1000
+        depth = self._depth
+        with self._lock:
+            self.spans.extend(dict(span, start_ms=round(span['start_ms'] + offset_ms, 3),
+                                   depth=span['depth'] + depth, **fields)
+                              for span in other.spans)
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._start
+
+    def stage_totals(self):
+        """Milliseconds per span name, summed"""
+        totals = {}
+        for span in self.spans:
+            totals[span['name']] = round(totals.get(span['name'], 0.0) + span['ms'], 3)
+        return totals
+
+    def to_dict(self):
+        return {
+            'trace': self.name,
+            'started_at': self.started_at,
+            'ms': round((self.seconds or 0.0) * 1000, 3),
+            'spans': list(self.spans),
+        }
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def trace(name):
+    """Collect the spans recorded in this context into a new Trace, then log it"""
+    active = Trace(name)
+    token = _current.set(active)
+    try:
+        yield active
+    finally:
+        _current.reset(token)
+        active.finish()
+        recent_traces.append(active)
+        _log(active)
+
+
+@contextmanager
+def span(name, rows=None, nbytes=None, **fields):
+    """Time a stage of the active trace; a no-op when there is none"""
+    active = _current.get()
+    if active is None:
+        yield None
+        return
+    depth = active._depth
+    active._depth += 1
+    start = time.perf_counter()
+    try:
+        yield active
+    finally:
+        active._depth = depth
+        active.add(name, start, time.perf_counter() - start, depth, rows, nbytes, **fields)
+
+
+def frame_bytes(df):
+    """Shallow in-memory size of a DataFrame (cheap: no per-string accounting)"""
+    return int(df.memory_usage(index=False, deep=False).sum())
+
+
+def _log(active):
+    record = active.to_dict()
+    logger.info("trace %s", json.dumps(record))
+    if TRACE_LOG:
+        with _log_lock, open(TRACE_LOG, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+
+class Profile:
+    """cProfile capture of one request, downloadable as .prof (binary) and text.
+
+    The profiler records calls from every thread, so scoring the request
+    hands to the micro-batcher is included, as is anything other threads
+    run meanwhile. While another Profile or profiling tool is active this
+    one does nothing, and captured stays False.
+    """
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.captured = False
+
+    def __enter__(self):
+        if not _profile_lock.acquire(blocking=False):
+            logger.info("Another request is being profiled; not profiling this one")
+            return self
+        try:
+            self.profiler.enable()
+        except ValueError as e:
+            # "Another profiling tool is already active"
+            _profile_lock.release()
+            logger.info("Not profiling: %s", e)
+            return self
+        self.captured = True
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.captured:
+            self.profiler.disable()
+            _profile_lock.release()
+        return False
+
+    def text(self, limit=40, sort='cumulative'):
+        buffer = io.StringIO()
+        pstats.Stats(self.profiler, stream=buffer).sort_stats(sort).print_stats(limit)
+        return buffer.getvalue()
+
+    def dump_bytes(self):
+        """Binary pstats dump (open with pstats or snakeviz)"""
+        self.profiler.create_stats()
+        return marshal.dumps(self.profiler.stats)
@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from .data_store import CATALOG, get_data_path
+from .evaluation import LABELS, RANDOM_STATE, TEST_SIZE, evaluate
+from .feature_plan import ENGINEERED_FEATURES
+from .model import MODEL_FILENAME, PREPROCESSOR_FILENAME, _file_sha256, get_model_path
+from .parallel_ensemble import default_member_jobs
+from .preprocessing import preprocess_features
+
+logger = logging.getLogger(__name__)
+
+# Stage outputs, one file per (stage, key); safe to delete at any time
+TRAINING_CACHE_DIR = get_model_path('.training_cache')
+
+# Bump when a stage changes what it computes, so old cache entries are not reused
+PIPELINE_VERSION = 1
+
+# Ensemble members (notebook: soft vote of RF, LightGBM and XGBoost)
+DEFAULT_MEMBERS = {
+    'rf': {'n_estimators': 300, 'max_depth': 12, 'random_state': RANDOM_STATE},
+    'lgbm': {'n_estimators': 300, 'learning_rate': 0.05, 'random_state': RANDOM_STATE, 'verbose': -1},
+    'xgb': {'n_estimators': 300, 'learning_rate': 0.05, 'random_state': RANDOM_STATE,
+            'eval_metric': 'logloss', 'verbosity': 0},
+}
+
+DEFAULT_CONFIG = {
+    'test_size': TEST_SIZE,
+    'random_state': RANDOM_STATE,
+    'smote': True,
+    'members': DEFAULT_MEMBERS,
+}
+
+# Parameters that only change how fast a member trains, not what it learns
+THREAD_PARAMS = {'rf': 'n_jobs', 'lgbm': 'n_jobs', 'xgb': 'n_jobs'}
+
+
+def member_classes():
+    from lightgbm import LGBMClassifier
+    from sklearn.ensemble import RandomForestClassifier
+    from xgboost import XGBClassifier
+
+    return {'rf': RandomForestClassifier, 'lgbm': LGBMClassifier, 'xgb': XGBClassifier}
+
+
+def load_config(path=None):
+    """Training configuration: defaults, overridden by a JSON file (e.g. a search result)"""
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    if path is None:
+        return config
+    try:
+        with open(path) as f:
+            overrides = json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Training config not found at: {path}")
+    except ValueError as e:
+        raise ValueError(f"Invalid training config {path}: {str(e)}")
+
+    members = overrides.pop('members', None)
+    config.update(overrides)
+    if members is not None:
+        unknown = set(members) - set(member_classes())
+        if unknown:
+            raise ValueError(f"Unknown ensemble members {sorted(unknown)}, expected {sorted(member_classes())}")
+        config['members'] = {name: dict(DEFAULT_MEMBERS.get(name, {}), **params)
+                             for name, params in members.items()}
+    return config
+
+
+def stage_key(stage, *inputs):
+    """Hash of a stage name, the pipeline version and everything the stage depends on"""
+    payload = json.dumps([PIPELINE_VERSION, stage, inputs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+
+class StageCache:
+    """Stage outputs on disk, keyed by the hash of their inputs.
+
+    A stage's key includes the key of the stage it reads from, so changing
+    one input (the data file, the split, a member's parameters) invalidates
+    that stage and the stages after it, and nothing before it.
+    """
+
+    def __init__(self, directory=TRAINING_CACHE_DIR, enabled=True):
+        self.directory = directory
+        self.enabled = enabled
+        self.hits = []
+        self.misses = []
+
+    def _path(self, stage, key):
+        return os.path.join(self.directory, f"{stage}-{key}.joblib")
+
+    def get_or_compute(self, stage, key, compute):
+        path = self._path(stage, key)
+        if self.enabled and os.path.exists(path):
+            try:
+                value = joblib.load(path)
+                self.hits.append(stage)
+                logger.info("Stage %s: cached (%s)", stage, key)
+                return value
+            except Exception as e:
+                logger.warning("Ignoring unreadable cache entry %s: %s", path, e)
+
+        start = time.perf_counter()
+        value = compute()
+        self.misses.append(stage)
+        logger.info("Stage %s: computed in %.2fs (%s)", stage, time.perf_counter() - start, key)
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            joblib.dump(value, path + '.tmp')
+            os.replace(path + '.tmp', path)
+        return value
+
+
+def clean_frame(df):
+    """Labelled CANDIDATE/CONFIRMED rows with the model's columns, not yet imputed"""
+    df = df[df['koi_disposition'].isin(list(LABELS))]
+    labels = df['koi_disposition'].map(LABELS).to_numpy(dtype=np.int64)
+    # Empty medians: missing values are filled later with the training-split medians
+    features = preprocess_features(df.drop(columns=['koi_disposition']), medians=pd.Series(dtype=float))
+    return features.reset_index(drop=True).astype(np.float64), labels
+
+
+def split_and_scale(features, labels, test_size, random_state):
+    """Stratified split, imputation with training medians and a scaler fitted on the training rows"""
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    train_index, test_index = train_test_split(np.arange(len(features)), test_size=test_size,
+                                               random_state=random_state, stratify=labels)
+    train_index, test_index = np.sort(train_index), np.sort(test_index)
+    columns = features.columns.tolist()
+    # Engineered features are recomputed after imputation, so they have no median
+    raw = [name for name in columns if name not in ENGINEERED_FEATURES]
+    medians = features.iloc[train_index][raw].median().reindex(columns)
+    filled = preprocess_features(features, medians)[columns]
+
+    scaler = StandardScaler()
+    X_train = scaler.fit_transform(filled.iloc[train_index])
+    X_test = scaler.transform(filled.iloc[test_index])
+    preprocessor = {
+        'scaler': scaler,
+        'features': columns,
+        'medians': medians.to_numpy(dtype=float),
+    }
+    return {
+        'X_train': X_train, 'y_train': labels[train_index],
+        'X_test': X_test, 'y_test': labels[test_index],
+        'preprocessor': preprocessor,
+    }
+
+
+def resample(X, y, random_state):
+    """SMOTE oversampling of the minority class"""
+    from imblearn.over_sampling import SMOTE
+
+    return SMOTE(random_state=random_state).fit_resample(X, y)
+
+
+def fit_member(name, params, X, y, threads=1):
+    estimator = member_classes()[name](**params)
+    estimator.set_params(**{THREAD_PARAMS[name]: threads})
+    return estimator.fit(X, y)
+
+
+def assemble_ensemble(members, classes):
+    """Soft VotingClassifier around already fitted members (what VotingClassifier.fit produces)"""
+    from sklearn.ensemble import VotingClassifier
+    from sklearn.preprocessing import LabelEncoder
+    from sklearn.utils import Bunch
+
+    ensemble = VotingClassifier(estimators=list(members.items()), voting='soft')
+    ensemble.le_ = LabelEncoder().fit(classes)
+    ensemble.classes_ = ensemble.le_.classes_
+    ensemble.estimators_ = list(members.values())
+    ensemble.named_estimators_ = Bunch(**members)
+    return ensemble
+
+
+def _write_artifact(obj, path):
+    joblib.dump(obj, path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+
+def prepare_split(data_path, config, cache):
+    """Clean and split stages: returns (data_path, split_key, split)"""
+    data_path = data_path or get_data_path(CATALOG)
+    if not os.path.exists(data_path):
+        raise FileNotFoundError(f"Training data not found at: {data_path}")
+
+    clean_key = stage_key('clean', _file_sha256(data_path))
+    features, labels = cache.get_or_compute(
+        'clean', clean_key, lambda: clean_frame(pd.read_csv(data_path)))
+
+    split_key = stage_key('split', clean_key, config['test_size'], config['random_state'])
+    split = cache.get_or_compute(
+        'split', split_key,
+        lambda: split_and_scale(features, labels, config['test_size'], config['random_state']))
+    return data_path, split_key, split
+
+
+def train(data_path=None, config=None, output_dir=None, use_cache=True, member_jobs=None):
+    """Train the ensemble and preprocessor from the KOI catalog and write both artifacts.
+
+    Stages: clean -> split (impute, scale) -> SMOTE -> one fit per member.
+    Each stage is cached under the hash of its inputs, and the members are
+    fitted concurrently, each with its own thread count. Returns a report
+    with the held-out metrics and which stages were reused.
+    """
+    start = time.perf_counter()
+    config = config or load_config()
+    output_dir = output_dir or os.path.dirname(get_model_path(MODEL_FILENAME))
+    cache = StageCache(enabled=use_cache)
+    data_path, split_key, split = prepare_split(data_path, config, cache)
+
+    if config['smote']:
+        smote_key = stage_key('smote', split_key, config['random_state'])
+        X_fit, y_fit = cache.get_or_compute(
+            'smote', smote_key, lambda: resample(split['X_train'], split['y_train'], config['random_state']))
+    else:
+        smote_key = split_key
+        X_fit, y_fit = split['X_train'], split['y_train']
+
+    # Members are independent: fit them side by side, each with its share of the cores
+    members = config['members']
+    jobs = default_member_jobs(list(members))
+    jobs.update(member_jobs or {})
+    with ThreadPoolExecutor(max_workers=len(members), thread_name_prefix='fit') as pool:
+        futures = {
+            name: pool.submit(cache.get_or_compute, f"fit-{name}", stage_key(f"fit-{name}", smote_key, params),
+                              lambda name=name, params=params: fit_member(name, params, X_fit, y_fit,
+                                                                          jobs.get(name, 1)))
+            for name, params in members.items()
+        }
+        fitted = {name: future.result() for name, future in futures.items()}
+
+    ensemble = assemble_ensemble(fitted, y_fit)
+    report = evaluate(split['y_test'], ensemble.predict_proba(split['X_test']))
+
+    os.makedirs(output_dir, exist_ok=True)
+    # Preprocessor first: the ensemble is what marks a new version as complete
+    _write_artifact(split['preprocessor'], os.path.join(output_dir, PREPROCESSOR_FILENAME))
+    _write_artifact(ensemble, os.path.join(output_dir, MODEL_FILENAME))
+
+    return {
+        'data': data_path,
+        'output_dir': output_dir,
+        'config': config,
+        'features': len(split['preprocessor']['features']),
+        'train_rows': len(split['y_train']),
+        'fit_rows': len(y_fit),
+        'test_rows': len(split['y_test']),
+        'metrics': report['metrics'],
+        'cached_stages': cache.hits,
+        'computed_stages': cache.misses,
+        'seconds': round(time.perf_counter() - start, 3),
+    }
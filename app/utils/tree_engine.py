@@ -0,0 +1,368 @@
+import json
+import time
+
+import numpy as np
+
+from .tracing import current_trace
+
+# Tree groups, in the order the soft vote combines them
+GROUP_FOREST = 0    # sklearn RandomForest / ExtraTrees: mean of leaf probabilities
+GROUP_LIGHTGBM = 1  # LightGBM: sigmoid of summed leaf values
+GROUP_XGBOOST = 2   # XGBoost: sigmoid of base margin + summed leaf values
+GROUP_NAMES = ('rf', 'lgbm', 'xgb')
+
+# Upper bound on rows * trees evaluated at once, keeps node index blocks in cache
+BLOCK_ELEMENTS = 1 << 18
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _contiguous(array, dtype, allowed=()):
+    """array as a C-contiguous dtype array; no copy if it already has dtype or an allowed one"""
+    array = np.asarray(array)
+    if array.dtype in allowed and array.flags.c_contiguous:
+        return array
+    return np.ascontiguousarray(array, dtype=dtype)
+
+
+class _TreeBuilder:
+    """Accumulates nodes of many trees into flat arrays.
+
+    Nodes are renumbered breadth-first so the two children of a split are
+    adjacent (right == left + 1), which lets the evaluator step with one
+    gather. Leaves point to themselves with an infinite threshold, so walking
+    past the bottom of a shallow tree is a no-op.
+    """
+
+    def __init__(self):
+        self.feature = []
+        self.threshold = []
+        self.left = []
+        self.default_left = []
+        self.value = []
+        self.roots = []
+        self.depths = []
+
+    def add_tree(self, feature, threshold, left, right, default_left, value, is_leaf):
+        """Append one tree given per-node arrays with local child indices (root is node 0)"""
+        offset = len(self.feature)
+        order = [0]
+        depth = 0
+        frontier = [0]
+        while True:
+            children = []
+            for node in frontier:
+                if not is_leaf[node]:
+                    children.extend((left[node], right[node]))
+            if not children:
+                break
+            order.extend(children)
+            frontier = children
+            depth += 1
+        order = np.asarray(order)
+        position = np.empty(len(feature), dtype=np.int64)
+        position[order] = np.arange(len(order)) + offset
+
+        leaf = np.asarray(is_leaf)[order]
+        self.feature.extend(np.where(leaf, 0, np.asarray(feature)[order]).tolist())
+        self.threshold.extend(np.where(leaf, np.inf, np.asarray(threshold)[order]).tolist())
+        self.left.extend(np.where(leaf, position[order], position[np.where(leaf, 0, np.asarray(left)[order])]).tolist())
+        self.default_left.extend((leaf | np.asarray(default_left, dtype=bool)[order]).tolist())
+        self.value.extend(np.where(leaf, np.asarray(value)[order], 0.0).tolist())
+        self.roots.append(offset)
+        self.depths.append(depth)
+
+
+def _add_forest(builder, forest, n_features):
+    """sklearn casts X to float32 and sends x <= threshold to the left"""
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        if tree.n_outputs != 1 or tree.value.shape[2] != 2:
+            raise ValueError("Only binary single-output forests can be compiled")
+        is_leaf = tree.children_left == -1
+        proba = tree.value[:, 0, :]
+        proba = proba[:, 1] / np.maximum(proba.sum(axis=1), 1e-300)
+        missing_left = getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=bool))
+        builder.add_tree(
+            feature=tree.feature + n_features,
+            threshold=tree.threshold,
+            left=tree.children_left,
+            right=tree.children_right,
+            default_left=missing_left,
+            value=proba,
+            is_leaf=is_leaf,
+        )
+
+
+def _add_lightgbm(builder, lgbm):
+    """LightGBM compares the float64 value with x <= threshold"""
+    dump = lgbm.booster_.dump_model()
+    if dump['num_tree_per_iteration'] != 1 or dump.get('average_output'):
+        raise ValueError("Only binary LightGBM models can be compiled")
+
+    for info in dump['tree_info']:
+        nodes = []
+        stack = [info['tree_structure']]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            if 'left_child' in node:
+                stack.append(node['right_child'])
+                stack.append(node['left_child'])
+        position = {id(node): i for i, node in enumerate(nodes)}
+
+        n_nodes = len(nodes)
+        feature = np.zeros(n_nodes, dtype=np.int64)
+        threshold = np.zeros(n_nodes)
+        left = np.full(n_nodes, -1)
+        right = np.full(n_nodes, -1)
+        default_left = np.zeros(n_nodes, dtype=bool)
+        value = np.zeros(n_nodes)
+        is_leaf = np.zeros(n_nodes, dtype=bool)
+        for i, node in enumerate(nodes):
+            if 'left_child' not in node:
+                is_leaf[i] = True
+                value[i] = node['leaf_value']
+                continue
+            if node['decision_type'] != '<=':
+                raise ValueError("Categorical LightGBM splits are not supported")
+            feature[i] = node['split_feature']
+            threshold[i] = node['threshold']
+            left[i] = position[id(node['left_child'])]
+            right[i] = position[id(node['right_child'])]
+            if node['missing_type'] == 'None':
+                # NaN is evaluated as 0.0
+                default_left[i] = 0.0 <= node['threshold']
+            elif node['missing_type'] == 'NaN':
+                default_left[i] = node['default_left']
+            else:
+                raise ValueError("LightGBM zero-as-missing splits are not supported")
+        builder.add_tree(feature, threshold, left, right, default_left, value, is_leaf)
+
+
+def _add_xgboost(builder, xgb, n_features):
+    """XGBoost casts X to float32 and sends x < threshold to the left"""
+    booster = xgb.get_booster()
+    model = json.loads(booster.save_raw('json'))
+    learner = model['learner']
+    if learner['objective']['name'] != 'binary:logistic':
+        raise ValueError("Only binary:logistic XGBoost models can be compiled")
+
+    for tree in learner['gradient_booster']['model']['trees']:
+        left = np.asarray(tree['left_children'])
+        right = np.asarray(tree['right_children'])
+        conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+        is_leaf = left == -1
+        # On float32 inputs, x < t is the same as x <= (largest float32 below t)
+        threshold = np.nextafter(conditions, np.float32(-np.inf)).astype(np.float64)
+        builder.add_tree(
+            feature=np.asarray(tree['split_indices']) + n_features,
+            threshold=threshold,
+            left=left,
+            right=right,
+            default_left=np.asarray(tree['default_left'], dtype=bool),
+            value=conditions.astype(np.float64),
+            is_leaf=is_leaf,
+        )
+
+    base_score = float(learner['learner_model_param']['base_score'].strip('[]'))
+    return float(np.log(base_score / (1.0 - base_score)))
+
+
+class CompiledEnsemble:
+    """Soft-voting tree ensemble flattened into contiguous NumPy arrays.
+
+    All trees share one node table (feature index, threshold, children, NaN
+    direction, leaf value). Inputs are widened to [x_float64, x_float32] so
+    every member compares against the precision its library uses, and
+    batches are walked level by level for all trees at once.
+
+    threshold may be float32 (see utils.model_format); exact_thresholds then
+    lists (first node, float64 thresholds) for node ranges where float32
+    would change a comparison. A range always covers whole trees.
+    """
+
+    def __init__(self, n_features, feature, threshold, left, default_left,
+                 value, roots, depths, groups, weights, xgb_base_margin, exact_thresholds=()):
+        self.n_features = n_features
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = _contiguous(threshold, np.float64, allowed=(np.float32,))
+        self.exact_thresholds = [(int(start), _contiguous(exact, np.float64)) for start, exact in exact_thresholds]
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.depths = np.ascontiguousarray(depths, dtype=np.int32)
+        self.groups = np.ascontiguousarray(groups, dtype=np.int8)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.xgb_base_margin = xgb_base_margin
+        self.classes_ = np.array([0, 1])
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def _group_trees(self, group):
+        """Trees of one member, deepest first so each level works on a prefix"""
+        trees = np.flatnonzero(self.groups == group)
+        return trees[np.argsort(-self.depths[trees], kind='stable')]
+
+    def _thresholds_for(self, trees):
+        """(thresholds, first node) to compare against for a slice of trees"""
+        first = int(self.roots[trees].min())
+        for start, exact in self.exact_thresholds:
+            if start <= first < start + len(exact):
+                return exact, start
+        return self.threshold, 0
+
+    def _leaf_values(self, X_wide, trees, has_missing):
+        """Leaf value reached by every row in every tree of the slice"""
+        thresholds, offset = self._thresholds_for(trees)
+        n_rows, width = X_wide.shape
+        flat = X_wide.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.int64) * width)[:, None]
+        node = np.broadcast_to(self.roots[trees], (n_rows, len(trees))).copy()
+        depths = self.depths[trees]
+        for level in range(int(depths.max(initial=0))):
+            # Trees shallower than this level already sit on a leaf
+            active = node[:, :np.count_nonzero(depths > level)]
+            x = flat[row_offset + self.feature[active]]
+            go_right = x > thresholds[active - offset if offset else active]
+            if has_missing:
+                missing = np.isnan(x)
+                go_right[missing] = ~self.default_left[active[missing]]
+            active[...] = self.left[active] + go_right
+        return self.value[node]
+
+    def _member_probabilities(self, X_wide, timings=None):
+        """Positive class probability of each member, shape (n_rows, 3)"""
+        members = np.zeros((len(X_wide), 3))
+        has_missing = bool(np.isnan(X_wide).any())
+        for group in (GROUP_FOREST, GROUP_LIGHTGBM, GROUP_XGBOOST):
+            trees = self._group_trees(group)
+            if len(trees) == 0:
+                continue
+            start = time.perf_counter()
+            leaves = self._leaf_values(X_wide, trees, has_missing)
+            if group == GROUP_FOREST:
+                members[:, group] = leaves.mean(axis=1)
+            elif group == GROUP_LIGHTGBM:
+                members[:, group] = _sigmoid(leaves.sum(axis=1))
+            else:
+                members[:, group] = _sigmoid(self.xgb_base_margin + leaves.sum(axis=1))
+            if timings is not None:
+                timings[group] += time.perf_counter() - start
+        return members
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim != 2 or X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got shape {X.shape}")
+
+        # Member time is summed over blocks and reported as one span per member
+        active = current_trace()
+        timings = np.zeros(3) if active is not None else None
+
+        positive = np.empty(len(X))
+        block = max(BLOCK_ELEMENTS // max(self.n_trees, 1), 1)
+        for start in range(0, len(X), block):
+            chunk = X[start:start + block]
+            X_wide = np.hstack([chunk, chunk.astype(np.float32).astype(np.float64)])
+            members = self._member_probabilities(X_wide, timings)
+            positive[start:start + block] = members @ self.weights
+
+        if active is not None:
+            for group in np.unique(self.groups):
+                active.record(f"member:{GROUP_NAMES[group]}", float(timings[group]), rows=len(X))
+
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X):
+        probabilities = self.predict_proba(X)
+        return self.classes_[np.argmax(probabilities, axis=1)]
+
+
+def compile_ensemble(model):
+    """Flatten a fitted soft VotingClassifier (RF + LightGBM + XGBoost) into a CompiledEnsemble"""
+    if getattr(model, 'voting', None) != 'soft':
+        raise ValueError("Only soft-voting ensembles can be compiled")
+    if list(model.classes_) != [0, 1]:
+        raise ValueError("Only binary 0/1 ensembles can be compiled")
+
+    n_features = model.n_features_in_
+    builder = _TreeBuilder()
+    groups = []
+    member_groups = []
+    xgb_base_margin = 0.0
+    for estimator in model.estimators_:
+        before = len(builder.roots)
+        kind = type(estimator).__name__
+        if kind in ('RandomForestClassifier', 'ExtraTreesClassifier'):
+            _add_forest(builder, estimator, n_features)
+            group = GROUP_FOREST
+        elif kind == 'LGBMClassifier':
+            _add_lightgbm(builder, estimator)
+            group = GROUP_LIGHTGBM
+        elif kind == 'XGBClassifier':
+            xgb_base_margin = _add_xgboost(builder, estimator, n_features)
+            group = GROUP_XGBOOST
+        else:
+            raise ValueError(f"Cannot compile ensemble member of type {kind}")
+        if group in member_groups:
+            raise ValueError(f"Only one {kind} member can be compiled")
+        member_groups.append(group)
+        groups.extend([group] * (len(builder.roots) - before))
+
+    weights = np.zeros(3)
+    member_weights = model.weights if model.weights is not None else [1.0] * len(member_groups)
+    weights[member_groups] = member_weights
+    weights /= weights.sum()
+
+    return CompiledEnsemble(
+        n_features=n_features,
+        feature=builder.feature,
+        threshold=builder.threshold,
+        left=builder.left,
+        default_left=builder.default_left,
+        value=builder.value,
+        roots=builder.roots,
+        depths=builder.depths,
+        groups=groups,
+        weights=weights,
+        xgb_base_margin=xgb_base_margin,
+    )
+
+
+def compile_lightgbm(lgbm, n_features):
+    """A single binary LightGBM model (e.g. the distilled student) as a CompiledEnsemble"""
+    builder = _TreeBuilder()
+    _add_lightgbm(builder, lgbm)
+    return CompiledEnsemble(
+        n_features=n_features,
+        feature=builder.feature,
+        threshold=builder.threshold,
+        left=builder.left,
+        default_left=builder.default_left,
+        value=builder.value,
+        roots=builder.roots,
+        depths=builder.depths,
+        groups=[GROUP_LIGHTGBM] * len(builder.roots),
+        weights=[0.0, 1.0, 0.0],
+        xgb_base_margin=0.0,
+    )
+
+
+def check_parity(model, compiled, X, atol=1e-6):
+    """Largest absolute probability difference between the two; raises if above atol"""
+    expected = model.predict_proba(X)
+    actual = compiled.predict_proba(X)
+    max_diff = float(np.max(np.abs(expected - actual))) if len(X) else 0.0
+    if max_diff > atol:
+        raise ValueError(f"Compiled ensemble differs from the model by {max_diff:.3g} (tolerance {atol:.1g})")
+    return max_diff
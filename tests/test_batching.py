@@ -0,0 +1,65 @@
+"""A request must get the same result from the micro-batcher as when it is scored alone."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.batching import MicroBatcher
+from utils.data_store import CATALOG, load_frame
+from utils.feature_plan import DELIVNAME_COLUMN, DELIVNAME_PREFIX
+from utils.model import load_feature_plan
+
+
+def features(df):
+    """Stands in for the model: equal model inputs give equal scores"""
+    X = load_feature_plan().transform(df)
+    return np.zeros(len(X)), X
+
+
+def one_hot(df):
+    """The row as the single-prediction form sends it"""
+    df = df.copy()
+    delivname = df.pop(DELIVNAME_COLUMN)
+    for value in ('q1_q16_tce', 'q1_q17_dr24_tce'):
+        df[DELIVNAME_PREFIX + value] = (delivname == value).astype(int)
+    return df
+
+
+@pytest.fixture(scope='module')
+def catalog():
+    return load_frame(CATALOG)
+
+
+@pytest.fixture
+def batcher():
+    # Long enough a wait that every request submitted below lands in one batch
+    batcher = MicroBatcher(score_fn=features, max_wait_ms=500)
+    yield batcher
+    batcher.close()
+
+
+def test_mixed_delivname_forms_batch_like_single_rows(catalog, batcher):
+    runs = catalog[DELIVNAME_COLUMN]
+    raw = [catalog.loc[[i]] for i in catalog.index[runs == 'q1_q16_tce'][:3]]
+    encoded = [one_hot(catalog.loc[[i]]) for i in catalog.index[runs == 'q1_q17_dr24_tce'][:3]]
+    without = [catalog.loc[[i]].drop(columns=DELIVNAME_COLUMN) for i in catalog.index[runs.isna()][:2]]
+    requests = raw + encoded + without
+
+    futures = [batcher.submit(df) for df in requests]
+    batched = [future.result(timeout=30)[1] for future in futures]
+
+    assert batcher.stats()['batch_size_counts'] == {len(requests): 1}
+    for df, rows in zip(requests, batched):
+        np.testing.assert_array_equal(rows, features(df)[1])
+
+
+def test_malformed_request_fails_alone(catalog, batcher):
+    good = catalog.iloc[[0]]
+    bad = catalog.iloc[[1]].astype({'koi_depth': object})
+    bad.iloc[0, bad.columns.get_loc('koi_depth')] = 'deep'
+
+    futures = [batcher.submit(good), batcher.submit(bad), batcher.submit(pd.concat([good, good]))]
+
+    np.testing.assert_array_equal(futures[0].result(timeout=30)[1], features(good)[1])
+    with pytest.raises(ValueError, match='Invalid feature values'):
+        futures[1].result(timeout=30)
+    assert len(futures[2].result(timeout=30)[1]) == 2
@@ -0,0 +1,34 @@
+"""Streamed results files are always readable, and default ones do not pile up."""
+import os
+import time
+
+import pandas as pd
+
+from utils import streaming
+from utils.scoring import RESULT_COLUMNS
+
+
+def test_all_rows_filtered_still_writes_header(tmp_path):
+    source = tmp_path / 'false_positives.csv'
+    pd.DataFrame({'koi_disposition': ['FALSE POSITIVE'] * 3, 'koi_period': [1.0, 2.0, 3.0]}).to_csv(source, index=False)
+    summary, output_path = streaming.stream_predictions(str(source), output_path=str(tmp_path / 'out.csv'))
+
+    assert summary.rows == 0
+    results = pd.read_csv(output_path, nrows=10)
+    assert results.columns.tolist() == RESULT_COLUMNS
+    assert results.empty
+
+
+def test_default_outputs_are_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(streaming, 'OUTPUT_DIR', str(tmp_path))
+    stale = tmp_path / 'predictions_stale.csv'
+    stale.write_text('')
+    old = time.time() - streaming.OUTPUT_MAX_AGE_SECONDS - 60
+    os.utime(stale, (old, old))
+
+    paths = [streaming.new_output_path() for _ in range(streaming.OUTPUT_MAX_FILES + 5)]
+
+    assert not stale.exists()
+    remaining = sorted(entry.name for entry in os.scandir(tmp_path))
+    assert len(remaining) == streaming.OUTPUT_MAX_FILES
+    assert os.path.basename(paths[-1]) in remaining
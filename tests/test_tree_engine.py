@@ -0,0 +1,61 @@
+"""The array-backed backends must score exactly like the pickled sklearn ensemble."""
+import os
+
+import joblib
+import numpy as np
+import pytest
+
+from utils.model import MODEL_FILENAME, get_model_path, load_feature_plan
+
+if not os.path.exists(get_model_path(MODEL_FILENAME)):
+    pytest.skip("No ensemble pickle; run 'python main.py train' first", allow_module_level=True)
+
+from utils.data_store import CATALOG, load_frame
+from utils.model_format import compact, read_model_file, write_model_file
+from utils.parallel_ensemble import ParallelEnsemble
+from utils.synthetic import KOISampler
+from utils.tree_engine import compile_ensemble
+
+ATOL = 1e-6
+
+
+@pytest.fixture(scope='module')
+def model():
+    return joblib.load(get_model_path(MODEL_FILENAME))
+
+
+@pytest.fixture(scope='module')
+def X():
+    """Catalog rows and synthetic KOIs through the inference preprocessing, plus out-of-range rows"""
+    plan = load_feature_plan()
+    rows = np.vstack([plan.transform(load_frame(CATALOG)), plan.transform(KOISampler().sample(2_000, seed=0))])
+    extreme = np.random.default_rng(0).normal(scale=10.0, size=(500, plan.n_features))
+    return np.vstack([rows, extreme])
+
+
+@pytest.fixture(scope='module')
+def expected(model, X):
+    return model.predict_proba(X)
+
+
+def assert_same_scores(expected, probabilities):
+    np.testing.assert_allclose(probabilities, expected, rtol=0, atol=ATOL)
+    np.testing.assert_array_equal(probabilities.argmax(axis=1), expected.argmax(axis=1))
+
+
+def test_compiled_matches_sklearn(model, X, expected):
+    assert_same_scores(expected, compile_ensemble(model).predict_proba(X))
+
+
+def test_compacted_float32_thresholds_match_sklearn(model, X, expected):
+    assert_same_scores(expected, compact(compile_ensemble(model)).predict_proba(X))
+
+
+def test_mapped_file_matches_sklearn(model, X, expected, tmp_path):
+    path = str(tmp_path / 'model.trees')
+    write_model_file(compact(compile_ensemble(model)), path)
+    assert_same_scores(expected, read_model_file(path).predict_proba(X))
+
+
+def test_parallel_matches_sklearn(model, X, expected):
+    assert_same_scores(expected, ParallelEnsemble(model).predict_proba(X))